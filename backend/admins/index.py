@@ -1,5 +1,6 @@
 '''
-Business: Manage admin accounts (add/list admins)
+Business: Manage admin accounts (add/list admins) and expose slow-query stats (?view=query_stats)
+          and this instance's pool, cache, timing and throttle counters (?view=instance_stats)
 Args: event - dict with httpMethod, body, queryStringParameters
       context - object with attributes: request_id, function_name
 Returns: HTTP response dict
@@ -8,123 +9,127 @@ Returns: HTTP response dict
 import json
 import os
 import hashlib
-import psycopg2
+import sys
 from typing import Dict, Any
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Session',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
+from shared.db import pooled_connection
+from shared.instancestats import instance_stats
+from shared.prepared import PreparedStatement
+from shared.render import db_json_rendering
+from shared.routing import JSON_HEADERS, Router, error_response, json_response
+from shared.serialize import dumps
+from shared.sessions import admin_only
+from shared.timing import instrumented, phase
+
+ADMINS_JSON = PreparedStatement('admins_json', """
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', id,
+        'username', username,
+        'created_at', created_at,
+        'created_by', created_by
+    ) ORDER BY created_at), '[]'::json)::text
+    FROM admins
+""")
+
+ADMINS = PreparedStatement('admins', "SELECT id, username, created_at, created_by FROM admins ORDER BY created_at")
+
+INSERT_ADMIN = PreparedStatement(
+    'insert_admin',
+    "INSERT INTO admins (username, password_hash, created_by) VALUES (%s, %s, %s) RETURNING id"
+)
+
+@admin_only
+def list_admins(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    if params.get('view') == 'instance_stats':
+        return json_response(200, instance_stats())
     
-    if method == 'GET':
-        cur.execute("SELECT id, username, created_at, created_by FROM admins ORDER BY created_at")
-        rows = cur.fetchall()
-        
-        admins = []
-        for row in rows:
-            admins.append({
-                'id': row[0],
-                'username': row[1],
-                'created_at': row[2].isoformat() if row[2] else None,
-                'created_by': row[3]
-            })
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        if params.get('view') == 'query_stats':
+            cur.execute(
+                """
+                SELECT COALESCE(json_agg(json_build_object(
+                    'fingerprint', fingerprint,
+                    'calls', calls,
+                    'total_ms', round(total_ms::numeric, 3),
+                    'mean_ms', round((total_ms / GREATEST(calls, 1))::numeric, 3),
+                    'max_ms', round(max_ms::numeric, 3),
+                    'rows', rows,
+                    'slow_calls', slow_calls,
+                    'last_explain', last_explain,
+                    'last_explain_at', last_explain_at,
+                    'updated_at', updated_at
+                ) ORDER BY total_ms DESC), '[]'::json)::text
+                FROM (SELECT * FROM query_stats ORDER BY total_ms DESC LIMIT 100) s
+                """
+            )
+            body = cur.fetchone()[0]
+        elif db_json_rendering():
+            ADMINS_JSON.execute(cur)
+            body = cur.fetchone()[0]
+        else:
+            ADMINS.execute(cur)
+            rows = cur.fetchall()
+            
+            with phase('serialize'):
+                admins = []
+                for row in rows:
+                    admins.append({
+                        'id': row[0],
+                        'username': row[1],
+                        'created_at': row[2].isoformat() if row[2] else None,
+                        'created_by': row[3]
+                    })
+                body = dumps(admins)
         
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(admins),
-            'isBase64Encoded': False
-        }
     
-    if method == 'POST':
-        body_data = json.loads(event.get('body', '{}'))
-        username = body_data.get('username')
-        password = body_data.get('password')
-        created_by = body_data.get('created_by', 'system')
-        
-        if not username or not password:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Username and password required'}),
-                'isBase64Encoded': False
-            }
-        
-        password_hash = hashlib.md5(password.encode()).hexdigest()
-        
+    return {
+        'statusCode': 200,
+        'headers': JSON_HEADERS,
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+@admin_only
+def create_admin(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    username = body_data.get('username')
+    password = body_data.get('password')
+    created_by = body_data.get('created_by', 'system')
+    
+    if not username or not password:
+        return error_response(400, 'Username and password required')
+    
+    password_hash = hashlib.md5(password.encode()).hexdigest()
+    
+    import psycopg2
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
         try:
-            cur.execute(
-                "INSERT INTO admins (username, password_hash, created_by) VALUES (%s, %s, %s) RETURNING id",
-                (username, password_hash, created_by)
-            )
+            INSERT_ADMIN.execute(cur, (username, password_hash, created_by))
             admin_id = cur.fetchone()[0]
             conn.commit()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 201,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'success': True, 'id': admin_id}),
-                'isBase64Encoded': False
-            }
         except psycopg2.IntegrityError:
             conn.rollback()
+            return error_response(409, 'Username already exists')
+        finally:
             cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 409,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Username already exists'}),
-                'isBase64Encoded': False
-            }
-    
-    cur.close()
-    conn.close()
     
-    return {
-        'statusCode': 405,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Method not allowed'}),
-        'isBase64Encoded': False
-    }
+    return json_response(201, {'success': True, 'id': admin_id})
+
+router = Router(
+    {
+        'GET': list_admins,
+        'POST': create_admin
+    },
+    allow_headers=('Content-Type', 'X-Admin-Session')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
@@ -8,92 +8,115 @@ Returns: HTTP response dict
 import json
 import os
 import hashlib
-import psycopg2
+import sys
 from typing import Dict, Any
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
+from shared.db import pooled_connection
+from shared.prepared import PreparedStatement
+from shared.routing import Router, error_response, json_response
+from shared.sessions import issue_session_token, revocations, sessions_enabled, verify_admin_session
+from shared.throttle import ENABLED as THROTTLE_ENABLED, login_throttle, source_ip, too_many_attempts
+from shared.timing import instrumented
+
+LOGGED_OUT = json_response(200, {'success': True})
+CREDENTIALS_REQUIRED = error_response(400, 'Username and password required')
+
+FIND_ADMIN = PreparedStatement(
+    'find_admin',
+    "SELECT id, username FROM admins WHERE username = %s AND password_hash = %s"
+)
+
+def login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    if not isinstance(body_data, dict):
+        return CREDENTIALS_REQUIRED
+    username = body_data.get('username')
+    password = body_data.get('password')
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Session',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    # The throttle keys and the password hash both need strings
+    if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
+        return CREDENTIALS_REQUIRED
     
-    if method == 'POST':
-        body_data = json.loads(event.get('body', '{}'))
-        username = body_data.get('username')
-        password = body_data.get('password')
-        
-        if not username or not password:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Username and password required'}),
-                'isBase64Encoded': False
-            }
-        
-        conn = get_db_connection()
+    if THROTTLE_ENABLED:
+        throttle_keys = login_throttle.keys(username, source_ip(event))
+        retry_after = login_throttle.check(throttle_keys)
+        if retry_after:
+            return too_many_attempts(retry_after)
+    
+    with pooled_connection() as conn:
         cur = conn.cursor()
         
+        if THROTTLE_ENABLED:
+            retry_after = login_throttle.record(cur, throttle_keys)
+            conn.commit()
+            if retry_after:
+                cur.close()
+                return too_many_attempts(retry_after)
+        
         password_hash = hashlib.md5(password.encode()).hexdigest()
         
-        cur.execute(
-            "SELECT id, username FROM admins WHERE username = %s AND password_hash = %s",
-            (username, password_hash)
-        )
+        FIND_ADMIN.execute(cur, (username, password_hash))
         
         admin = cur.fetchone()
         cur.close()
-        conn.close()
-        
-        if admin:
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'success': True,
-                    'admin': {
-                        'id': admin[0],
-                        'username': admin[1]
-                    }
-                }),
-                'isBase64Encoded': False
-            }
-        else:
-            return {
-                'statusCode': 401,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Invalid credentials'}),
-                'isBase64Encoded': False
-            }
     
-    return {
-        'statusCode': 405,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Method not allowed'}),
-        'isBase64Encoded': False
+    if not admin:
+        return error_response(401, 'Invalid credentials')
+    
+    response_body = {
+        'success': True,
+        'admin': {
+            'id': admin[0],
+            'username': admin[1]
+        }
     }
+    if sessions_enabled():
+        session = issue_session_token(admin[0], admin[1])
+        response_body['session'] = session['token']
+        response_body['expires_at'] = session['expires_at']
+    
+    return json_response(200, response_body)
+
+def current_session(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    claims = verify_admin_session(event)
+    if claims is None:
+        return error_response(401, 'Invalid or expired session')
+    
+    return json_response(200, {
+        'success': True,
+        'admin': {
+            'id': claims['sub'],
+            'username': claims['usr']
+        },
+        'expires_at': claims['exp']
+    })
+
+def logout(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    claims = verify_admin_session(event)
+    if claims is not None:
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO admin_session_revocations (jti, admin_id, expires_at) VALUES (%s, %s, to_timestamp(%s) AT TIME ZONE 'UTC')",
+                (claims['jti'], claims['sub'], claims['exp'])
+            )
+            conn.commit()
+            cur.close()
+        revocations.add(claims['jti'])
+    
+    return LOGGED_OUT
+
+router = Router(
+    {
+        'GET': current_session,
+        'POST': login,
+        'DELETE': logout
+    },
+    allow_headers=('Content-Type', 'X-Admin-Session')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
@@ -0,0 +1,123 @@
+'''
+Business: Helpers shared by the local benchmark scripts
+Args: DATABASE_URL - local Postgres the benchmarks are allowed to write scratch schemas into
+'''
+
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MIGRATIONS_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'db_migrations'))
+SITE_SCHEMA = 't_p98795140_minecraft_anarchy_si'
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+def load_function(name: str) -> ModuleType:
+    '''Imports backend/<name>/index.py under a unique module name.'''
+    path = os.path.join(BACKEND_DIR, name, 'index.py')
+    spec = importlib.util.spec_from_file_location(f'{name}_index', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def connect() -> Any:
+    import psycopg2
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        raise SystemExit('DATABASE_URL must point at a local scratch Postgres')
+    return psycopg2.connect(database_url)
+
+def create_scratch_schema(conn: Any, schema: str) -> None:
+    '''Recreates the site tables inside a throwaway schema and points search_path at it.'''
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+    cur.execute(f'CREATE SCHEMA {schema}')
+    cur.execute(f'SET search_path TO {schema}')
+    cur.execute(
+        """
+        CREATE TABLE privileges (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            price DECIMAL(10, 2) NOT NULL,
+            features TEXT[],
+            is_active BOOLEAN DEFAULT true,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            image_url TEXT
+        );
+        CREATE TABLE orders (
+            id SERIAL PRIMARY KEY,
+            privilege_id INTEGER REFERENCES privileges(id),
+            player_name VARCHAR(255) NOT NULL,
+            player_email VARCHAR(255),
+            status VARCHAR(50) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            player_phone VARCHAR(50),
+            fulfillment_lease_until TIMESTAMP
+        );
+        CREATE INDEX idx_orders_created_at_id ON orders (created_at DESC, id DESC);
+        INSERT INTO privileges (name, description, price, features)
+        SELECT 'Privilege ' || g, 'Benchmark privilege', 100 + g, ARRAY['fly', 'kit']
+        FROM generate_series(1, 10) g;
+        """
+    )
+    conn.commit()
+    cur.close()
+
+# Synthetic order g is created SEED_EPOCH + g seconds
+SEED_EPOCH = datetime(2024, 1, 1)
+
+def seed_orders(conn: Any, start: int, stop: int, chunk: int = 1_000_000) -> None:
+    '''Adds synthetic orders numbered [start, stop), committing every chunk rows.'''
+    if stop <= start:
+        return
+    cur = conn.cursor()
+    for chunk_start in range(start, stop, chunk):
+        cur.execute(
+            """
+            INSERT INTO orders (privilege_id, player_name, player_email, player_phone, status, created_at)
+            SELECT
+                1 + g % 10,
+                'player_' || g,
+                'player_' || g || '@example.com',
+                '+7900' || lpad((g % 10000000)::text, 7, '0'),
+                (ARRAY['pending', 'completed', 'failed'])[1 + g % 3],
+                %s + g * INTERVAL '1 second'
+            FROM generate_series(%s, %s - 1) g
+            """,
+            (SEED_EPOCH, chunk_start, min(chunk_start + chunk, stop))
+        )
+        conn.commit()
+    cur.execute('ANALYZE orders')
+    conn.commit()
+    cur.close()
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    '''Best-of-N wall time plus the tracemalloc peak of one extra run.'''
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'best_ms': min(timings) * 1000,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+def parse_sizes(value: str) -> Tuple[int, ...]:
+    return tuple(sorted(int(float(part)) for part in value.split(',') if part))
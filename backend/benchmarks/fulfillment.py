@@ -0,0 +1,96 @@
+'''
+Business: Throughput of the privilege fulfillment path against the local fake RCON server
+Args: --commands per RCON run, --in-flight comma separated pipeline depths to compare,
+      --rtt-ms simulated network round trip, --latency-ms simulated per-command server time,
+      --orders optional backlog drained end to end through the worker (needs DATABASE_URL),
+      --batch-size worker batch size
+Returns: table of commands (or orders) per second for each configuration
+
+Usage: python -m benchmarks.fulfillment --rtt-ms 20
+       DATABASE_URL=postgres://localhost/scratch python -m benchmarks.fulfillment --orders 5000
+'''
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+from benchmarks._common import connect, create_scratch_schema, parse_sizes
+from fulfillment.fake_rcon import FakeRconServer
+from fulfillment.rcon import RconClient
+from fulfillment.worker import run
+
+SCHEMA = 'bench_fulfillment'
+PASSWORD = 'bench'
+
+async def rcon_throughput(commands: int, in_flight: int, rtt_ms: float, latency_ms: float) -> Dict[str, Any]:
+    server = FakeRconServer(PASSWORD, latency_ms=latency_ms, rtt_ms=rtt_ms)
+    port = await server.start()
+    client = RconClient('127.0.0.1', port, PASSWORD, max_in_flight=in_flight)
+    await client.connect()
+    started = time.perf_counter()
+    await asyncio.gather(*(client.command(f'lp user player_{i} parent add vip') for i in range(commands)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    await server.stop()
+    return {'in_flight': in_flight, 'commands': commands, 'seconds': elapsed, 'per_second': commands / elapsed}
+
+def seed_pending_orders(conn: Any, orders: int) -> None:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO orders (privilege_id, player_name, player_phone, status, created_at)
+        SELECT 1 + g % 10, 'player_' || g, '+79000000000', 'pending',
+               TIMESTAMP '2024-01-01' + g * INTERVAL '1 second'
+        FROM generate_series(1, %s) g
+        """,
+        (orders,)
+    )
+    conn.commit()
+    cur.close()
+
+async def drain_backlog(conn: Any, batch_size: int, in_flight: int, rtt_ms: float,
+                        latency_ms: float) -> Dict[str, Any]:
+    server = FakeRconServer(PASSWORD, latency_ms=latency_ms, rtt_ms=rtt_ms)
+    port = await server.start()
+    client = RconClient('127.0.0.1', port, PASSWORD, max_in_flight=in_flight)
+    started = time.perf_counter()
+    totals = await run(conn, client, batch_size, once=True, log=False)
+    elapsed = time.perf_counter() - started
+    await server.stop()
+    return dict(totals, in_flight=in_flight, seconds=elapsed, per_second=totals['completed'] / elapsed)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=5000)
+    parser.add_argument('--in-flight', default='1,8,32,128')
+    parser.add_argument('--rtt-ms', type=float, default=5.0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--orders', type=float, default=None)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    depths = parse_sizes(args.in_flight)
+    
+    print(f'RCON pipeline, {args.commands} commands, rtt {args.rtt_ms} ms, server {args.latency_ms} ms/command')
+    for depth in depths:
+        result = asyncio.run(rcon_throughput(args.commands, depth, args.rtt_ms, args.latency_ms))
+        print(f"  in-flight {depth:>4}: {result['per_second']:10.0f} commands/s ({result['seconds']:.2f} s)")
+    
+    if args.orders is None:
+        return
+    
+    orders = int(args.orders)
+    conn = connect()
+    print(f'Worker backlog of {orders} orders, batch size {args.batch_size}')
+    for depth in depths:
+        create_scratch_schema(conn, SCHEMA)
+        seed_pending_orders(conn, orders)
+        result = asyncio.run(drain_backlog(conn, args.batch_size, depth, args.rtt_ms, args.latency_ms))
+        print(
+            f"  in-flight {depth:>4}: {result['per_second']:10.0f} orders/s ({result['seconds']:.2f} s, "
+            f"{result['completed']} completed, {result['failed']} failed, {result['deferred']} deferred)"
+        )
+    conn.close()
+
+if __name__ == '__main__':
+    main()
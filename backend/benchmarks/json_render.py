@@ -0,0 +1,64 @@
+'''
+Business: Compare Python-side vs Postgres-side JSON rendering of the orders listing
+Args: --sizes comma separated order counts (default 10k,100k,1M), --repeat runs per size
+Returns: table of wall time, peak Python memory and body size for both render paths
+
+Usage: DATABASE_URL=postgres://localhost/scratch python -m benchmarks.json_render
+'''
+
+import argparse
+import json
+
+from benchmarks._common import connect, create_scratch_schema, load_function, measure, parse_sizes, seed_orders
+
+SCHEMA = 'bench_json_render'
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1e4,1e5,1e6')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    orders = load_function('orders')
+    conn = connect()
+    create_scratch_schema(conn, SCHEMA)
+    cur = conn.cursor()
+    
+    results = []
+    seeded = 0
+    for size in parse_sizes(args.sizes):
+        seed_orders(conn, seeded, size)
+        seeded = size
+        
+        python_stats = measure(lambda: orders.render_orders_python(cur, '', [], size), args.repeat)
+        db_stats = measure(lambda: orders.render_orders_db(cur, '', [], size), args.repeat)
+        python_body, _ = orders.render_orders_python(cur, '', [], size)
+        db_body, _ = orders.render_orders_db(cur, '', [], size)
+        conn.rollback()
+        
+        results.append({
+            'orders': size,
+            'python': dict(python_stats, body_bytes=len(python_body)),
+            'db': dict(db_stats, body_bytes=len(db_body)),
+        })
+    
+    cur.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+    conn.commit()
+    conn.close()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{'orders':>10} {'path':>7} {'best ms':>10} {'mean ms':>10} {'peak KiB':>12} {'body bytes':>12}")
+    for result in results:
+        for path in ('python', 'db'):
+            stats = result[path]
+            print(
+                f"{result['orders']:>10} {path:>7} {stats['best_ms']:>10.1f} {stats['mean_ms']:>10.1f} "
+                f"{stats['peak_kib']:>12.0f} {stats['body_bytes']:>12}"
+            )
+
+if __name__ == '__main__':
+    main()
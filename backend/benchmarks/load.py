@@ -0,0 +1,336 @@
+'''
+Business: In-process load and regression benchmark for every backend function
+Args: --requests per scenario, --concurrency worker threads, --seed-orders optional dataset
+      size to generate first, --baseline JSON file, --threshold allowed relative regression,
+      --update-baseline to record the current run instead of comparing
+Returns: exit code 1 when any scenario regressed past the threshold
+
+Scenarios are built from each function's tests.json plus parameterized writes
+(orders POST/PUT, privileges POST/DELETE). Tests marked "adminSession" and the
+writes carry a session signed with ADMIN_SESSION_SECRET. Every scenario reports
+cold start (fresh interpreter: import + first request), warm p50/p95/p99,
+throughput and Python bytes allocated per request. Replayed events get random
+client addresses and login throttling is off unless AUTH_THROTTLE is set explicitly.
+
+Usage: DATABASE_URL=postgres://localhost/bench python -m benchmarks.load --seed-orders 1e5
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from benchmarks._common import BACKEND_DIR, SITE_SCHEMA, connect, load_function
+
+os.environ.setdefault('PGOPTIONS', f'-c search_path={SITE_SCHEMA},public')
+os.environ.setdefault('REQUEST_TIMING_LOG', '0')
+# Replayed logins would trip the brute-force throttle after a few requests
+os.environ.setdefault('AUTH_THROTTLE', '0')
+# Admin routes answer 503 without a signing key
+os.environ.setdefault('ADMIN_SESSION_SECRET', 'load-benchmark')
+
+from shared.sessions import issue_session_token, sessions_enabled
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+COMPARED_METRICS = {
+    'p95_ms': 'lower',
+    'throughput_rps': 'higher',
+    'cold_total_ms': 'lower',
+    'cold_imported_modules': 'lower',
+}
+
+
+class Scenario:
+    def __init__(self, name: str, function: str, make_event: Callable[[random.Random], Dict[str, Any]],
+                 expected_status: Optional[int] = None):
+        self.name = name
+        self.function = function
+        self.make_event = make_event
+        self.expected_status = expected_status
+
+
+def base_event(method: str, path: str = '/', body: Any = None, query: Optional[Dict[str, str]] = None,
+               admin_session: bool = True) -> Dict[str, Any]:
+    headers = {'Content-Type': 'application/json'}
+    if admin_session and sessions_enabled():
+        headers['X-Admin-Session'] = issue_session_token(0, 'benchmark')['token']
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': headers,
+        'queryStringParameters': query or {},
+        'body': json.dumps(body) if body is not None else '',
+        'isBase64Encoded': False,
+    }
+
+
+def with_source_ip(event: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    '''Gives each replayed event its own client address, as real traffic would have.'''
+    source_ip = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+    return dict(event, requestContext={'identity': {'sourceIp': source_ip}})
+
+
+def tests_json_scenarios() -> List[Scenario]:
+    scenarios: List[Scenario] = []
+    for function in sorted(os.listdir(BACKEND_DIR)):
+        path = os.path.join(BACKEND_DIR, function, 'tests.json')
+        if not os.path.isfile(path):
+            continue
+        with open(path) as f:
+            tests = json.load(f).get('tests', [])
+        for test in tests:
+            event = base_event(test['method'], test.get('path', '/'), test.get('body'),
+                               admin_session=test.get('adminSession', False))
+            event['headers'].update(test.get('headers', {}))
+            scenarios.append(Scenario(
+                f"{function}: {test['name']}", function, lambda rng, event=event: with_source_ip(event, rng), test.get('expectedStatus')
+            ))
+    return scenarios
+
+
+def write_scenarios(max_order_id: int, delete_ids: List[int]) -> List[Scenario]:
+    def order_post(rng: random.Random) -> Dict[str, Any]:
+        n = rng.randrange(10 ** 9)
+        return base_event('POST', body={
+            'privilege_id': rng.randint(1, 10),
+            'player_name': f'bench_{n}',
+            'player_phone': f'+7999{n % 10 ** 7:07d}',
+            'player_email': f'bench_{n}@example.com',
+        })
+
+    def order_put(rng: random.Random) -> Dict[str, Any]:
+        return base_event('PUT', body={
+            'order_id': rng.randint(1, max(max_order_id, 1)),
+            'status': rng.choice(['pending', 'completed']),
+        })
+
+    def privilege_post(rng: random.Random) -> Dict[str, Any]:
+        return base_event('POST', body={
+            'name': f'Bench {rng.randrange(10 ** 6)}',
+            'description': 'Created by the load benchmark',
+            'price': rng.randint(10, 5000),
+            'features': ['fly', 'kit'],
+        })
+
+    def privilege_delete(rng: random.Random) -> Dict[str, Any]:
+        return base_event('DELETE', query={'id': str(rng.choice(delete_ids))})
+
+    return [
+        Scenario('orders: single POST', 'orders', order_post, 201),
+        Scenario('orders: status PUT', 'orders', order_put, 200),
+        Scenario('orders: page GET', 'orders', lambda rng: base_event('GET', query={'limit': '50'}), 200),
+        Scenario('privileges: POST', 'privileges', privilege_post, 201),
+        Scenario('privileges: soft DELETE', 'privileges', privilege_delete, 200),
+    ]
+
+
+def prepare_write_targets() -> Dict[str, Any]:
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute('SELECT COALESCE(max(id), 0) FROM orders')
+    max_order_id = cur.fetchone()[0]
+    cur.execute(
+        """
+        INSERT INTO privileges (name, description, price, features, is_active)
+        SELECT 'Bench delete target ' || g, 'Soft-deleted by the load benchmark', 1, ARRAY[]::text[], false
+        FROM generate_series(1, 20) g
+        RETURNING id
+        """
+    )
+    delete_ids = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    conn.close()
+    return {'max_order_id': max_order_id, 'delete_ids': delete_ids}
+
+
+def all_scenarios(targets: Dict[str, Any]) -> List[Scenario]:
+    return tests_json_scenarios() + write_scenarios(targets['max_order_id'], targets['delete_ids'])
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+COLD_PROBE = """
+import importlib.util, json, os, sys, time
+started = time.perf_counter()
+modules = len(sys.modules)
+name, event = json.loads(sys.stdin.read())
+spec = importlib.util.spec_from_file_location(name + '_index', os.path.join(name, 'index.py'))
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+imported_modules = len(sys.modules) - modules
+psycopg2_at_import = 'psycopg2' in sys.modules
+module.handler(event, None)
+finished = time.perf_counter()
+print(json.dumps({
+    'cold_import_ms': (imported - started) * 1000,
+    'cold_first_request_ms': (finished - imported) * 1000,
+    'cold_total_ms': (finished - started) * 1000,
+    'cold_imported_modules': imported_modules,
+    'cold_psycopg2_at_import': psycopg2_at_import,
+}))
+"""
+
+
+def cold_start(scenario: Scenario) -> Dict[str, Any]:
+    '''
+    Measures import + first request of a scenario in a fresh interpreter that
+    loads nothing but the function itself, so import trimming shows up here.
+    '''
+    event = scenario.make_event(random.Random(0))
+    output = subprocess.run(
+        [sys.executable, '-c', COLD_PROBE],
+        cwd=BACKEND_DIR, input=json.dumps([scenario.function, event]), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_warm(handler: Callable, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    unexpected = 0
+    lock = threading.Lock()
+    seeds = iter(range(requests))
+
+    def one(seed: int) -> None:
+        nonlocal unexpected
+        event = scenario.make_event(random.Random(seed))
+        started = time.perf_counter()
+        response = handler(event, None)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if scenario.expected_status and response['statusCode'] != scenario.expected_status:
+                unexpected += 1
+
+    handler(scenario.make_event(random.Random(-1)), None)
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, seeds))
+    wall = time.perf_counter() - wall_started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'unexpected_status': unexpected,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else 0.0,
+        'throughput_rps': requests / wall if wall else 0.0,
+    }
+
+
+def measure_allocations(handler: Callable, scenario: Scenario, samples: int) -> float:
+    '''Mean peak bytes allocated by Python while serving one request.'''
+    tracemalloc.start()
+    total = 0
+    for seed in range(samples):
+        event = scenario.make_event(random.Random(seed))
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        handler(event, None)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - baseline
+    tracemalloc.stop()
+    return total / samples if samples else 0.0
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions: List[str] = []
+    for name, metrics in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (better == 'lower' and change > threshold) or (better == 'higher' and -change > threshold):
+                regressions.append(f'{name}: {metric} {old:.2f} -> {new:.2f} ({change:+.0%})')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--alloc-samples', type=int, default=20)
+    parser.add_argument('--seed-orders', type=float, default=None)
+    parser.add_argument('--only', default=None, help='run scenarios whose name contains this text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    if args.seed_orders is not None:
+        from benchmarks.seed import prepare_database, seed
+        conn = connect()
+        prepare_database(conn, reset=False)
+        seed(conn, int(args.seed_orders))
+        conn.close()
+
+    targets = prepare_write_targets()
+    scenarios = all_scenarios(targets)
+    handlers: Dict[str, Callable] = {}
+    results: Dict[str, Any] = {
+        'meta': {
+            'orders': targets['max_order_id'],
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+        },
+        'scenarios': {},
+    }
+
+    for scenario in scenarios:
+        if args.only and args.only not in scenario.name:
+            continue
+        if scenario.function not in handlers:
+            handlers[scenario.function] = load_function(scenario.function).handler
+        handler = handlers[scenario.function]
+
+        metrics = cold_start(scenario)
+        metrics.update(run_warm(handler, scenario, args.requests, args.concurrency))
+        metrics['alloc_bytes_per_request'] = measure_allocations(handler, scenario, args.alloc_samples)
+        results['scenarios'][scenario.name] = metrics
+        print(
+            f"{scenario.name:<40} cold {metrics['cold_total_ms']:7.1f} ms | "
+            f"p50 {metrics['p50_ms']:6.2f} p95 {metrics['p95_ms']:6.2f} p99 {metrics['p99_ms']:6.2f} ms | "
+            f"{metrics['throughput_rps']:8.1f} rps | {metrics['alloc_bytes_per_request'] / 1024:7.1f} KiB/req"
+            + (f" | {metrics['unexpected_status']} unexpected status" if metrics['unexpected_status'] else '')
+        )
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+        for line in regressions:
+            print(f'  {line}')
+        sys.exit(1)
+    print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
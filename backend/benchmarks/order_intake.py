@@ -0,0 +1,157 @@
+'''
+Business: Order intake throughput and tail latency, one transaction per order vs group commit
+Args: --requests orders POSTed per run, --concurrency comma separated worker thread counts,
+      --window-ms and --max-batch group commit settings, --synchronous-commit comma separated
+      levels to compare (empty keeps the server default), --no-idempotency to omit the keys,
+      --json to print raw results
+Returns: table of orders/sec, p50 and p99 latency and mean batch size for each configuration
+
+Every request goes through the orders handler with its own Idempotency-Key, the
+way the storefront sends them, against a scratch schema with the pool sized to
+the worker count so connection churn does not blur the comparison.
+
+Usage: DATABASE_URL=postgres://localhost/scratch python -m benchmarks.order_intake --concurrency 1,8,32
+'''
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+SCHEMA = 'bench_order_intake'
+
+os.environ['PGOPTIONS'] = f'-c search_path={SCHEMA}'
+os.environ.setdefault('REQUEST_TIMING_LOG', '0')
+
+from benchmarks._common import connect, create_scratch_schema, load_function, parse_sizes
+from benchmarks.load import percentile
+
+MODES = ('current', 'group')
+
+def create_idempotency_table(conn: Any) -> None:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE order_idempotency_keys (
+            idempotency_key VARCHAR(128) PRIMARY KEY,
+            order_id INTEGER,
+            request_hash CHAR(64) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL
+        )
+        """
+    )
+    conn.commit()
+    cur.close()
+
+def load_orders(mode: str, window_ms: float, max_batch: int, synchronous_commit: Optional[str]) -> Any:
+    '''Imports a fresh copy of the orders function configured for one run.'''
+    os.environ['ORDERS_GROUP_COMMIT'] = '1' if mode == 'group' else '0'
+    os.environ['ORDERS_GROUP_COMMIT_WINDOW_MS'] = str(window_ms)
+    os.environ['ORDERS_GROUP_COMMIT_MAX_BATCH'] = str(max_batch)
+    os.environ['ORDERS_SYNCHRONOUS_COMMIT'] = synchronous_commit or ''
+    return load_function('orders')
+
+def order_event(run: str, i: int, idempotency: bool) -> Dict[str, Any]:
+    return {
+        'httpMethod': 'POST',
+        'headers': {'Idempotency-Key': f'{run}-{i}'} if idempotency else {},
+        'body': json.dumps({
+            'privilege_id': 1 + i % 10,
+            'player_name': f'bench_player_{i}',
+            'player_email': f'bench_player_{i}@example.com',
+            'player_phone': f'+7900{i:07d}'
+        })
+    }
+
+def run_intake(orders: Any, run: str, requests: int, concurrency: int, idempotency: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failed = 0
+    lock = threading.Lock()
+    
+    def one(i: int) -> None:
+        nonlocal failed
+        event = order_event(run, i, idempotency)
+        started = time.perf_counter()
+        response = orders.handler(event, None)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if response['statusCode'] != 201:
+                failed += 1
+    
+    # Opens the pool's connections and prepares the statements before timing
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(-concurrency, 0)))
+    latencies.clear()
+    failed = 0
+    warmup = orders.order_intake.stats()
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    
+    latencies.sort()
+    stats = orders.order_intake.stats()
+    batches = stats['batches'] - warmup['batches']
+    return {
+        'requests': requests,
+        'failed': failed,
+        'orders_per_second': requests / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_batch': (stats['items'] - warmup['items']) / batches if batches else 1.0,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated worker thread counts')
+    parser.add_argument('--window-ms', type=float, default=5)
+    parser.add_argument('--max-batch', type=int, default=100)
+    parser.add_argument('--synchronous-commit', default='', help='comma separated levels, e.g. on,off')
+    parser.add_argument('--no-idempotency', action='store_true', help='POST orders without Idempotency-Key')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    concurrencies = parse_sizes(args.concurrency)
+    levels = [level.strip() for level in args.synchronous_commit.split(',') if level.strip()] or [None]
+    os.environ['DB_POOL_MAX_IDLE'] = str(max(concurrencies))
+    
+    conn = connect()
+    create_scratch_schema(conn, SCHEMA)
+    create_idempotency_table(conn)
+    
+    results = []
+    for level in levels:
+        for concurrency in concurrencies:
+            for mode in MODES:
+                orders = load_orders(mode, args.window_ms, args.max_batch, level)
+                run = f'{mode}-{level}-{concurrency}'
+                result = run_intake(orders, run, args.requests, concurrency, not args.no_idempotency)
+                results.append(dict(result, mode=mode, concurrency=concurrency, synchronous_commit=level or 'default'))
+    
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+    conn.close()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{args.requests} orders per run, window {args.window_ms} ms, max batch {args.max_batch}")
+    print(f"{'sync commit':>12} {'threads':>8} {'mode':>8} {'orders/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'batch':>7} {'failed':>7}")
+    for result in results:
+        print(
+            f"{result['synchronous_commit']:>12} {result['concurrency']:>8} {result['mode']:>8} "
+            f"{result['orders_per_second']:>10.0f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['mean_batch']:>7.1f} {result['failed']:>7}"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+'''
+Business: Per-query parse/plan savings of prepared statements on the orders listing
+Args: --orders synthetic orders to seed, --calls executions per shape, --limit page size,
+      --json to print raw results
+Returns: table of mean latency and server planning time, plain SQL vs EXECUTE by name,
+         for the first page, a status-filtered page and a keyset (cursor) page
+
+Usage: DATABASE_URL=postgres://localhost/scratch python -m benchmarks.prepared
+'''
+
+import argparse
+import json
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from benchmarks._common import SEED_EPOCH, connect, create_scratch_schema, load_function, seed_orders
+
+SCHEMA = 'bench_prepared'
+
+def shapes(orders: int, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    cursor_at = SEED_EPOCH + timedelta(seconds=orders // 2)
+    return [
+        ('first page', {'limit': limit}),
+        ('status filter', {'status': 'pending', 'limit': limit}),
+        ('cursor page', {'cursor_at': cursor_at, 'cursor_id': orders // 2, 'limit': limit}),
+    ]
+
+def page_query(orders_module: Any, params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    query_params: Dict[str, Any] = {'limit': params['limit']}
+    if 'status' in params:
+        query_params['status'] = params['status']
+    if 'cursor_at' in params:
+        query_params['cursor'] = orders_module.encode_cursor(params['cursor_at'], params['cursor_id'])
+    where, args, limit = orders_module.parse_list_params(query_params)
+    return where, [*args, limit + 1]
+
+def planning_ms(cur: Any, sql: str, args: List[Any]) -> float:
+    cur.execute('EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) ' + sql, args)
+    return cur.fetchone()[0][0]['Planning Time']
+
+def time_calls(run: Any, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        run()
+    return (time.perf_counter() - started) / calls * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=float, default=1e5)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    orders = load_function('orders')
+    conn = connect()
+    conn.autocommit = True
+    create_scratch_schema(conn, SCHEMA)
+    seed_orders(conn, 0, int(args.orders))
+    cur = conn.cursor()
+    
+    results = []
+    for label, params in shapes(int(args.orders), args.limit):
+        where, query_args = page_query(orders, params)
+        plain_sql = orders.ORDER_PAGE_SQL.format(where=where)
+        statement = orders.ORDER_PAGE.variant(where=where)
+        
+        def plain() -> None:
+            cur.execute(plain_sql, query_args)
+            cur.fetchall()
+        
+        def prepared() -> None:
+            statement.execute(cur, query_args)
+            cur.fetchall()
+        
+        # Warm both paths; the prepared one switches to a generic plan after five custom ones
+        for _ in range(10):
+            plain()
+            prepared()
+        
+        plain_ms = time_calls(plain, args.calls)
+        prepared_ms = time_calls(prepared, args.calls)
+        results.append({
+            'shape': label,
+            'plain': {'mean_ms': plain_ms, 'planning_ms': planning_ms(cur, plain_sql, query_args)},
+            'prepared': {
+                'mean_ms': prepared_ms,
+                'planning_ms': planning_ms(cur, statement.execute_sql, query_args),
+            },
+        })
+    
+    cur.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+    conn.close()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{int(args.orders)} orders, {args.calls} calls per shape, page size {args.limit}")
+    print(f"{'shape':>14} {'path':>9} {'mean ms':>10} {'plan ms':>10}")
+    for result in results:
+        for path in ('plain', 'prepared'):
+            stats = result[path]
+            print(f"{result['shape']:>14} {path:>9} {stats['mean_ms']:>10.3f} {stats['planning_ms']:>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+'''
+Business: Build a local benchmark database from db_migrations and fill it with synthetic data
+Args: --orders number of orders to generate (1e3 .. 1e7), --reset to drop the schema first
+Returns: a schema laid out exactly like production, ready for the load runner
+
+Usage: DATABASE_URL=postgres://localhost/bench python -m benchmarks.seed --orders 1e6 --reset
+'''
+
+import argparse
+import os
+from datetime import timedelta
+from typing import Any, List
+
+from benchmarks._common import MIGRATIONS_DIR, SEED_EPOCH, SITE_SCHEMA, connect, seed_orders
+from maintenance.order_partitions import add_months, partition_name
+
+def migration_files() -> List[str]:
+    files = [name for name in os.listdir(MIGRATIONS_DIR) if name.startswith('V') and name.endswith('.sql')]
+    return [os.path.join(MIGRATIONS_DIR, name) for name in sorted(files, key=lambda n: int(n[1:].split('__')[0]))]
+
+def prepare_database(conn: Any, reset: bool) -> None:
+    '''Applies every migration into SITE_SCHEMA, the schema production functions run in.'''
+    cur = conn.cursor()
+    if reset:
+        cur.execute(f'DROP SCHEMA IF EXISTS {SITE_SCHEMA} CASCADE')
+    cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SITE_SCHEMA}')
+    cur.execute(f'SET search_path TO {SITE_SCHEMA}, public')
+    cur.execute("SELECT to_regclass('admins') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        for path in migration_files():
+            with open(path) as f:
+                cur.execute(f.read())
+    conn.commit()
+    cur.close()
+
+def create_seed_partitions(cur: Any, orders: int) -> None:
+    '''Monthly orders partitions covering the synthetic created_at range.'''
+    month = SEED_EPOCH.date().replace(day=1)
+    last = (SEED_EPOCH + timedelta(seconds=orders)).date()
+    while month <= last:
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF orders FOR VALUES FROM (%s) TO (%s)",
+            (month, add_months(month, 1))
+        )
+        month = add_months(month, 1)
+
+def seed(conn: Any, orders: int) -> None:
+    cur = conn.cursor()
+    cur.execute(f'SET search_path TO {SITE_SCHEMA}, public')
+    cur.execute('SELECT count(*) FROM privileges')
+    if cur.fetchone()[0] < 10:
+        cur.execute(
+            """
+            INSERT INTO privileges (name, description, price, features, image_url)
+            SELECT 'Privilege ' || g, 'Benchmark privilege ' || g, 50 * g, ARRAY['fly', 'kit', 'home'], NULL
+            FROM generate_series(1, 10) g
+            """
+        )
+    create_seed_partitions(cur, orders)
+    cur.execute('SELECT COALESCE(max(id), 0) FROM orders')
+    existing = cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    
+    seed_orders(conn, existing, orders)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=float, default=1e4)
+    parser.add_argument('--reset', action='store_true')
+    args = parser.parse_args()
+    
+    conn = connect()
+    prepare_database(conn, args.reset)
+    seed(conn, int(args.orders))
+    conn.close()
+    print(f'Seeded {SITE_SCHEMA} with {int(args.orders)} orders')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+'''
+Business: Landing page bootstrap (site content, active privileges and FAQs in one round trip)
+Args: event - dict with httpMethod, headers, queryStringParameters
+      context - object with attributes: request_id, function_name
+Returns: HTTP response dict
+'''
+
+import os
+import sys
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shared.cache import poll_invalidations, response_cache
+from shared.db import pooled_connection
+from shared.http import cached_json_response, etag_matches, make_etag, not_modified_response
+from shared.prepared import PreparedStatement
+from shared.routing import Router
+from shared.timing import instrumented
+from shared.versions import fetch_versions
+
+SOURCES = ('faqs', 'privileges', 'site_content')
+
+BOOTSTRAP_SQL = """
+    SELECT json_build_object(
+        'content', COALESCE(
+            (SELECT json_object_agg(key, value) FROM site_content),
+            '{}'::json
+        ),
+        'privileges', COALESCE(
+            (SELECT json_agg(json_build_object(
+                'id', id,
+                'name', name,
+                'description', description,
+                'price', price::float8,
+                'features', features,
+                'is_active', is_active,
+                'image_url', image_url
+            ) ORDER BY price)
+            FROM privileges WHERE is_active = true),
+            '[]'::json
+        ),
+        'faqs', COALESCE(
+            (SELECT json_agg(json_build_object(
+                'id', id,
+                'question', question,
+                'answer', answer,
+                'order_index', order_index
+            ) ORDER BY order_index, id)
+            FROM faqs),
+            '[]'::json
+        )
+    )::text
+"""
+
+BOOTSTRAP = PreparedStatement('bootstrap', BOOTSTRAP_SQL)
+
+def get_bootstrap(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    poll_invalidations()
+    cached = response_cache.get('bootstrap')
+    if cached:
+        return cached_json_response(event, cached, 'HIT')
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        
+        versions = fetch_versions(cur, SOURCES)
+        version = '.'.join(str(versions[name]) for name in SOURCES)
+        cached = response_cache.revalidate('bootstrap', version)
+        if cached:
+            cur.close()
+            return cached_json_response(event, cached, 'REVALIDATED')
+        
+        etag = make_etag('bootstrap', version)
+        if etag_matches(event, etag):
+            cur.close()
+            return not_modified_response(etag)
+        
+        BOOTSTRAP.execute(cur)
+        body = cur.fetchone()[0]
+        
+        cur.close()
+    
+    entry = response_cache.put('bootstrap', version, etag, body, depends_on=SOURCES)
+    return cached_json_response(event, entry, 'MISS')
+
+router = Router(
+    {'GET': get_bootstrap},
+    allow_headers=('Content-Type', 'If-None-Match'),
+    expose_headers=('ETag', 'X-Cache')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
@@ -7,102 +7,89 @@ Returns: HTTP response dict
 
 import json
 import os
-import psycopg2
+import sys
 from typing import Dict, Any
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Session',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
+from shared.cache import poll_invalidations, response_cache
+from shared.db import pooled_connection
+from shared.http import cached_json_response, etag_matches, make_etag, not_modified_response
+from shared.prepared import PreparedStatement
+from shared.routing import Router, error_response, json_response
+from shared.serialize import dumps
+from shared.sessions import admin_only
+from shared.snapshots import publish_after_write
+from shared.timing import instrumented
+from shared.versions import fetch_version
+
+SITE_CONTENT = PreparedStatement('site_content', "SELECT key, value FROM site_content")
+
+UPSERT_CONTENT = PreparedStatement('upsert_content', """
+    INSERT INTO site_content (key, value, updated_at)
+    VALUES (%s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (key)
+    DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
+""")
+
+def get_content(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    poll_invalidations()
+    cached = response_cache.get('site_content')
+    if cached:
+        return cached_json_response(event, cached, 'HIT')
     
-    if method == 'GET':
-        cur.execute("SELECT key, value FROM site_content")
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        version = fetch_version(cur, 'site_content')
+        etag = make_etag('content', version)
+        cached = response_cache.revalidate('site_content', version)
+        if etag_matches(event, etag):
+            cur.close()
+            return not_modified_response(etag)
+        if cached:
+            cur.close()
+            return cached_json_response(event, cached, 'REVALIDATED')
+        
+        SITE_CONTENT.execute(cur)
         rows = cur.fetchall()
         
         content = {row[0]: row[1] for row in rows}
         
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(content),
-            'isBase64Encoded': False
-        }
     
-    if method == 'PUT':
-        body_data = json.loads(event.get('body', '{}'))
-        key = body_data.get('key')
-        value = body_data.get('value')
-        
-        if not key or not value:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Key and value required'}),
-                'isBase64Encoded': False
-            }
-        
-        cur.execute(
-            """
-            INSERT INTO site_content (key, value, updated_at) 
-            VALUES (%s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (key) 
-            DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
-            """,
-            (key, value)
-        )
+    body = dumps(content)
+    entry = response_cache.put('site_content', version, etag, body)
+    return cached_json_response(event, entry, 'MISS')
+
+@admin_only
+def update_content(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    key = body_data.get('key')
+    value = body_data.get('value')
+    
+    if not key or not value:
+        return error_response(400, 'Key and value required')
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        UPSERT_CONTENT.execute(cur, (key, value))
         
         conn.commit()
+        response_cache.invalidate('site_content')
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True, 'key': key, 'value': value}),
-            'isBase64Encoded': False
-        }
-    
-    cur.close()
-    conn.close()
+    publish_after_write()
     
-    return {
-        'statusCode': 405,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Method not allowed'}),
-        'isBase64Encoded': False
-    }
+    return json_response(200, {'success': True, 'key': key, 'value': value})
+
+router = Router(
+    {
+        'GET': get_content,
+        'PUT': update_content
+    },
+    allow_headers=('Content-Type', 'X-Admin-Session', 'If-None-Match'),
+    expose_headers=('ETag', 'X-Cache')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
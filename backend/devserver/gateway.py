@@ -0,0 +1,293 @@
+'''
+Business: Local gateway that hosts every backend function in one asyncio process
+Args: --host/--port to bind, --workers handler thread pool size, --queue max requests
+      waiting for a worker before the gateway answers 503
+Returns: HTTP server translating requests into the handler(event, context) contract
+
+Usage: DATABASE_URL=postgres://localhost/minecraft python -m devserver.gateway --port 8000
+Functions are mounted at /<name>/ and at the path of their func2url.json URL, so the
+frontend can be pointed at http://localhost:8000 by swapping only the host. With
+SNAPSHOT_DIR set, published snapshots are served at /snapshots/ the way a CDN would.
+'''
+
+import argparse
+import asyncio
+import base64
+import importlib.util
+import json
+import os
+import secrets
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from types import ModuleType
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class LocalContext:
+    '''Mimics the attributes of the cloud runtime context object that handlers read.'''
+
+    def __init__(self, function_name: str):
+        self.request_id = str(uuid.uuid4())
+        self.function_name = function_name
+        self.function_version = 'local'
+        self.memory_limit_in_mb = 128
+
+
+def load_function(name: str) -> ModuleType:
+    path = os.path.join(BACKEND_DIR, name, 'index.py')
+    spec = importlib.util.spec_from_file_location(f'{name}_index', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover_functions() -> Dict[str, str]:
+    '''
+    Maps mount prefixes to function names: every func2url.json entry under both
+    /<name> and its URL path, plus any function directory not deployed yet.
+    '''
+    with open(os.path.join(BACKEND_DIR, 'func2url.json')) as f:
+        func2url: Dict[str, str] = json.load(f)
+
+    mounts: Dict[str, str] = {}
+    for name, url in func2url.items():
+        mounts[f'/{name}'] = name
+        url_path = urlsplit(url).path.rstrip('/')
+        if url_path:
+            mounts[url_path] = name
+
+    for entry in sorted(os.listdir(BACKEND_DIR)):
+        if os.path.isfile(os.path.join(BACKEND_DIR, entry, 'index.py')):
+            mounts.setdefault(f'/{entry}', entry)
+    return mounts
+
+
+def build_event(method: str, path: str, query: str, headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+    try:
+        text_body, is_base64 = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text_body, is_base64 = base64.b64encode(body).decode(), True
+
+    return {
+        'httpMethod': method,
+        'path': path or '/',
+        'headers': headers,
+        'queryStringParameters': dict(parse_qsl(query, keep_blank_values=True)),
+        'body': text_body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {'requestId': str(uuid.uuid4()), 'httpMethod': method},
+    }
+
+
+def encode_response(response: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+    body = response.get('body') or ''
+    if response.get('isBase64Encoded'):
+        payload = base64.b64decode(body)
+    else:
+        payload = body.encode('utf-8') if isinstance(body, str) else bytes(body)
+    headers = {str(k): str(v) for k, v in (response.get('headers') or {}).items()}
+    return int(response.get('statusCode', 200)), headers, payload
+
+
+class Gateway:
+    def __init__(self, workers: int, queue_limit: int):
+        self.mounts = discover_functions()
+        self.handlers: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]] = {}
+        for name in sorted(set(self.mounts.values())):
+            self.handlers[name] = load_function(name).handler
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='handler')
+        self.slots = asyncio.Semaphore(workers + queue_limit)
+        self.stats: Dict[str, Dict[str, float]] = {
+            name: {'requests': 0, 'errors': 0, 'total_ms': 0.0} for name in self.handlers
+        }
+
+    def route(self, path: str) -> Optional[Tuple[str, str]]:
+        best: Optional[str] = None
+        for prefix in self.mounts:
+            if (path == prefix or path.startswith(prefix + '/')) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        if best is None:
+            return None
+        return self.mounts[best], path[len(best):] or '/'
+
+    def call(self, name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        stats = self.stats[name]
+        try:
+            return self.handlers[name](event, LocalContext(name))
+        except Exception:
+            stats['errors'] += 1
+            traceback.print_exc()
+            return {
+                'statusCode': 500,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Unhandled exception in handler'}),
+                'isBase64Encoded': False,
+            }
+        finally:
+            stats['requests'] += 1
+            stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        from shared.instancestats import instance_stats
+
+        return {'functions': self.stats, **instance_stats()}
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        url = urlsplit(target)
+        if url.path == '/__stats':
+            return 200, {'Content-Type': 'application/json'}, json.dumps(self.snapshot(), indent=2).encode()
+
+        if url.path.startswith('/snapshots/'):
+            return serve_snapshot(url.path[len('/snapshots/'):], headers)
+
+        routed = self.route(url.path)
+        if routed is None:
+            return 404, {'Content-Type': 'application/json'}, json.dumps({'error': 'No function mounted here'}).encode()
+
+        if self.slots.locked():
+            return 503, {'Content-Type': 'application/json', 'Retry-After': '1'}, b'{"error": "Gateway overloaded"}'
+
+        name, sub_path = routed
+        event = build_event(method, sub_path, url.query, headers, body)
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, self.call, name, event)
+        return encode_response(response)
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                status, response_headers, payload = await self.dispatch(method, target, headers, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(render_response(status, response_headers, payload, keep_alive, method == 'HEAD'))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            writer.write(render_response(400, {'Content-Type': 'text/plain'}, str(e).encode(), False, False))
+        finally:
+            writer.close()
+
+
+def serve_snapshot(name: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+    '''Serves a published snapshot file, preferring its precompressed sibling.'''
+    from shared.snapshots import MANIFEST_NAME, snapshot_dir
+
+    directory = snapshot_dir()
+    if not directory or not name.endswith('.json') or '/' in name or name.startswith('.'):
+        return 404, {'Content-Type': 'application/json'}, b'{"error": "No snapshot here"}'
+
+    path = os.path.join(directory, name)
+    response_headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Cache-Control': 'no-cache' if name == MANIFEST_NAME else 'public, max-age=31536000, immutable',
+        'Vary': 'Accept-Encoding',
+    }
+    accepted = headers.get('accept-encoding', '')
+    if name != MANIFEST_NAME:
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in accepted and os.path.exists(path + suffix):
+                path += suffix
+                response_headers['Content-Encoding'] = encoding
+                break
+    try:
+        with open(path, 'rb') as f:
+            return 200, response_headers, f.read()
+    except OSError:
+        return 404, {'Content-Type': 'application/json'}, b'{"error": "No snapshot here"}'
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError('Request headers too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise ValueError('Malformed request line')
+
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        key, _, value = line.partition(':')
+        headers[key.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        raise ValueError('Chunked request bodies are not supported')
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise ValueError('Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, version, headers, body
+
+
+def render_response(status: int, headers: Dict[str, str], payload: bytes, keep_alive: bool, head_only: bool) -> bytes:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines: List[str] = [f'HTTP/1.1 {status} {reason}']
+    for key, value in headers.items():
+        if key.lower() not in ('content-length', 'connection'):
+            lines.append(f'{key}: {value}')
+    lines.append(f'Content-Length: {len(payload)}')
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head if head_only else head + payload
+
+
+async def serve(host: str, port: int, workers: int, queue_limit: int) -> None:
+    os.environ.setdefault('DB_POOL_MAX_IDLE', str(workers))
+    # Admin routes refuse to run without a signing key; a per-run one keeps the local admin UI working
+    os.environ.setdefault('ADMIN_SESSION_SECRET', secrets.token_hex(32))
+    gateway = Gateway(workers, queue_limit)
+    server = await asyncio.start_server(gateway.serve_connection, host, port, limit=MAX_HEADER_BYTES)
+    for prefix, name in sorted(gateway.mounts.items()):
+        print(f'  {prefix:<45} -> {name}')
+    print(f'Serving {len(gateway.handlers)} functions on http://{host}:{port} with {workers} workers')
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--queue', type=int, default=256)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+'''
+Business: Privilege fulfillment worker, its pipelined RCON client and a fake RCON server
+'''
@@ -0,0 +1,129 @@
+'''
+Business: Local fake Minecraft RCON server for fulfillment tests and benchmarks
+Args: --host/--port to bind, --password, --latency-ms per command (applied serially per
+      connection, like the server's main thread), --rtt-ms delay before each reply reaches
+      the client (network round trip), --fail-rate fraction of commands answered
+      with an error reply, --drop-every close the connection after every N commands
+Returns: TCP server speaking the Source RCON protocol; prints command totals on exit
+
+Usage: python -m fulfillment.fake_rcon --port 25575 --password secret --latency-ms 2
+'''
+
+import argparse
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+from fulfillment.rcon import (
+    AUTH_FAILED_ID, SERVERDATA_AUTH, SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE,
+    RconError, encode_packet, read_packet
+)
+
+SERVERDATA_AUTH_RESPONSE = 2
+
+
+class FakeRconServer:
+    def __init__(self, password: str, latency_ms: float = 0.0, rtt_ms: float = 0.0,
+                 fail_rate: float = 0.0, drop_every: int = 0, seed: int = 0):
+        self.password = password
+        self.latency = latency_ms / 1000
+        self.rtt = rtt_ms / 1000
+        self.fail_rate = fail_rate
+        self.drop_every = drop_every
+        self.random = random.Random(seed)
+        self.commands: List[str] = []
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        '''Starts listening and returns the bound port (pass 0 for a free one).'''
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Closing the sockets lets every session finish on EOF instead of being cancelled
+        for writer in self._sessions.values():
+            writer.close()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+
+    def reply_for(self, command: str) -> str:
+        if self.fail_rate and self.random.random() < self.fail_rate:
+            return 'Error: unknown or incomplete command'
+        return 'OK'
+
+    def _reply(self, writer: asyncio.StreamWriter, packet: bytes) -> None:
+        if not self.rtt:
+            writer.write(packet)
+            return
+        # Replies keep their order: every one is delayed by the same amount
+        asyncio.get_running_loop().call_later(
+            self.rtt, lambda: writer.is_closing() or writer.write(packet)
+        )
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        session = asyncio.current_task()
+        self._sessions[session] = writer
+        authenticated = False
+        handled = 0
+        try:
+            while True:
+                request_id, packet_type, body = await read_packet(reader)
+                if packet_type == SERVERDATA_AUTH:
+                    authenticated = body == self.password
+                    writer.write(encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, ''))
+                    writer.write(encode_packet(
+                        request_id if authenticated else AUTH_FAILED_ID, SERVERDATA_AUTH_RESPONSE, ''
+                    ))
+                elif packet_type == SERVERDATA_EXECCOMMAND and authenticated:
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.commands.append(body)
+                    self._reply(writer, encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, self.reply_for(body)))
+                    handled += 1
+                    if self.drop_every and handled % self.drop_every == 0:
+                        await writer.drain()
+                        break
+                else:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, RconError):
+            pass
+        finally:
+            self._sessions.pop(session, None)
+            writer.close()
+
+
+async def serve_forever(args: argparse.Namespace) -> None:
+    server = FakeRconServer(args.password, args.latency_ms, args.rtt_ms, args.fail_rate, args.drop_every)
+    port = await server.start(args.host, args.port)
+    print(f'Fake RCON listening on {args.host}:{port}')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f'Handled {len(server.commands)} commands over {server.connections} connections')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=25575)
+    parser.add_argument('--password', default='')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--rtt-ms', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--drop-every', type=int, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+'''
+Business: Persistent, pipelined RCON client (Source RCON protocol, as spoken by Minecraft)
+Args: RconClient(host, port, password, max_in_flight, timeout, retries)
+Returns: RconClient with async connect(), command() and close()
+
+Commands are written back to back without waiting for earlier replies; replies
+are matched to commands by request id. max_in_flight bounds how many commands
+are outstanding on the connection at once.
+'''
+
+import asyncio
+import struct
+from typing import Dict, Optional
+
+SERVERDATA_AUTH = 3
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+AUTH_FAILED_ID = -1
+MAX_PACKET_BYTES = 4096 + 10
+
+_HEADER = struct.Struct('<iii')
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+def encode_packet(request_id: int, packet_type: int, body: str) -> bytes:
+    payload = body.encode('utf-8') + b'\x00\x00'
+    return _HEADER.pack(len(payload) + 8, request_id, packet_type) + payload
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple:
+    '''Returns (request_id, packet_type, body) of the next packet.'''
+    size = struct.unpack('<i', await reader.readexactly(4))[0]
+    if size < 10 or size > MAX_PACKET_BYTES:
+        raise RconError(f'Invalid packet size {size}')
+    data = await reader.readexactly(size)
+    request_id, packet_type = struct.unpack('<ii', data[:8])
+    return request_id, packet_type, data[8:-2].decode('utf-8', errors='replace')
+
+
+class RconClient:
+    def __init__(self, host: str, port: int, password: str, max_in_flight: int = 32,
+                 timeout: float = 5.0, retries: int = 3, retry_delay: float = 0.2):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self.counters = {
+            'commands': 0,
+            'retries': 0,
+            'reconnects': 0,
+        }
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _request_id(self) -> int:
+        self._next_id = self._next_id % 0x7FFFFFFF + 1
+        return self._next_id
+
+    async def connect(self) -> None:
+        async with self._connect_lock:
+            if self.connected:
+                return
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            request_id = self._request_id()
+            writer.write(encode_packet(request_id, SERVERDATA_AUTH, self.password))
+            await writer.drain()
+            while True:
+                reply_id, packet_type, _ = await asyncio.wait_for(read_packet(reader), self.timeout)
+                # Servers send an empty RESPONSE_VALUE before the AUTH_RESPONSE
+                if packet_type != SERVERDATA_RESPONSE_VALUE:
+                    break
+            if reply_id == AUTH_FAILED_ID:
+                writer.close()
+                raise RconAuthError('RCON authentication failed')
+            self._reader, self._writer = reader, writer
+            self._read_task = asyncio.ensure_future(self._read_loop(reader, writer))
+            self.counters['reconnects'] += 1
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_id, _, body = await read_packet(reader)
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(body)
+        except (asyncio.IncompleteReadError, ConnectionError, RconError) as e:
+            self._drop(e, writer)
+        except asyncio.CancelledError:
+            self._drop(RconError('Connection closed'), writer)
+            raise
+
+    def _drop(self, error: Exception, writer: Optional[asyncio.StreamWriter]) -> None:
+        '''Fails every outstanding command so callers can retry on a new connection.'''
+        if writer is not None:
+            writer.close()
+        if writer is not self._writer:
+            return
+        self._reader = self._writer = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RconError(f'Connection lost: {error}'))
+
+    async def _send(self, command: str) -> str:
+        await self.connect()
+        writer = self._writer
+        if writer is None:
+            raise RconError('Connection lost')
+        request_id = self._request_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            async with self._write_lock:
+                writer.write(encode_packet(request_id, SERVERDATA_EXECCOMMAND, command))
+                await writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # A reply that never comes means the stream can no longer be trusted
+            self._drop(RconError('Timed out'), writer)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def command(self, command: str) -> str:
+        '''Runs one command, reconnecting and retrying on transport errors.'''
+        async with self._slots:
+            attempt = 0
+            while True:
+                try:
+                    reply = await self._send(command)
+                    self.counters['commands'] += 1
+                    return reply
+                except RconAuthError:
+                    raise
+                except (RconError, ConnectionError, OSError, asyncio.TimeoutError):
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                    self.counters['retries'] += 1
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+        self._drop(RconError('Client closed'), self._writer)
@@ -0,0 +1,255 @@
+'''
+Business: Grant purchased privileges on the Minecraft server by draining pending orders
+Args: --batch-size orders claimed per transaction, --once to stop when the queue is empty;
+      RCON_HOST, RCON_PORT, RCON_PASSWORD, RCON_MAX_IN_FLIGHT, RCON_TIMEOUT, RCON_RETRIES;
+      FULFILLMENT_COMMAND - grant template with {player}, {group}, {privilege_id}, {order_id};
+      FULFILLMENT_GROUPS - JSON object mapping privilege ids or names to permission groups;
+      FULFILLMENT_LEASE_SECONDS - how long a claimed order stays with one worker;
+      FULFILLMENT_FAILURE_PATTERN - regex marking an RCON reply as a failed grant
+Returns: per-batch counts of completed, failed and deferred orders (printed)
+
+Each batch claims pending orders with FOR UPDATE SKIP LOCKED, moves them to
+'processing' with a lease and commits before any RCON traffic, so no row lock
+is held while a server is slow. The grant commands are pipelined over one RCON
+connection and every outcome is written back in a single UPDATE. Orders whose
+command could not be delivered go back to pending; orders of a worker that died
+are claimed again once their lease runs out.
+
+Every privilege needs a permission group: FULFILLMENT_GROUPS first, otherwise
+its name transliterated to Latin. The worker refuses to start (or stops at its
+next idle check) while any privilege has none, instead of failing its orders.
+
+Usage: DATABASE_URL=... RCON_PASSWORD=... python -m fulfillment.worker
+'''
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from fulfillment.rcon import RconAuthError, RconClient
+
+COMMAND_TEMPLATE = os.environ.get('FULFILLMENT_COMMAND', 'lp user {player} parent add {group}')
+FAILURE_PATTERN = re.compile(
+    os.environ.get('FULFILLMENT_FAILURE_PATTERN', r'(?i)\b(error|unknown|not found|invalid)\b')
+)
+LEASE_SECONDS = float(os.environ.get('FULFILLMENT_LEASE_SECONDS', 300))
+PLAYER_NAME = re.compile(r'^[A-Za-z0-9_]{3,16}$')
+GROUP_NAME = re.compile(r'^[a-z0-9_-]+$')
+
+TRANSLITERATION = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+})
+
+PRIVILEGES_SQL = "SELECT id, name FROM privileges ORDER BY id"
+
+CLAIM_SQL = """
+    UPDATE orders AS o
+    SET status = 'processing', fulfillment_lease_until = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+    FROM (
+        SELECT id, created_at
+        FROM orders
+        WHERE privilege_id = ANY(%s)
+          AND (status = 'pending' OR (status = 'processing' AND fulfillment_lease_until < CURRENT_TIMESTAMP))
+        ORDER BY created_at, id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ) AS c
+    WHERE o.id = c.id AND o.created_at = c.created_at
+    RETURNING o.id, o.created_at, o.player_name, o.privilege_id, o.fulfillment_lease_until
+"""
+
+# The lease check skips orders an admin changed meanwhile or another worker re-claimed
+RECORD_SQL = """
+    UPDATE orders AS o SET status = v.status, fulfillment_lease_until = NULL
+    FROM (VALUES %s) AS v (id, created_at, status, lease)
+    WHERE o.id = v.id AND o.created_at = v.created_at
+      AND o.status = 'processing' AND o.fulfillment_lease_until = v.lease
+"""
+
+
+class FulfillmentConfigError(Exception):
+    pass
+
+
+def rcon_from_env() -> RconClient:
+    return RconClient(
+        os.environ.get('RCON_HOST', '127.0.0.1'),
+        int(os.environ.get('RCON_PORT', 25575)),
+        os.environ.get('RCON_PASSWORD', ''),
+        max_in_flight=int(os.environ.get('RCON_MAX_IN_FLIGHT', 32)),
+        timeout=float(os.environ.get('RCON_TIMEOUT', 5)),
+        retries=int(os.environ.get('RCON_RETRIES', 3)),
+    )
+
+
+def group_name(privilege_name: Optional[str]) -> str:
+    '''Privilege name as a permission group: lowercase, Cyrillic transliterated, spaces to "_".'''
+    name = (privilege_name or '').lower().translate(TRANSLITERATION).replace(' ', '_')
+    return re.sub(r'[^a-z0-9_-]', '', name)
+
+
+def load_groups(conn: Any) -> Dict[int, str]:
+    '''
+    Permission group of every privilege, keyed by id. Raises FulfillmentConfigError
+    naming each privilege left without a valid group.
+    '''
+    try:
+        overrides = json.loads(os.environ.get('FULFILLMENT_GROUPS') or '{}')
+    except ValueError as e:
+        raise FulfillmentConfigError(f'FULFILLMENT_GROUPS is not valid JSON: {e}') from None
+    cur = conn.cursor()
+    try:
+        cur.execute(PRIVILEGES_SQL)
+        privileges = cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+    
+    groups: Dict[int, str] = {}
+    missing: List[str] = []
+    for privilege_id, name in privileges:
+        group = overrides.get(str(privilege_id), overrides.get(name))
+        if group is None:
+            group = group_name(name)
+        if isinstance(group, str) and GROUP_NAME.match(group):
+            groups[privilege_id] = group
+        else:
+            missing.append(f'{privilege_id} ({name!r})')
+    if missing:
+        raise FulfillmentConfigError(
+            f"No valid permission group for privileges {', '.join(missing)}; add them to FULFILLMENT_GROUPS"
+        )
+    return groups
+
+
+def grant_command(order: Tuple[Any, ...], groups: Dict[int, str]) -> Optional[str]:
+    '''
+    The grant command for a claimed order, or None when the order cannot be
+    granted. Player names are validated (groups were, by load_groups) so nothing
+    a buyer typed can smuggle extra console commands through the template.
+    '''
+    order_id, _, player_name, privilege_id, _ = order
+    if not PLAYER_NAME.match(player_name or ''):
+        return None
+    return COMMAND_TEMPLATE.format(player=player_name, group=groups[privilege_id],
+                                   privilege_id=privilege_id, order_id=order_id)
+
+
+async def grant(rcon: RconClient, order: Tuple[Any, ...], groups: Dict[int, str]) -> Optional[str]:
+    '''Returns the new status for the order, or None to put it back to pending.'''
+    command = grant_command(order, groups)
+    if command is None:
+        return 'failed'
+    try:
+        reply = await rcon.command(command)
+    except RconAuthError:
+        raise
+    except Exception:
+        return None
+    return 'failed' if FAILURE_PATTERN.search(reply) else 'completed'
+
+
+async def run_batch(conn: Any, rcon: RconClient, batch_size: int, groups: Dict[int, str]) -> Dict[str, int]:
+    cur = conn.cursor()
+    try:
+        cur.execute(CLAIM_SQL, (LEASE_SECONDS, list(groups), batch_size))
+        orders = cur.fetchall()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    if not orders:
+        return {'claimed': 0, 'completed': 0, 'failed': 0, 'deferred': 0}
+    
+    statuses: List[Optional[str]] = [None] * len(orders)
+    try:
+        statuses = await asyncio.gather(*(grant(rcon, order, groups) for order in orders))
+    finally:
+        # Undelivered orders, or the whole batch when RCON auth failed, go back to pending
+        outcomes = [
+            (order[0], order[1], status or 'pending', order[4])
+            for order, status in zip(orders, statuses)
+        ]
+        cur = conn.cursor()
+        try:
+            execute_values(cur, RECORD_SQL, outcomes, template='(%s, %s::timestamp, %s, %s::timestamp)',
+                           page_size=len(outcomes))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    
+    return {
+        'claimed': len(orders),
+        'completed': statuses.count('completed'),
+        'failed': statuses.count('failed'),
+        'deferred': statuses.count(None),
+    }
+
+
+async def run(conn: Any, rcon: RconClient, batch_size: int, once: bool = False,
+              idle_sleep: float = 2.0, log: bool = True) -> Dict[str, int]:
+    '''
+    Drains pending orders batch by batch; with once=True stops when none are left.
+    Permission groups are reloaded whenever the queue runs dry, so a privilege
+    added without one stops the worker with FulfillmentConfigError.
+    '''
+    totals = {'claimed': 0, 'completed': 0, 'failed': 0, 'deferred': 0}
+    try:
+        groups = load_groups(conn)
+        while True:
+            started = time.perf_counter()
+            counts = await run_batch(conn, rcon, batch_size, groups)
+            for name, value in counts.items():
+                totals[name] += value
+            if counts['claimed'] and log:
+                elapsed = time.perf_counter() - started
+                print(
+                    f"batch of {counts['claimed']} in {elapsed * 1000:.0f} ms: "
+                    f"{counts['completed']} completed, {counts['failed']} failed, {counts['deferred']} deferred"
+                )
+            if counts['claimed'] < batch_size or counts['deferred'] == counts['claimed']:
+                if once:
+                    return totals
+                await asyncio.sleep(idle_sleep)
+                groups = load_groups(conn)
+    finally:
+        await rcon.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=int(os.environ.get('FULFILLMENT_BATCH_SIZE', 500)))
+    parser.add_argument('--idle-sleep', type=float, default=float(os.environ.get('FULFILLMENT_IDLE_SLEEP', 2)))
+    parser.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        totals = asyncio.run(run(conn, rcon_from_env(), args.batch_size, args.once, args.idle_sleep))
+    except KeyboardInterrupt:
+        return
+    except FulfillmentConfigError as e:
+        raise SystemExit(str(e)) from None
+    finally:
+        conn.close()
+    print(f"Fulfilled {totals['completed']} orders, {totals['failed']} failed, {totals['deferred']} deferred")
+
+
+if __name__ == '__main__':
+    main()
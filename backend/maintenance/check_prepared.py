@@ -0,0 +1,100 @@
+'''
+Business: PREPARE every statement the functions declare against the real schema
+Args: DATABASE_URL - database with the current migrations applied
+Returns: one line per statement and exit code 1 when any fails to prepare
+
+Plain SQL resolves an untyped literal from its context; PREPARE has to infer
+every $n parameter up front and rejects ones it cannot type (e.g. an argument
+of json_build_object). Templates are prepared with the filters their parsers
+produce for a request that uses all of them. Run after migrations and before
+deploying a change to any PreparedStatement.
+
+Usage: DATABASE_URL=... python -m maintenance.check_prepared
+'''
+
+import importlib.util
+import os
+import string
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from shared.prepared import PreparedStatement, registered_statements
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def load_functions() -> Dict[str, Any]:
+    modules = {}
+    for name in sorted(os.listdir(BACKEND_DIR)):
+        path = os.path.join(BACKEND_DIR, name, 'index.py')
+        if os.path.isfile(path):
+            spec = importlib.util.spec_from_file_location(f'{name}_index', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules[name] = module
+    return modules
+
+def template_fields(sql: str) -> List[str]:
+    return [field for _, field, _, _ in string.Formatter().parse(sql) if field]
+
+def sample_parts(modules: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    '''Fills each template the way a request using every filter would.'''
+    orders = modules['orders']
+    where, _, _ = orders.parse_list_params({
+        'status': 'pending',
+        'privilege_id': '1',
+        'from': '2024-01-01',
+        'to': '2024-02-01',
+        'cursor': orders.encode_cursor(datetime(2024, 1, 15), 1),
+    })
+    conditions, _, _ = orders.parse_analytics_params({'from': '2024-01-01', 'to': '2024-02-01'})
+    prefix, substring, _ = orders.parse_search_params({'q': '+7 900 123'})
+    return {
+        'record_auth_attempts': {'values': ', '.join(['(%s, %s, 1, 0)'] * 2)},
+        'order_analytics': {'conditions': conditions},
+        'order_page': {'where': where},
+        'order_page_json': {'where': where},
+        'order_search': {'prefix': prefix, 'substring': substring},
+    }
+
+def check(cur: Any, statement: PreparedStatement) -> str:
+    try:
+        cur.execute(statement.prepare_sql)
+        cur.execute(f'DEALLOCATE {statement.name}')
+        return ''
+    except psycopg2.Error as e:
+        return str(e).strip().splitlines()[0]
+
+def main() -> None:
+    modules = load_functions()
+    samples = sample_parts(modules)
+    statements: List[Tuple[str, Optional[PreparedStatement]]] = []
+    for statement in registered_statements():
+        fields = template_fields(statement.sql)
+        if not fields:
+            statements.append((statement.name, statement))
+        elif statement.name in samples:
+            statements.append((statement.name, statement.variant(**samples[statement.name])))
+        else:
+            statements.append((statement.name, None))
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    conn.autocommit = True
+    cur = conn.cursor()
+    failed = 0
+    try:
+        for name, statement in statements:
+            error = check(cur, statement) if statement is not None else 'template without sample parts'
+            failed += bool(error)
+            print(f"{'FAIL' if error else 'ok':>4} {name}" + (f': {error}' if error else ''))
+    finally:
+        conn.close()
+    
+    print(f'{len(statements) - failed} of {len(statements)} statements prepared')
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+'''
+Business: Fold the order rollup deltas appended by the orders triggers into order_daily_rollups
+Args: none
+Returns: number of rollup rows updated (printed)
+
+Order writes only append to order_rollup_deltas, so concurrent intake never
+waits on a shared rollup row; readers see the unfolded deltas through the
+order_daily_totals view. Run every minute to keep that view cheap.
+
+Usage: DATABASE_URL=... python -m maintenance.fold_order_rollups
+'''
+
+import os
+from typing import Any
+
+import psycopg2
+
+def fold_order_rollups(conn: Any) -> int:
+    '''Moves every committed delta into the rollups in one transaction. Returns rollup rows touched.'''
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT fold_order_rollup_deltas()")
+        folded = cur.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return folded
+
+def main() -> None:
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        folded = fold_order_rollups(conn)
+    finally:
+        conn.close()
+    print(f'Folded deltas into {folded} order rollup rows')
+
+if __name__ == '__main__':
+    main()
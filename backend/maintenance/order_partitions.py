@@ -0,0 +1,172 @@
+'''
+Business: Keep monthly orders partitions ahead of time and archive old ones to gzipped CSV
+Args: ensure [--months-ahead N] - create partitions through N months from now
+      archive --older-than-months N --archive-dir DIR - detach partitions that ended more
+      than N months ago, write them to DIR/orders_pYYYY_MM.csv.gz, then drop them
+Returns: names of the partitions created or archived (printed)
+
+Archived orders stay counted in order_daily_rollups: detaching does not fire the
+delete trigger, so analytics keep their history.
+
+A partition whose export fails is attached back to orders. One left detached by
+a run that died mid-export is still a table of its own, and the next archive
+run picks it up and finishes it.
+
+Usage: DATABASE_URL=... python -m maintenance.order_partitions ensure --months-ahead 3
+'''
+
+import argparse
+import csv
+import gzip
+import os
+import re
+from datetime import date
+from typing import Any, Iterable, List, Tuple
+
+import psycopg2
+
+PARTITION_NAME = re.compile(r'^orders_p(\d{4})_(\d{2})$')
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f'orders_p{month:%Y_%m}'
+
+def monthly(names: Iterable[str]) -> List[Tuple[str, date]]:
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def list_partitions(cur: Any) -> List[Tuple[str, date]]:
+    '''Monthly partitions currently attached to orders, oldest first.'''
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'orders'::regclass
+        """
+    )
+    return monthly(name for (name,) in cur.fetchall())
+
+def list_detached_partitions(cur: Any) -> List[Tuple[str, date]]:
+    '''Monthly partition tables not attached to orders, left by an interrupted archive run.'''
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_class c
+        WHERE c.relkind = 'r'
+          AND NOT c.relispartition
+          AND c.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = 'orders'::regclass)
+        """
+    )
+    return monthly(name for (name,) in cur.fetchall())
+
+def ensure_partitions(conn: Any, months_ahead: int = 3) -> List[str]:
+    '''
+    Creates any missing partition from the current month through months_ahead.
+    Run it well before month end: a month whose rows already landed in
+    orders_default cannot get its partition without moving them first.
+    '''
+    this_month = date.today().replace(day=1)
+    cur = conn.cursor()
+    existing = {name for name, _ in list_partitions(cur)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(this_month, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF orders FOR VALUES FROM (%s) TO (%s)",
+            (month, add_months(month, 1))
+        )
+        created.append(name)
+    conn.commit()
+    cur.close()
+    return created
+
+def archive_partition(conn: Any, name: str, month: date, archive_dir: str, detached: bool = False) -> str:
+    '''
+    Detaches one partition, streams it to a gzipped CSV (written to a temp file
+    and renamed into place), checks the row count and only then drops it. On any
+    failure the partition is attached back; if even that fails it stays a
+    detached table that the next run resumes (detached=True skips the DETACH).
+    '''
+    path = os.path.join(archive_dir, f'{name}.csv.gz')
+    tmp_path = path + '.tmp'
+    cur = conn.cursor()
+    if not detached:
+        # Committed right away: the export must not hold ACCESS EXCLUSIVE on orders
+        cur.execute(f"ALTER TABLE orders DETACH PARTITION {name}")
+        conn.commit()
+    
+    try:
+        cur.execute(f"SELECT count(*) FROM {name}")
+        expected = cur.fetchone()[0]
+        with gzip.open(tmp_path, 'wb', compresslevel=9) as f:
+            cur.copy_expert(f"COPY (SELECT * FROM {name} ORDER BY created_at, id) TO STDOUT WITH CSV HEADER", f)
+            f.flush()
+        with gzip.open(tmp_path, 'rt', newline='') as f:
+            written = sum(1 for _ in csv.reader(f)) - 1
+        if written != expected:
+            raise RuntimeError(f'{name}: archived {written} of {expected} rows')
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        
+        cur.execute(f"DROP TABLE {name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        cur.execute(
+            f"ALTER TABLE orders ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            (month, add_months(month, 1))
+        )
+        conn.commit()
+        raise
+    finally:
+        cur.close()
+    return path
+
+def archive_partitions(conn: Any, older_than_months: int, archive_dir: str) -> List[str]:
+    cutoff = add_months(date.today().replace(day=1), -older_than_months)
+    os.makedirs(archive_dir, exist_ok=True)
+    cur = conn.cursor()
+    resumed = list_detached_partitions(cur)
+    stale = [(name, month) for name, month in list_partitions(cur) if add_months(month, 1) <= cutoff]
+    conn.commit()
+    cur.close()
+    paths = [archive_partition(conn, name, month, archive_dir, detached=True) for name, month in resumed]
+    return paths + [archive_partition(conn, name, month, archive_dir) for name, month in stale]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    ensure = commands.add_parser('ensure')
+    ensure.add_argument('--months-ahead', type=int, default=3)
+    archive = commands.add_parser('archive')
+    archive.add_argument('--older-than-months', type=int, required=True)
+    archive.add_argument('--archive-dir', required=True)
+    args = parser.parse_args()
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        if args.command == 'ensure':
+            names = ensure_partitions(conn, args.months_ahead)
+            print(f'Created {len(names)} partitions: {", ".join(names) or "-"}')
+        else:
+            paths = archive_partitions(conn, args.older_than_months, args.archive_dir)
+            print(f'Archived {len(paths)} partitions: {", ".join(paths) or "-"}')
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+'''
+Business: Publish static snapshots of the public catalog, site content and FAQs
+Args: --dir output directory (defaults to SNAPSHOT_DIR), --force republish even when the
+      cache_versions stamps match the current manifest
+Returns: the manifest now being served (printed)
+
+Usage: DATABASE_URL=... SNAPSHOT_DIR=/srv/snapshots python -m maintenance.publish_snapshots
+Run it after editing FAQs or seeding data directly; privileges and content writes made
+through the functions republish on their own.
+'''
+
+import argparse
+import json
+import os
+
+import psycopg2
+
+from shared.snapshots import publish_snapshots, snapshot_dir
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', dest='directory', default=snapshot_dir())
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error('--dir or SNAPSHOT_DIR is required')
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        manifest = publish_snapshots(conn, args.directory, force=args.force)
+    finally:
+        conn.close()
+    print(('Published' if manifest['changed'] else 'Unchanged') + f' snapshot in {args.directory}')
+    print(json.dumps(manifest['files'], indent=2))
+
+if __name__ == '__main__':
+    main()
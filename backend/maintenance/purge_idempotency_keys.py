@@ -0,0 +1,60 @@
+'''
+Business: Purge expired order idempotency keys in small batches
+Args: --batch-size rows deleted per transaction, --max-batches optional cap per run
+Returns: number of keys removed (printed)
+
+Usage: DATABASE_URL=... python -m maintenance.purge_idempotency_keys
+'''
+
+import argparse
+import os
+from typing import Any, Optional
+
+import psycopg2
+
+def purge_expired_idempotency_keys(conn: Any, batch_size: int = 5000, max_batches: Optional[int] = None) -> int:
+    '''
+    Deletes expired keys batch_size rows per transaction so the purge never
+    holds long locks or bloats a single transaction. Returns rows removed.
+    '''
+    removed = 0
+    batches = 0
+    cur = conn.cursor()
+    while max_batches is None or batches < max_batches:
+        cur.execute(
+            """
+            DELETE FROM order_idempotency_keys
+            WHERE idempotency_key IN (
+                SELECT idempotency_key FROM order_idempotency_keys
+                WHERE expires_at <= CURRENT_TIMESTAMP
+                ORDER BY expires_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            """,
+            (batch_size,)
+        )
+        deleted = cur.rowcount
+        conn.commit()
+        removed += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+    cur.close()
+    return removed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--max-batches', type=int, default=None)
+    args = parser.parse_args()
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        removed = purge_expired_idempotency_keys(conn, args.batch_size, args.max_batches)
+    finally:
+        conn.close()
+    print(f'Purged {removed} expired idempotency keys')
+
+if __name__ == '__main__':
+    main()
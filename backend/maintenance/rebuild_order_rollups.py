@@ -0,0 +1,130 @@
+'''
+Business: Recompute order_daily_rollups from orders (backfills, repairs after TRUNCATE)
+Args: --from / --to optional ISO dates bounding the rebuilt days (to is exclusive)
+Returns: number of rollup rows written and the first day rebuilt (printed)
+
+Days before the oldest attached monthly partition are never touched: their
+orders were archived by maintenance.order_partitions and only the rollups still
+count them, so --from is raised to that partition's first day.
+
+Each day is rebuilt in its own short transaction that never blocks order
+intake; deltas written meanwhile stay in order_rollup_deltas and are folded on
+top of the rebuilt rows.
+
+Usage: DATABASE_URL=... python -m maintenance.rebuild_order_rollups --from 2024-01-01
+'''
+
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Any, Optional, Tuple
+
+import psycopg2
+
+from maintenance.order_partitions import list_partitions
+
+def rebuild_day(conn: Any, day: date) -> Optional[int]:
+    '''
+    Replaces one day's rollup rows. The transaction runs at REPEATABLE READ, so
+    the orders it aggregates and the deltas it discards come from one snapshot:
+    a delta committed after it is kept and counts the order the snapshot missed.
+    Folds wait for the day to finish (SHARE ROW EXCLUSIVE on the rollups) and so
+    do partition archives (ACCESS SHARE on orders); order writes do not.
+    Returns rows written, or None when the day's partition has been archived.
+    '''
+    cur = conn.cursor()
+    try:
+        # Both locks before the first query, which takes the snapshot
+        cur.execute("LOCK TABLE order_daily_rollups IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute("LOCK TABLE orders IN ACCESS SHARE MODE")
+        partitions = list_partitions(cur)
+        if partitions and day < partitions[0][1]:
+            conn.rollback()
+            return None
+        
+        cur.execute("DELETE FROM order_rollup_deltas WHERE day = %s", (day,))
+        cur.execute("DELETE FROM order_daily_rollups WHERE day = %s", (day,))
+        cur.execute(
+            """
+            INSERT INTO order_daily_rollups (day, privilege_id, status, order_count, revenue)
+            SELECT o.created_at::date, COALESCE(o.privilege_id, 0), COALESCE(o.status, 'unknown'),
+                   count(*), COALESCE(sum(o.price), 0)
+            FROM orders o
+            WHERE o.created_at >= %s AND o.created_at < %s
+            GROUP BY 1, 2, 3
+            """,
+            (day, day + timedelta(days=1))
+        )
+        written = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return written
+
+def rebuild_order_rollups(conn: Any, date_from: Optional[date] = None,
+                          date_to: Optional[date] = None) -> Tuple[int, Optional[date]]:
+    '''
+    Rebuilds the requested days one by one (see rebuild_day). Without bounds it
+    covers every day that has orders, rollup rows or pending deltas.
+    Returns rows written and the first day actually rebuilt.
+    '''
+    cur = conn.cursor()
+    try:
+        partitions = list_partitions(cur)
+        cur.execute(
+            """
+            SELECT min(day), max(day)
+            FROM (
+                SELECT min(created_at)::date AS day FROM orders
+                UNION ALL SELECT max(created_at)::date FROM orders
+                UNION ALL SELECT min(day) FROM order_daily_rollups
+                UNION ALL SELECT max(day) FROM order_daily_rollups
+                UNION ALL SELECT min(day) FROM order_rollup_deltas
+                UNION ALL SELECT max(day) FROM order_rollup_deltas
+            ) bounds
+            """
+        )
+        first, last = cur.fetchone()
+        conn.commit()
+    finally:
+        cur.close()
+    if first is None:
+        return 0, None
+    if partitions and first < partitions[0][1]:
+        first = partitions[0][1]
+    date_from = max(date_from or first, first)
+    date_to = date_to or last + timedelta(days=1)
+    
+    isolation_level = conn.isolation_level
+    conn.isolation_level = psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ
+    written, rebuilt_from = 0, None
+    try:
+        day = date_from
+        while day < date_to:
+            rows = rebuild_day(conn, day)
+            if rows is not None:
+                written += rows
+                rebuilt_from = rebuilt_from or day
+            day += timedelta(days=1)
+    finally:
+        conn.isolation_level = isolation_level
+    return written, rebuilt_from
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, default=None)
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    try:
+        written, rebuilt_from = rebuild_order_rollups(conn, args.date_from, args.date_to)
+    finally:
+        conn.close()
+    print(f'Rebuilt {written} order rollup rows' + (f' from {rebuilt_from}' if rebuilt_from else ''))
+
+if __name__ == '__main__':
+    main()
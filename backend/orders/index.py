@@ -1,161 +1,1074 @@
 '''
-Business: Manage purchase orders for privileges
+Business: Manage purchase orders for privileges, search them by player (?q=) and report
+          sales analytics (?view=analytics)
 Args: event - dict with httpMethod, body, queryStringParameters
       context - object with attributes: request_id, function_name
 Returns: HTTP response dict
 '''
 
+import base64
+import csv
+import hashlib
+import io
 import json
 import os
-import psycopg2
-from typing import Dict, Any
+import re
+import sys
+from datetime import date, datetime
+from typing import Dict, Any, Callable, Iterator, List, Optional, Set, Tuple
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
+from shared.db import pooled_connection
+from shared.groupcommit import GroupCommitter
+from shared.http import compress_response, get_header
+from shared.prepared import PreparedStatement
+from shared.render import db_json_rendering
+from shared.routing import JSON_HEADERS, Router, error_response, json_response
+from shared.serialize import dumps
+from shared.sessions import admin_only, check_admin_session
+from shared.timing import instrumented, phase
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8'
+}
+EXPORT_COLUMNS = ('id', 'privilege_id', 'privilege_name', 'player_name', 'player_email', 'player_phone', 'status', 'created_at')
+EXPORT_BATCH_SIZE = int(os.environ.get('ORDERS_EXPORT_BATCH_SIZE', 5000))
+EXPORT_PART_BYTES = int(os.environ.get('ORDERS_EXPORT_PART_BYTES', 3 * 1024 * 1024))
+
+BULK_MAX_ITEMS = int(os.environ.get('ORDERS_BULK_MAX_ITEMS', 1000))
+
+# Column limits from the orders table (V0001, V0002)
+ORDER_FIELD_LENGTHS = {'player_name': 255, 'player_email': 255, 'player_phone': 50}
+ORDER_STATUS_MAX_LENGTH = 50
+MAX_INTEGER = 2 ** 31 - 1
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('ORDERS_IDEMPOTENCY_TTL', 24 * 3600))
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+SEARCH_MAX_QUERY_LENGTH = 100
+SEARCH_MAX_RESULTS = 100
+SEARCH_CANDIDATES = int(os.environ.get('ORDERS_SEARCH_CANDIDATES', 1000))
+SEARCH_MIN_SUBSTRING = 3
+SEARCH_MIN_PHONE_DIGITS = 4
+
+GROUP_COMMIT = os.environ.get('ORDERS_GROUP_COMMIT', '0') in ('1', 'true', 'yes')
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get('ORDERS_GROUP_COMMIT_WINDOW_MS', 5))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('ORDERS_GROUP_COMMIT_MAX_BATCH', 100))
+
+SYNCHRONOUS_COMMIT_LEVELS = ('on', 'off', 'local', 'remote_write', 'remote_apply')
+SYNCHRONOUS_COMMIT = os.environ.get('ORDERS_SYNCHRONOUS_COMMIT', '').strip().lower() or None
+if SYNCHRONOUS_COMMIT is not None and SYNCHRONOUS_COMMIT not in SYNCHRONOUS_COMMIT_LEVELS:
+    raise ValueError(f'ORDERS_SYNCHRONOUS_COMMIT must be one of {", ".join(SYNCHRONOUS_COMMIT_LEVELS)}')
+
+def encode_cursor(created_at: datetime, order_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), order_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return datetime.fromisoformat(created_at), int(order_id)
+
+INVALID_DATE = 'Invalid date'
+INVALID_PRIVILEGE_ID = 'Privilege ID must be an integer'
+
+def parse_param(parse: Callable[[Any], Any], value: Any, message: str) -> Any:
+    '''
+    Converts one query parameter. Failures raise ValueError with the given
+    fixed message, which is what the client sees.
+    '''
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+
+def parse_list_params(params: Dict[str, Any]) -> Tuple[str, List[Any], int]:
+    '''
+    Turns query string filters into a WHERE clause for the keyset listing.
+    Raises ValueError with a fixed, client-safe message on malformed input.
+    '''
+    conditions: List[str] = []
+    args: List[Any] = []
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Session',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    status: Optional[str] = params.get('status')
+    if status:
+        conditions.append('o.status = %s')
+        args.append(status)
     
-    conn = get_db_connection()
-    cur = conn.cursor()
+    privilege_id = params.get('privilege_id')
+    if privilege_id:
+        conditions.append('o.privilege_id = %s')
+        args.append(parse_param(int, privilege_id, INVALID_PRIVILEGE_ID))
     
-    if method == 'GET':
-        cur.execute(
-            """
-            SELECT o.id, o.privilege_id, p.name, o.player_name, o.player_email, o.player_phone, o.status, o.created_at
-            FROM orders o
-            JOIN privileges p ON o.privilege_id = p.id
-            ORDER BY o.created_at DESC
-            """
-        )
+    date_from = params.get('from')
+    if date_from:
+        conditions.append('o.created_at >= %s')
+        args.append(parse_param(datetime.fromisoformat, date_from, INVALID_DATE))
+    
+    date_to = params.get('to')
+    if date_to:
+        conditions.append('o.created_at < %s')
+        args.append(parse_param(datetime.fromisoformat, date_to, INVALID_DATE))
+    
+    cursor = params.get('cursor')
+    if cursor:
+        cursor_created_at, cursor_id = parse_param(decode_cursor, cursor, 'Invalid cursor')
+        # The plain created_at bound lets the planner prune later monthly partitions
+        conditions.append('o.created_at <= %s AND (o.created_at, o.id) < (%s, %s)')
+        args.extend([cursor_created_at, cursor_created_at, cursor_id])
+    
+    limit_message = f'Limit must be between 1 and {MAX_PAGE_SIZE}'
+    limit = parse_param(int, params.get('limit') or DEFAULT_PAGE_SIZE, limit_message)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(limit_message)
+    
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    return where, args, limit
+
+ANALYTICS_PERIODS = ('day', 'week')
+
+# Parameters that reach variadic or overloaded functions carry a cast: PREPARE
+# cannot infer their type the way a literal in plain SQL gets resolved
+ORDER_ANALYTICS_SQL = """
+    WITH r AS (
+        SELECT day, privilege_id, status, order_count, revenue
+        FROM order_daily_totals
+        WHERE order_count <> 0 {conditions}
+    )
+    SELECT json_build_object(
+        'period', %s::text,
+        'totals', (
+            SELECT json_build_object(
+                'orders', COALESCE(sum(order_count), 0),
+                'revenue', COALESCE(sum(revenue), 0)::float8
+            )
+            FROM r
+        ),
+        'by_status', COALESCE((
+            SELECT json_agg(s ORDER BY s.orders DESC)
+            FROM (
+                SELECT status, sum(order_count) AS orders, sum(revenue)::float8 AS revenue
+                FROM r GROUP BY status
+            ) s
+        ), '[]'::json),
+        'by_privilege', COALESCE((
+            SELECT json_agg(s ORDER BY s.revenue DESC)
+            FROM (
+                SELECT r.privilege_id, p.name AS privilege_name,
+                       sum(r.order_count) AS orders, sum(r.revenue)::float8 AS revenue
+                FROM r LEFT JOIN privileges p ON p.id = r.privilege_id
+                GROUP BY r.privilege_id, p.name
+            ) s
+        ), '[]'::json),
+        'by_period', COALESCE((
+            SELECT json_agg(s ORDER BY s.period_start)
+            FROM (
+                SELECT date_trunc(%s::text, day)::date AS period_start,
+                       sum(order_count) AS orders, sum(revenue)::float8 AS revenue
+                FROM r GROUP BY 1
+            ) s
+        ), '[]'::json)
+    )::text
+"""
+
+ORDER_ANALYTICS = PreparedStatement('order_analytics', ORDER_ANALYTICS_SQL)
+
+def parse_analytics_params(params: Dict[str, Any]) -> Tuple[str, List[Any], str]:
+    '''
+    Reads period (day|week) and the optional from/to day bounds (to is
+    exclusive). Raises ValueError with a fixed, client-safe message on
+    malformed input.
+    '''
+    period = params.get('period') or 'day'
+    if period not in ANALYTICS_PERIODS:
+        raise ValueError('Period must be day or week')
+    
+    conditions: List[str] = []
+    args: List[Any] = []
+    if params.get('from'):
+        conditions.append('AND day >= %s')
+        args.append(parse_param(date.fromisoformat, params['from'], INVALID_DATE))
+    if params.get('to'):
+        conditions.append('AND day < %s')
+        args.append(parse_param(date.fromisoformat, params['to'], INVALID_DATE))
+    return ' '.join(conditions), args, period
+
+def orders_analytics(event: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        conditions, args, period = parse_analytics_params(event.get('queryStringParameters') or {})
+    except ValueError as e:
+        return error_response(400, str(e))
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        ORDER_ANALYTICS.variant(conditions=conditions).execute(cur, (*args, period, period))
+        body = cur.fetchone()[0]
+        cur.close()
+    
+    return compress_response(event, {
+        'statusCode': 200,
+        'headers': JSON_HEADERS,
+        'body': body,
+        'isBase64Encoded': False
+    })
+
+ORDER_PAGE_SQL = """
+    SELECT o.id, o.privilege_id, p.name, o.player_name, o.player_email, o.player_phone, o.status, o.created_at
+    FROM orders o
+    JOIN privileges p ON o.privilege_id = p.id
+    {where}
+    ORDER BY o.created_at DESC, o.id DESC
+    LIMIT %s
+"""
+
+ORDER_PAGE_JSON_SQL = """
+    WITH page AS (
+        SELECT o.id, o.privilege_id, p.name AS privilege_name, o.player_name, o.player_email,
+               o.player_phone, o.status, o.created_at,
+               row_number() OVER (ORDER BY o.created_at DESC, o.id DESC) AS rn
+        FROM orders o
+        JOIN privileges p ON o.privilege_id = p.id
+        {where}
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT %s
+    )
+    SELECT
+        COALESCE(json_agg(json_build_object(
+            'id', id,
+            'privilege_id', privilege_id,
+            'privilege_name', privilege_name,
+            'player_name', player_name,
+            'player_email', player_email,
+            'player_phone', player_phone,
+            'status', status,
+            'created_at', created_at
+        ) ORDER BY rn) FILTER (WHERE rn <= %s), '[]'::json)::text,
+        count(*),
+        max(created_at) FILTER (WHERE rn = %s),
+        max(id) FILTER (WHERE rn = %s)
+    FROM page
+"""
+
+ORDER_PAGE = PreparedStatement('order_page', ORDER_PAGE_SQL)
+ORDER_PAGE_JSON = PreparedStatement('order_page_json', ORDER_PAGE_JSON_SQL)
+
+def render_orders_python(cur: Any, where: str, args: List[Any], limit: int) -> Tuple[str, Optional[str]]:
+    ORDER_PAGE.variant(where=where).execute(cur, (*args, limit + 1))
+    rows = cur.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][7], rows[-1][0])
+    
+    with phase('serialize'):
+        body = dumps([order_to_dict(row) for row in rows])
+    
+    return body, next_cursor
+
+def order_to_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'privilege_id': row[1],
+        'privilege_name': row[2],
+        'player_name': row[3],
+        'player_email': row[4],
+        'player_phone': row[5],
+        'status': row[6],
+        'created_at': row[7].isoformat() if row[7] else None
+    }
+
+def render_orders_db(cur: Any, where: str, args: List[Any], limit: int) -> Tuple[str, Optional[str]]:
+    '''
+    Same page as render_orders_python, but Postgres renders the JSON array and
+    the handler passes the text through untouched.
+    '''
+    ORDER_PAGE_JSON.variant(where=where).execute(cur, (*args, limit + 1, limit, limit, limit))
+    body, row_count, last_created_at, last_id = cur.fetchone()
+    
+    next_cursor = None
+    if row_count > limit:
+        next_cursor = encode_cursor(last_created_at, last_id)
+    
+    return body, next_cursor
+
+# Each branch ranks its own matches (exact, then prefix, then the rest, newest
+# first) before its limit, so a common prefix keeps the best candidates rather
+# than whichever rows the scan reached first
+ORDER_SEARCH_SQL = """
+    WITH candidates AS (
+        SELECT id, created_at, min(rank) AS rank FROM (
+            (
+                SELECT o.id, o.created_at,
+                       CASE
+                           WHEN lower(o.player_name) = %s OR lower(o.player_email) = %s
+                                OR normalize_phone(o.player_phone) = %s THEN 0
+                           WHEN lower(o.player_name) LIKE %s OR lower(o.player_email) LIKE %s
+                                OR normalize_phone(o.player_phone) LIKE %s THEN 1
+                           ELSE 2
+                       END AS rank
+                FROM orders o WHERE {prefix}
+                ORDER BY 3, o.created_at DESC, o.id DESC
+                LIMIT %s
+            )
+            UNION ALL
+            (
+                SELECT o.id, o.created_at,
+                       CASE
+                           WHEN lower(o.player_name) = %s OR lower(o.player_email) = %s
+                                OR normalize_phone(o.player_phone) = %s THEN 0
+                           WHEN lower(o.player_name) LIKE %s OR lower(o.player_email) LIKE %s
+                                OR normalize_phone(o.player_phone) LIKE %s THEN 1
+                           ELSE 2
+                       END AS rank
+                FROM orders o WHERE {substring}
+                ORDER BY 3, o.created_at DESC, o.id DESC
+                LIMIT %s
+            )
+        ) c
+        GROUP BY id, created_at
+    )
+    SELECT o.id, o.privilege_id, p.name, o.player_name, o.player_email, o.player_phone, o.status, o.created_at
+    FROM candidates c
+    JOIN orders o ON o.id = c.id AND o.created_at = c.created_at
+    JOIN privileges p ON o.privilege_id = p.id
+    ORDER BY c.rank, o.created_at DESC, o.id DESC
+    LIMIT %s
+"""
+
+ORDER_SEARCH = PreparedStatement('order_search', ORDER_SEARCH_SQL)
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def normalize_phone(value: str) -> str:
+    '''Python twin of the normalize_phone() SQL function from V0013.'''
+    digits = re.sub(r'[^0-9]', '', value)
+    if len(digits) == 11 and digits[0] == '8':
+        return '7' + digits[1:]
+    return digits
+
+def phone_search_digits(query: str) -> str:
+    '''
+    Digits to look for inside normalized phones. A partial number typed with
+    its +7 or 8 prefix loses that digit, so "8 900 12" still finds 7900123...
+    '''
+    digits = normalize_phone(query)
+    if len(digits) < 11 and query.lstrip().startswith(('+7', '8')):
+        return digits[1:]
+    return digits
+
+def parse_search_params(params: Dict[str, Any]) -> Tuple[str, str, List[Any]]:
+    '''
+    Builds the two candidate branches of ORDER_SEARCH_SQL from ?q=. Each keeps
+    its own SEARCH_CANDIDATES best matches, so substring hits cannot crowd out
+    prefix hits. Raises ValueError with a fixed, client-safe message on
+    malformed input.
+    '''
+    query = (params.get('q') or '').strip()
+    if not query:
+        raise ValueError('Search query required')
+    if len(query) > SEARCH_MAX_QUERY_LENGTH:
+        raise ValueError(f'Search query must be at most {SEARCH_MAX_QUERY_LENGTH} characters')
+    
+    limit_message = f'Limit must be between 1 and {SEARCH_MAX_RESULTS}'
+    limit = parse_param(int, params.get('limit') or DEFAULT_PAGE_SIZE, limit_message)
+    if limit < 1 or limit > SEARCH_MAX_RESULTS:
+        raise ValueError(limit_message)
+    
+    term = query.lower()
+    phone = normalize_phone(query)
+    phone_digits = phone_search_digits(query)
+    phone_prefix = escape_like(phone if phone_digits == phone else '7' + phone_digits) + '%'
+    searches_phone = len(phone_digits) >= SEARCH_MIN_PHONE_DIGITS
+    
+    prefix: List[str] = ['lower(o.player_name) LIKE %s']
+    prefix_args: List[Any] = [escape_like(term) + '%']
+    if searches_phone:
+        prefix.append('normalize_phone(o.player_phone) LIKE %s')
+        prefix_args.append(phone_prefix)
+    
+    substring: List[str] = []
+    substring_args: List[Any] = []
+    if len(term) >= SEARCH_MIN_SUBSTRING:
+        substring.extend(['lower(o.player_name) LIKE %s', 'lower(o.player_email) LIKE %s'])
+        substring_args.extend(['%' + escape_like(term) + '%'] * 2)
+    if searches_phone:
+        substring.append('normalize_phone(o.player_phone) LIKE %s')
+        substring_args.append('%' + escape_like(phone_digits) + '%')
+    
+    rank_args = [
+        term, term, phone if searches_phone else None,
+        escape_like(term) + '%', escape_like(term) + '%', phone_prefix if searches_phone else None
+    ]
+    args = [
+        *rank_args, *prefix_args, SEARCH_CANDIDATES,
+        *rank_args, *substring_args, SEARCH_CANDIDATES,
+        limit
+    ]
+    return ' OR '.join(prefix), ' OR '.join(substring) or 'false', args
+
+def search_orders(event: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        prefix, substring, args = parse_search_params(event.get('queryStringParameters') or {})
+    except ValueError as e:
+        return error_response(400, str(e))
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        ORDER_SEARCH.variant(prefix=prefix, substring=substring).execute(cur, args)
         rows = cur.fetchall()
+        cur.close()
+    
+    with phase('serialize'):
+        body = dumps([order_to_dict(row) for row in rows])
+    
+    return compress_response(event, {
+        'statusCode': 200,
+        'headers': JSON_HEADERS,
+        'body': body,
+        'isBase64Encoded': False
+    })
+
+ORDER_EXPORT_SQL = """
+    SELECT o.id, o.privilege_id, p.name, o.player_name, o.player_email, o.player_phone, o.status, o.created_at
+    FROM orders o
+    JOIN privileges p ON o.privilege_id = p.id
+    {where}
+    ORDER BY o.created_at DESC, o.id DESC
+"""
+
+ORDER_EXPORT_NDJSON_SQL = """
+    SELECT json_build_object(
+        'id', o.id,
+        'privilege_id', o.privilege_id,
+        'privilege_name', p.name,
+        'player_name', o.player_name,
+        'player_email', o.player_email,
+        'player_phone', o.player_phone,
+        'status', o.status,
+        'created_at', o.created_at
+    )::text, o.created_at, o.id
+    FROM orders o
+    JOIN privileges p ON o.privilege_id = p.id
+    {where}
+    ORDER BY o.created_at DESC, o.id DESC
+"""
+
+def iter_orders_export(conn: Any, export_format: str, where: str, args: List[Any]) -> Iterator[Tuple[str, datetime, int]]:
+    '''
+    Yields (line, created_at, id) for every matching order. Rows come from a
+    server-side cursor EXPORT_BATCH_SIZE at a time, so memory stays flat no
+    matter how many orders match.
+    '''
+    cur = conn.cursor(name='orders_export')
+    cur.itersize = EXPORT_BATCH_SIZE
+    try:
+        if export_format == 'ndjson':
+            cur.execute(ORDER_EXPORT_NDJSON_SQL.format(where=where), args)
+            for line, created_at, order_id in cur:
+                yield line + '\n', created_at, order_id
+        else:
+            cur.execute(ORDER_EXPORT_SQL.format(where=where), args)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in cur:
+                writer.writerow(row[:7] + (row[7].isoformat() if row[7] else '',))
+                yield buffer.getvalue(), row[7], row[0]
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        cur.close()
+
+def export_orders_part(conn: Any, export_format: str, where: str, args: List[Any], include_header: bool) -> Tuple[str, Optional[str]]:
+    '''
+    Collects up to EXPORT_PART_BYTES of export output and returns it with the
+    cursor the next part should start from. The function runtime cannot stream
+    a response, so large exports are fetched part by part and the part size is
+    what bounds memory.
+    '''
+    next_cursor = None
+    written = 0
+    last_row: Optional[Tuple[datetime, int]] = None
+    part = io.StringIO()
+    
+    if include_header and export_format == 'csv':
+        part.write(','.join(EXPORT_COLUMNS) + '\r\n')
+    
+    for line, created_at, order_id in iter_orders_export(conn, export_format, where, args):
+        size = len(line.encode())
+        if last_row and written + size > EXPORT_PART_BYTES:
+            next_cursor = encode_cursor(*last_row)
+            break
+        part.write(line)
+        written += size
+        last_row = (created_at, order_id)
+    
+    return part.getvalue(), next_cursor
+
+def order_fingerprint(privilege_id: int, player_name: str, player_email: str, player_phone: str) -> str:
+    raw = json.dumps([privilege_id, player_name, player_email, player_phone])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+LOOKUP_IDEMPOTENCY_KEY = PreparedStatement('lookup_idempotency_key', """
+    SELECT order_id, request_hash FROM order_idempotency_keys
+    WHERE idempotency_key = %s AND expires_at > CURRENT_TIMESTAMP
+""")
+
+CLAIM_IDEMPOTENCY_KEY = PreparedStatement('claim_idempotency_key', """
+    INSERT INTO order_idempotency_keys (idempotency_key, request_hash, expires_at)
+    VALUES (%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+    ON CONFLICT (idempotency_key) DO UPDATE
+    SET order_id = NULL, request_hash = EXCLUDED.request_hash,
+        created_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at
+    WHERE order_idempotency_keys.expires_at <= CURRENT_TIMESTAMP
+    RETURNING idempotency_key
+""")
+
+LINK_IDEMPOTENCY_KEY = PreparedStatement(
+    'link_idempotency_key',
+    "UPDATE order_idempotency_keys SET order_id = %s WHERE idempotency_key = %s"
+)
+
+def lookup_idempotency_key(cur: Any, key: str) -> Optional[Tuple[Optional[int], str]]:
+    LOOKUP_IDEMPOTENCY_KEY.execute(cur, (key,))
+    return cur.fetchone()
+
+def claim_idempotency_key(cur: Any, key: str, request_hash: str) -> bool:
+    '''
+    Reserves the key inside the current transaction. A concurrent request with
+    the same key blocks on the unique index until this one commits, then sees
+    the conflict and replays the stored order instead of inserting another.
+    '''
+    CLAIM_IDEMPOTENCY_KEY.execute(cur, (key, request_hash, IDEMPOTENCY_TTL_SECONDS))
+    return cur.fetchone() is not None
+
+def idempotent_replay_response(stored: Optional[Tuple[Optional[int], str]], request_hash: str) -> Dict[str, Any]:
+    if stored is None or stored[0] is None:
+        status_code, body = 409, {'error': 'A request with this idempotency key is still in progress'}
+    elif stored[1] != request_hash:
+        status_code, body = 422, {'error': 'Idempotency key was already used for a different order'}
+    else:
+        status_code, body = 201, {'success': True, 'order_id': stored[0]}
+    return json_response(status_code, body, {'Idempotent-Replayed': 'true'})
+
+def validate_order(item: Any) -> Optional[str]:
+    '''Checks one order against the orders columns so a bad value is a 400, not a failed INSERT.'''
+    if not isinstance(item, dict):
+        return 'Order must be an object'
+    if not item.get('privilege_id') or not item.get('player_name') or not item.get('player_phone'):
+        return 'Privilege ID, player name, and phone required'
+    try:
+        privilege_id = int(item['privilege_id'])
+    except (TypeError, ValueError):
+        return INVALID_PRIVILEGE_ID
+    if not 0 < privilege_id <= MAX_INTEGER:
+        return INVALID_PRIVILEGE_ID
+    for field, max_length in ORDER_FIELD_LENGTHS.items():
+        value = item.get(field)
+        if value is None and field == 'player_email':
+            continue
+        if not isinstance(value, str):
+            return f'{field} must be a string'
+        if len(value) > max_length:
+            return f'{field} must be at most {max_length} characters'
+    return None
+
+def create_orders_bulk(cur: Any, items: List[Any]) -> List[Dict[str, Any]]:
+    '''
+    Inserts every valid order with one multi-row INSERT and reports a result
+    per input item, in input order. Unknown privileges are rejected up front so
+    one bad row cannot abort the whole statement.
+    '''
+    results: List[Dict[str, Any]] = [{'index': i} for i in range(len(items))]
+    valid: List[int] = []
+    for i, item in enumerate(items):
+        error = validate_order(item)
+        if error:
+            results[i].update(success=False, error=error)
+        else:
+            valid.append(i)
+    
+    privilege_ids = sorted({int(items[i]['privilege_id']) for i in valid})
+    if privilege_ids:
+        cur.execute("SELECT id FROM privileges WHERE id = ANY(%s)", (privilege_ids,))
+        known = {row[0] for row in cur.fetchall()}
+        for i in list(valid):
+            if int(items[i]['privilege_id']) not in known:
+                results[i].update(success=False, error='Privilege not found')
+                valid.remove(i)
+    
+    if valid:
+        from psycopg2.extras import execute_values
         
-        orders = []
-        for row in rows:
-            orders.append({
-                'id': row[0],
-                'privilege_id': row[1],
-                'privilege_name': row[2],
-                'player_name': row[3],
-                'player_email': row[4],
-                'player_phone': row[5],
-                'status': row[6],
-                'created_at': row[7].isoformat() if row[7] else None
-            })
+        rows = execute_values(
+            cur,
+            "INSERT INTO orders (privilege_id, player_name, player_email, player_phone, status) VALUES %s RETURNING id",
+            [
+                (
+                    int(items[i]['privilege_id']),
+                    items[i]['player_name'],
+                    items[i].get('player_email', ''),
+                    items[i]['player_phone'],
+                    'pending'
+                )
+                for i in valid
+            ],
+            page_size=len(valid),
+            fetch=True
+        )
+        for i, row in zip(valid, rows):
+            results[i].update(success=True, order_id=row[0])
+    
+    return results
+
+def parse_created_hint(value: Any) -> Optional[datetime]:
+    '''
+    Optional created_at sent along with order ids. It only narrows the
+    partitions an UPDATE probes; a wrong hint falls back to an id-only update.
+    '''
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+UPDATE_ORDER_STATUS_IN_PARTITION = PreparedStatement(
+    'update_order_status_in_partition',
+    "UPDATE orders SET status = %s WHERE id = %s AND created_at = %s"
+)
+UPDATE_ORDER_STATUS = PreparedStatement('update_order_status', "UPDATE orders SET status = %s WHERE id = %s")
+
+def update_order_status(cur: Any, order_id: int, status: str, created_at: Optional[datetime]) -> bool:
+    if created_at is not None:
+        UPDATE_ORDER_STATUS_IN_PARTITION.execute(cur, (status, order_id, created_at))
+        if cur.rowcount:
+            return True
+    UPDATE_ORDER_STATUS.execute(cur, (status, order_id))
+    return cur.rowcount > 0
+
+def update_orders_status_bulk(cur: Any, order_ids: List[int], status: str,
+                              created_from: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    updated: Set[int] = set()
+    if created_from is not None:
+        cur.execute(
+            "UPDATE orders SET status = %s WHERE id = ANY(%s) AND created_at >= %s RETURNING id",
+            (status, order_ids, created_from)
+        )
+        updated = {row[0] for row in cur.fetchall()}
+    remaining = [order_id for order_id in order_ids if order_id not in updated]
+    if remaining:
+        cur.execute(
+            "UPDATE orders SET status = %s WHERE id = ANY(%s) RETURNING id",
+            (status, remaining)
+        )
+        updated.update(row[0] for row in cur.fetchall())
+    
+    results = []
+    for order_id in order_ids:
+        if order_id in updated:
+            results.append({'order_id': order_id, 'success': True})
+        else:
+            results.append({'order_id': order_id, 'success': False, 'error': 'Order not found'})
+    return results
+
+def bulk_response(results: List[Dict[str, Any]], success_status: int = 200) -> Dict[str, Any]:
+    succeeded = sum(1 for result in results if result['success'])
+    if succeeded == len(results):
+        status_code = success_status
+    elif succeeded:
+        status_code = 207
+    else:
+        status_code = 400
+    body: Dict[str, Any] = {'success': succeeded == len(results), 'results': results}
+    failed = [result['index'] for result in results if not result['success'] and 'index' in result]
+    if failed:
+        body['failed_indexes'] = failed
+    return json_response(status_code, body)
+
+BULK_TOO_LARGE = error_response(413, f'At most {BULK_MAX_ITEMS} items per request')
+INVALID_EXPORT_FORMAT = error_response(400, 'Format must be ndjson or csv')
+PRIVILEGE_NOT_FOUND = error_response(400, 'Privilege not found')
+ORDER_NOT_AN_OBJECT = error_response(400, 'Order must be an object')
+INVALID_ORDER = error_response(400, 'Invalid order')
+
+@admin_only
+def list_orders(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    query_params = event.get('queryStringParameters') or {}
+    if query_params.get('view') == 'analytics':
+        return orders_analytics(event)
+    if query_params.get('q') is not None:
+        return search_orders(event)
+    
+    try:
+        where, args, limit = parse_list_params(query_params)
+    except ValueError as e:
+        return error_response(400, str(e))
+    
+    export_format = query_params.get('format')
+    if export_format and export_format not in EXPORT_CONTENT_TYPES:
+        return INVALID_EXPORT_FORMAT
+    
+    if export_format:
+        with pooled_connection() as conn:
+            body, next_cursor = export_orders_part(
+                conn, export_format, where, args, include_header=not query_params.get('cursor')
+            )
         
-        cur.close()
-        conn.close()
+        headers = {
+            'Content-Type': EXPORT_CONTENT_TYPES[export_format],
+            'Content-Disposition': f'attachment; filename="orders.{export_format}"',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'X-Next-Cursor'
+        }
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
         
-        return {
+        return compress_response(event, {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(orders),
+            'headers': headers,
+            'body': body,
             'isBase64Encoded': False
-        }
+        })
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        if db_json_rendering():
+            body, next_cursor = render_orders_db(cur, where, args, limit)
+        else:
+            body, next_cursor = render_orders_python(cur, where, args, limit)
+        
+        cur.close()
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Next-Cursor'
+    }
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    
+    return compress_response(event, {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': False
+    })
+
+INSERT_ORDER = PreparedStatement(
+    'insert_order',
+    "INSERT INTO orders (privilege_id, player_name, player_email, player_phone, status) VALUES (%s, %s, %s, %s, %s) RETURNING id"
+)
+
+def commit_intake(conn: Any, cur: Any) -> None:
+    '''
+    Commits an order intake transaction. synchronous_commit is read when the
+    commit record is flushed, so setting it last still applies to this commit.
+    '''
+    if SYNCHRONOUS_COMMIT:
+        cur.execute("SET LOCAL synchronous_commit = %s", (SYNCHRONOUS_COMMIT,))
+    conn.commit()
+
+KNOWN_PRIVILEGES = PreparedStatement('known_privileges', "SELECT id FROM privileges WHERE id = ANY(%s)")
+
+LOOKUP_IDEMPOTENCY_KEYS = PreparedStatement('lookup_idempotency_keys', """
+    SELECT idempotency_key, order_id, request_hash FROM order_idempotency_keys
+    WHERE idempotency_key = ANY(%s) AND expires_at > CURRENT_TIMESTAMP
+""")
+
+CLAIM_IDEMPOTENCY_KEYS_SQL = """
+    INSERT INTO order_idempotency_keys (idempotency_key, request_hash, expires_at)
+    VALUES %s
+    ON CONFLICT (idempotency_key) DO UPDATE
+    SET order_id = NULL, request_hash = EXCLUDED.request_hash,
+        created_at = CURRENT_TIMESTAMP, expires_at = EXCLUDED.expires_at
+    WHERE order_idempotency_keys.expires_at <= CURRENT_TIMESTAMP
+    RETURNING idempotency_key
+"""
+
+LINK_IDEMPOTENCY_KEYS_SQL = """
+    UPDATE order_idempotency_keys AS k SET order_id = v.order_id
+    FROM (VALUES %s) AS v (order_id, idempotency_key)
+    WHERE k.idempotency_key = v.idempotency_key
+"""
+
+def lookup_idempotency_keys(cur: Any, keys: List[str]) -> Dict[str, Tuple[Optional[int], str]]:
+    LOOKUP_IDEMPOTENCY_KEYS.execute(cur, (keys,))
+    return {key: (order_id, request_hash) for key, order_id, request_hash in cur.fetchall()}
+
+def write_order_intake(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    '''
+    Writes one group-commit batch of single-order submissions: one privilege
+    check, bulk idempotency lookups and claims, one multi-row INSERT and one
+    commit. Returns each submission's own response, in batch order, exactly as
+    the one-at-a-time path would have answered it.
+    '''
+    from psycopg2.extras import execute_values
+
+    responses: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    first_with_key: Dict[str, int] = {}
+    repeats: List[int] = []
+    candidates: List[int] = []
+    for i, item in enumerate(items):
+        key = item['idempotency_key']
+        if key is not None and key in first_with_key:
+            repeats.append(i)
+            continue
+        if key is not None:
+            first_with_key[key] = i
+        candidates.append(i)
+
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            KNOWN_PRIVILEGES.execute(cur, (sorted({items[i]['privilege_id'] for i in candidates}),))
+            known = {row[0] for row in cur.fetchall()}
+            insert: List[int] = []
+            keyed: List[int] = []
+            for i in candidates:
+                if items[i]['privilege_id'] not in known:
+                    responses[i] = PRIVILEGE_NOT_FOUND
+                elif items[i]['idempotency_key'] is None:
+                    insert.append(i)
+                else:
+                    keyed.append(i)
+
+            stored: Dict[str, Tuple[Optional[int], str]] = {}
+            if keyed:
+                stored = lookup_idempotency_keys(cur, [items[i]['idempotency_key'] for i in keyed])
+                unclaimed = sorted((i for i in keyed if items[i]['idempotency_key'] not in stored),
+                                   key=lambda i: items[i]['idempotency_key'])
+                if unclaimed:
+                    # Sorted keys lock their index entries in the same order in every batch
+                    claimed = {row[0] for row in execute_values(
+                        cur,
+                        CLAIM_IDEMPOTENCY_KEYS_SQL,
+                        [(items[i]['idempotency_key'], items[i]['request_hash'], IDEMPOTENCY_TTL_SECONDS) for i in unclaimed],
+                        template="(%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')",
+                        page_size=len(unclaimed),
+                        fetch=True
+                    )}
+                    lost = [items[i]['idempotency_key'] for i in unclaimed if items[i]['idempotency_key'] not in claimed]
+                    if lost:
+                        # Each conflicting claim was committed by the time ours went through
+                        stored.update(lookup_idempotency_keys(cur, lost))
+                    for i in unclaimed:
+                        if items[i]['idempotency_key'] in claimed:
+                            insert.append(i)
+                for i in keyed:
+                    key = items[i]['idempotency_key']
+                    if responses[i] is None and key in stored:
+                        responses[i] = idempotent_replay_response(stored[key], items[i]['request_hash'])
+
+            if insert:
+                insert.sort()
+                rows = execute_values(
+                    cur,
+                    "INSERT INTO orders (privilege_id, player_name, player_email, player_phone, status) VALUES %s RETURNING id",
+                    [
+                        (items[i]['privilege_id'], items[i]['player_name'], items[i]['player_email'], items[i]['player_phone'], 'pending')
+                        for i in insert
+                    ],
+                    page_size=len(insert),
+                    fetch=True
+                )
+                links = []
+                for i, row in zip(insert, rows):
+                    responses[i] = json_response(201, {'success': True, 'order_id': row[0]})
+                    key = items[i]['idempotency_key']
+                    if key is not None:
+                        stored[key] = (row[0], items[i]['request_hash'])
+                        links.append((row[0], key))
+                if links:
+                    execute_values(cur, LINK_IDEMPOTENCY_KEYS_SQL, links, page_size=len(links))
+
+            commit_intake(conn, cur)
+        finally:
+            cur.close()
+
+    # A key repeated within the batch replays whatever its first submission got
+    for i in repeats:
+        key = items[i]['idempotency_key']
+        if key in stored:
+            responses[i] = idempotent_replay_response(stored[key], items[i]['request_hash'])
+        else:
+            responses[i] = responses[first_with_key[key]]
+    return responses
+
+def flush_order_intake(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    '''
+    Group commit flush. When a row is rejected (a privilege deleted since the
+    check, a value its column refuses), the batch has been rolled back and its
+    submissions are written again one transaction each, so only the caller
+    whose order caused the error gets it.
+    '''
+    import psycopg2.errors
+    
+    try:
+        return write_order_intake(items)
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        if len(items) == 1:
+            if isinstance(e, psycopg2.errors.ForeignKeyViolation):
+                return [PRIVILEGE_NOT_FOUND]
+            return [INVALID_ORDER]
+    return [flush_order_intake([item])[0] for item in items]
+
+order_intake = GroupCommitter('orders', flush_order_intake, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
+
+def create_orders(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    if not isinstance(body_data, (dict, list)):
+        return ORDER_NOT_AN_OBJECT
     
-    if method == 'POST':
-        body_data = json.loads(event.get('body', '{}'))
-        privilege_id = body_data.get('privilege_id')
-        player_name = body_data.get('player_name')
-        player_email = body_data.get('player_email', '')
-        player_phone = body_data.get('player_phone', '')
+    if isinstance(body_data, list) or 'orders' in body_data:
+        # Bulk import is an admin tool; the storefront places one order per request
+        auth_error = check_admin_session(event)
+        if auth_error:
+            return auth_error
+        items = body_data if isinstance(body_data, list) else body_data['orders']
+        if not isinstance(items, list):
+            return error_response(400, 'Orders must be a list')
+        if not items:
+            return error_response(400, 'At least one order required')
+        if len(items) > BULK_MAX_ITEMS:
+            return BULK_TOO_LARGE
         
-        if not privilege_id or not player_name or not player_phone:
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            results = create_orders_bulk(cur, items)
+            commit_intake(conn, cur)
             cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Privilege ID, player name, and phone required'}),
-                'isBase64Encoded': False
-            }
         
-        cur.execute(
-            "INSERT INTO orders (privilege_id, player_name, player_email, player_phone, status) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-            (int(privilege_id), player_name, player_email, player_phone, 'pending')
-        )
+        return bulk_response(results, success_status=201)
+    
+    # Everything is parsed before a connection is leased, so bad input is a 400
+    error = validate_order(body_data)
+    if error:
+        return error_response(400, error)
+    
+    privilege_id = int(body_data['privilege_id'])
+    player_name = body_data['player_name']
+    player_email = body_data.get('player_email', '')
+    player_phone = body_data['player_phone']
+    
+    idempotency_key = get_header(event, 'Idempotency-Key') or body_data.get('idempotency_key')
+    if idempotency_key:
+        idempotency_key = str(idempotency_key)[:IDEMPOTENCY_KEY_MAX_LENGTH]
+        request_hash = order_fingerprint(privilege_id, player_name, player_email, player_phone)
+    
+    if GROUP_COMMIT:
+        return order_intake.submit({
+            'privilege_id': privilege_id,
+            'player_name': player_name,
+            'player_email': player_email,
+            'player_phone': player_phone,
+            'idempotency_key': idempotency_key or None,
+            'request_hash': request_hash if idempotency_key else None
+        })
+    
+    import psycopg2.errors
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        if idempotency_key:
+            stored = lookup_idempotency_key(cur, idempotency_key)
+            if stored is None and not claim_idempotency_key(cur, idempotency_key, request_hash):
+                conn.rollback()
+                stored = lookup_idempotency_key(cur, idempotency_key)
+            if stored is not None:
+                cur.close()
+                return idempotent_replay_response(stored, request_hash)
+        
+        try:
+            INSERT_ORDER.execute(cur, (privilege_id, player_name, player_email, player_phone, 'pending'))
+        except psycopg2.errors.ForeignKeyViolation:
+            # Rolling back also frees the idempotency key claimed above
+            conn.rollback()
+            cur.close()
+            return PRIVILEGE_NOT_FOUND
         
         order_id = cur.fetchone()[0]
-        conn.commit()
+        if idempotency_key:
+            LINK_IDEMPOTENCY_KEY.execute(cur, (order_id, idempotency_key))
+        commit_intake(conn, cur)
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 201,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True, 'order_id': order_id}),
-            'isBase64Encoded': False
-        }
     
-    if method == 'PUT':
-        body_data = json.loads(event.get('body', '{}'))
-        order_id = body_data.get('order_id')
+    return json_response(201, {'success': True, 'order_id': order_id})
+
+INVALID_STATUS = error_response(400, f'Status must be a string of at most {ORDER_STATUS_MAX_LENGTH} characters')
+
+def valid_status(status: Any) -> bool:
+    return isinstance(status, str) and len(status) <= ORDER_STATUS_MAX_LENGTH
+
+@admin_only
+def update_orders(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    if not isinstance(body_data, dict):
+        return ORDER_NOT_AN_OBJECT
+    
+    if isinstance(body_data.get('order_ids'), list):
         status = body_data.get('status')
+        try:
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in body_data['order_ids']))
+        except (TypeError, ValueError):
+            order_ids = []
+        
+        if not order_ids or not status:
+            return error_response(400, 'Order IDs and status required')
+        if len(order_ids) > BULK_MAX_ITEMS:
+            return BULK_TOO_LARGE
+        if not valid_status(status):
+            return INVALID_STATUS
         
-        if not order_id or not status:
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            results = update_orders_status_bulk(
+                cur, order_ids, status, parse_created_hint(body_data.get('created_from'))
+            )
+            conn.commit()
             cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Order ID and status required'}),
-                'isBase64Encoded': False
-            }
         
-        cur.execute(
-            "UPDATE orders SET status = %s WHERE id = %s",
-            (status, int(order_id))
-        )
+        return bulk_response(results)
+    
+    order_id = body_data.get('order_id')
+    status = body_data.get('status')
+    
+    if not order_id or not status:
+        return error_response(400, 'Order ID and status required')
+    try:
+        order_id = int(order_id)
+    except (TypeError, ValueError):
+        order_id = 0
+    if not 0 < order_id <= MAX_INTEGER:
+        return error_response(400, 'Order ID must be an integer')
+    if not valid_status(status):
+        return INVALID_STATUS
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        update_order_status(cur, order_id, status, parse_created_hint(body_data.get('created_at')))
         
         conn.commit()
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True}),
-            'isBase64Encoded': False
-        }
-    
-    cur.close()
-    conn.close()
     
-    return {
-        'statusCode': 405,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Method not allowed'}),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return json_response(200, {'success': True})
+
+router = Router(
+    {
+        'GET': list_orders,
+        'POST': create_orders,
+        'PUT': update_orders
+    },
+    allow_headers=('Content-Type', 'X-Admin-Session', 'Idempotency-Key'),
+    expose_headers=('X-Next-Cursor', 'Idempotent-Replayed')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
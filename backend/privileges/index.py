@@ -7,146 +7,153 @@ Returns: HTTP response dict
 
 import json
 import os
-import psycopg2
+import sys
 from typing import Dict, Any
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
-    path: str = event.get('path', '/')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Session',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
+from shared.cache import poll_invalidations, response_cache
+from shared.db import pooled_connection
+from shared.http import cached_json_response, etag_matches, make_etag, not_modified_response
+from shared.prepared import PreparedStatement
+from shared.render import db_json_rendering
+from shared.routing import Router, error_response, json_response
+from shared.serialize import dumps
+from shared.sessions import admin_only
+from shared.snapshots import publish_after_write
+from shared.timing import instrumented, phase
+from shared.versions import fetch_version
+
+ACTIVE_PRIVILEGES_JSON = PreparedStatement('active_privileges_json', """
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', id,
+        'name', name,
+        'description', description,
+        'price', price::float8,
+        'features', features,
+        'is_active', is_active,
+        'image_url', image_url
+    ) ORDER BY price), '[]'::json)::text
+    FROM privileges
+    WHERE is_active = true
+""")
+
+ACTIVE_PRIVILEGES = PreparedStatement(
+    'active_privileges',
+    "SELECT id, name, description, price, features, is_active, image_url FROM privileges WHERE is_active = true ORDER BY price"
+)
+
+INSERT_PRIVILEGE = PreparedStatement(
+    'insert_privilege',
+    "INSERT INTO privileges (name, description, price, features, image_url) VALUES (%s, %s, %s, %s, %s) RETURNING id"
+)
+
+DEACTIVATE_PRIVILEGE = PreparedStatement('deactivate_privilege', "UPDATE privileges SET is_active = false WHERE id = %s")
+
+def list_privileges(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    poll_invalidations()
+    cached = response_cache.get('privileges')
+    if cached:
+        return cached_json_response(event, cached, 'HIT')
     
-    if method == 'GET':
-        cur.execute(
-            "SELECT id, name, description, price, features, is_active, image_url FROM privileges WHERE is_active = true ORDER BY price"
-        )
-        rows = cur.fetchall()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        version = fetch_version(cur, 'privileges')
+        etag = make_etag('privileges', version)
+        cached = response_cache.revalidate('privileges', version)
+        if etag_matches(event, etag):
+            cur.close()
+            return not_modified_response(etag)
+        if cached:
+            cur.close()
+            return cached_json_response(event, cached, 'REVALIDATED')
         
-        privileges = []
-        for row in rows:
-            privileges.append({
-                'id': row[0],
-                'name': row[1],
-                'description': row[2],
-                'price': float(row[3]),
-                'features': row[4],
-                'is_active': row[5],
-                'image_url': row[6]
-            })
+        if db_json_rendering():
+            ACTIVE_PRIVILEGES_JSON.execute(cur)
+            body = cur.fetchone()[0]
+        else:
+            ACTIVE_PRIVILEGES.execute(cur)
+            rows = cur.fetchall()
+            
+            with phase('serialize'):
+                privileges = []
+                for row in rows:
+                    privileges.append({
+                        'id': row[0],
+                        'name': row[1],
+                        'description': row[2],
+                        'price': float(row[3]),
+                        'features': row[4],
+                        'is_active': row[5],
+                        'image_url': row[6]
+                    })
+                body = dumps(privileges)
         
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(privileges),
-            'isBase64Encoded': False
-        }
     
-    if method == 'POST':
-        body_data = json.loads(event.get('body', '{}'))
-        name = body_data.get('name')
-        description = body_data.get('description', '')
-        price = body_data.get('price')
-        features = body_data.get('features', [])
-        image_url = body_data.get('image_url')
-        
-        if not name or price is None:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Name and price required'}),
-                'isBase64Encoded': False
-            }
-        
-        cur.execute(
-            "INSERT INTO privileges (name, description, price, features, image_url) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-            (name, description, float(price), features, image_url)
-        )
+    entry = response_cache.put('privileges', version, etag, body)
+    return cached_json_response(event, entry, 'MISS')
+
+@admin_only
+def create_privilege(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = json.loads(event.get('body', '{}'))
+    name = body_data.get('name')
+    description = body_data.get('description', '')
+    price = body_data.get('price')
+    features = body_data.get('features', [])
+    image_url = body_data.get('image_url')
+    
+    if not name or price is None:
+        return error_response(400, 'Name and price required')
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        return error_response(400, 'Price must be a number')
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        INSERT_PRIVILEGE.execute(cur, (name, description, price, features, image_url))
         
         privilege_id = cur.fetchone()[0]
         conn.commit()
+        response_cache.invalidate('privileges')
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 201,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True, 'id': privilege_id}),
-            'isBase64Encoded': False
-        }
+    publish_after_write()
     
-    if method == 'DELETE':
-        query_params = event.get('queryStringParameters', {})
-        privilege_id = query_params.get('id') if query_params else None
-        
-        if not privilege_id:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Privilege ID required'}),
-                'isBase64Encoded': False
-            }
-        
-        cur.execute("UPDATE privileges SET is_active = false WHERE id = %s", (int(privilege_id),))
+    return json_response(201, {'success': True, 'id': privilege_id})
+
+@admin_only
+def deactivate_privilege(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    query_params = event.get('queryStringParameters', {})
+    privilege_id = query_params.get('id') if query_params else None
+    
+    if not privilege_id:
+        return error_response(400, 'Privilege ID required')
+    try:
+        privilege_id = int(privilege_id)
+    except ValueError:
+        return error_response(400, 'Privilege ID must be an integer')
+    
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        DEACTIVATE_PRIVILEGE.execute(cur, (privilege_id,))
         conn.commit()
+        response_cache.invalidate('privileges')
         cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True}),
-            'isBase64Encoded': False
-        }
-    
-    cur.close()
-    conn.close()
+    publish_after_write()
     
-    return {
-        'statusCode': 405,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'error': 'Method not allowed'}),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return json_response(200, {'success': True})
+
+router = Router(
+    {
+        'GET': list_privileges,
+        'POST': create_privilege,
+        'DELETE': deactivate_privilege
+    },
+    allow_headers=('Content-Type', 'X-Admin-Session', 'If-None-Match'),
+    expose_headers=('ETag', 'X-Cache')
+)
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
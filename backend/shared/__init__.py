@@ -0,0 +1,8 @@
+'''
+Business: Shared helpers for backend functions (DB pool and friends)
+'''
+
+import time
+
+# First shared import of a function module; cold-start profiles measure import time from here.
+IMPORT_STARTED = time.perf_counter()
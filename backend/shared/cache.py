@@ -0,0 +1,199 @@
+'''
+Business: Bounded in-process TTL cache for serialized GET bodies, invalidated across
+          warm instances through Postgres LISTEN/NOTIFY and cache_versions stamps
+Args: RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_LISTEN,
+      RESPONSE_CACHE_MAX_LISTENERS env vars
+Returns: response_cache singleton, poll_invalidations() and cache_stats()
+
+The LISTEN connection sits outside the pool, so it is opened on a background
+thread rather than on a request, and only while fewer than
+RESPONSE_CACHE_MAX_LISTENERS instances hold one. Instances without it fall back
+to TTL expiry plus cache_versions stamp revalidation.
+'''
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+
+
+class CacheEntry:
+    __slots__ = ('version', 'etag', 'body', 'depends_on', 'variants', 'stored_at')
+
+    def __init__(self, version: Any, etag: str, body: str, depends_on: Tuple[str, ...]):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.depends_on = depends_on
+        self.variants: Dict[str, str] = {}
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    '''
+    LRU of serialized response bodies. Each entry lists the cache_versions names
+    it was built from, so invalidating a table drops every body derived from it.
+    Entries are
+    served without touching Postgres until ttl runs out; after that they are
+    revalidated against the version stamp instead of being rebuilt.
+    '''
+
+    def __init__(self, max_entries: int = 64, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry
+
+    def revalidate(self, key: str, version: Any) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            entry.stored_at = time.monotonic()
+            self._entries.move_to_end(key)
+            self.counters['revalidated'] += 1
+            return entry
+
+    def put(self, key: str, version: Any, etag: str, body: str,
+            depends_on: Optional[Tuple[str, ...]] = None) -> CacheEntry:
+        entry = CacheEntry(version, etag, body, depends_on or (key,))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        return entry
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if name in entry.depends_on]
+            for key in stale:
+                del self._entries[key]
+                self.counters['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 64)),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 5)),
+)
+
+LISTENER_APPLICATION_NAME = 'cache_listener'
+LISTENER_RETRY_SECONDS = 30.0
+
+_listener: Any = None
+_listener_opening = False
+_listener_retry_at = 0.0
+_listener_lock = threading.Lock()
+
+
+def _listen_enabled() -> bool:
+    return os.environ.get('RESPONSE_CACHE_LISTEN', '1') not in ('0', 'false', 'no')
+
+
+def _open_listener() -> Any:
+    '''Returns a LISTENing connection, or None when the fleet already holds the cap.'''
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'),
+                            application_name=LISTENER_APPLICATION_NAME, connect_timeout=5)
+    try:
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT count(*) FROM pg_stat_activity WHERE application_name = %s AND pid <> pg_backend_pid()",
+            (LISTENER_APPLICATION_NAME,)
+        )
+        if cur.fetchone()[0] >= int(os.environ.get('RESPONSE_CACHE_MAX_LISTENERS', 16)):
+            conn.close()
+            return None
+        cur.execute(f'LISTEN {INVALIDATION_CHANNEL}')
+        cur.close()
+    except psycopg2.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def _connect_listener() -> None:
+    global _listener, _listener_opening, _listener_retry_at
+    import psycopg2
+
+    try:
+        conn = _open_listener()
+    except psycopg2.Error:
+        conn = None
+    with _listener_lock:
+        _listener_opening = False
+        if conn is None:
+            _listener_retry_at = time.monotonic() + LISTENER_RETRY_SECONDS
+            return
+        _listener = conn
+    # Notifications sent before LISTEN are lost; start from a clean cache
+    response_cache.clear()
+
+
+def poll_invalidations() -> None:
+    '''
+    Drains NOTIFY payloads ("<name>:<version>") queued on the listener connection
+    while the instance was frozen and drops the matching cache entries. Without a
+    listener it starts opening one in the background (at most every
+    LISTENER_RETRY_SECONDS) and returns at once; until then, and after any
+    listener failure, entries rely on TTL + version stamp revalidation.
+    '''
+    global _listener, _listener_opening, _listener_retry_at
+    if not _listen_enabled():
+        return
+
+    import psycopg2
+
+    with _listener_lock:
+        if _listener is None or _listener.closed:
+            _listener = None
+            if not _listener_opening and time.monotonic() >= _listener_retry_at:
+                _listener_opening = True
+                threading.Thread(target=_connect_listener, name='cache-listener', daemon=True).start()
+            return
+        try:
+            _listener.poll()
+            notifies, _listener.notifies[:] = list(_listener.notifies), []
+        except psycopg2.Error:
+            _listener.close()
+            _listener = None
+            _listener_retry_at = time.monotonic() + LISTENER_RETRY_SECONDS
+            return
+
+    for notify in notifies:
+        response_cache.invalidate(notify.payload.split(':', 1)[0])
+
+
+def cache_stats() -> Dict[str, Any]:
+    return dict(response_cache.stats(), listening=_listener is not None)
@@ -0,0 +1,226 @@
+'''
+Business: Warm-container Postgres connection pool shared by all backend functions
+Args: DATABASE_URL - connection string; DB_POOL_* env vars tune sizing and recycling
+Returns: get_db_connection / release_db_connection helpers and pool stats
+'''
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from shared.querystats import cursor_factory, flush, flush_due
+from shared.timing import phase
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'created_at', 'last_used_at', 'uses')
+
+    def __init__(self, conn: Any):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used_at = now
+        self.uses = 0
+
+
+class ConnectionPool:
+    '''
+    Keeps idle connections alive between warm invocations of a function.
+    Connections are health-checked when they sat idle for a while, and are
+    recycled once they exceed max_age seconds or max_uses checkouts.
+    '''
+
+    def __init__(self, dsn: Optional[str], max_idle: int = 5, max_age: int = 300,
+                 max_uses: int = 1000, health_check_interval: int = 30):
+        self.dsn = dsn
+        self.max_idle = max_idle
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.health_check_interval = health_check_interval
+        self._idle: List[_PooledConnection] = []
+        self._leased: Dict[int, _PooledConnection] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'recycled': 0,
+            'broken': 0,
+            'discarded': 0,
+        }
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _connect(self) -> _PooledConnection:
+        import psycopg2
+
+        self._bump('misses')
+        return _PooledConnection(psycopg2.connect(self.dsn, cursor_factory=cursor_factory()))
+
+    def _expired(self, entry: _PooledConnection, now: float) -> bool:
+        return now - entry.created_at >= self.max_age or entry.uses >= self.max_uses
+
+    def _healthy(self, entry: _PooledConnection, now: float) -> bool:
+        import psycopg2
+
+        if entry.conn.closed:
+            return False
+        if now - entry.last_used_at < self.health_check_interval:
+            return True
+        try:
+            cur = entry.conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            entry.conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close(self, entry: _PooledConnection) -> None:
+        import psycopg2
+
+        try:
+            entry.conn.close()
+        except psycopg2.Error:
+            pass
+
+    def acquire(self) -> Any:
+        entry = None
+        while True:
+            with self._lock:
+                candidate = self._idle.pop() if self._idle else None
+            if candidate is None:
+                break
+            now = time.monotonic()
+            if self._expired(candidate, now):
+                self._bump('recycled')
+                self._close(candidate)
+                continue
+            if not self._healthy(candidate, now):
+                self._bump('broken')
+                self._close(candidate)
+                continue
+            self._bump('hits')
+            entry = candidate
+            break
+
+        if entry is None:
+            entry = self._connect()
+
+        entry.uses += 1
+        entry.last_used_at = time.monotonic()
+        with self._lock:
+            self._leased[id(entry.conn)] = entry
+        return entry.conn
+
+    def release(self, conn: Any) -> None:
+        import psycopg2.extensions
+
+        with self._lock:
+            entry = self._leased.pop(id(conn), None)
+        if entry is None:
+            conn.close()
+            return
+
+        if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._close(entry)
+
+        now = time.monotonic()
+        if conn.closed:
+            self._bump('broken')
+            return
+        if self._expired(entry, now):
+            self._bump('recycled')
+            self._close(entry)
+            return
+
+        entry.last_used_at = now
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(entry)
+                return
+        self._bump('discarded')
+        self._close(entry)
+
+    def discard(self, conn: Any) -> None:
+        with self._lock:
+            entry = self._leased.pop(id(conn), None)
+        self._bump('broken')
+        if entry is not None:
+            self._close(entry)
+        elif not conn.closed:
+            conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, idle=len(self._idle), leased=len(self._leased))
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    os.environ.get('DATABASE_URL'),
+                    max_idle=_env_int('DB_POOL_MAX_IDLE', 5),
+                    max_age=_env_int('DB_POOL_MAX_AGE', 300),
+                    max_uses=_env_int('DB_POOL_MAX_USES', 1000),
+                    health_check_interval=_env_int('DB_POOL_HEALTH_CHECK_INTERVAL', 30),
+                )
+    return _pool
+
+
+def get_db_connection() -> Any:
+    with phase('db_connect'):
+        return get_pool().acquire()
+
+
+def release_db_connection(conn: Any) -> None:
+    get_pool().release(conn)
+    if flush_due():
+        flush_conn = get_pool().acquire()
+        try:
+            flush(flush_conn)
+        finally:
+            get_pool().release(flush_conn)
+
+
+@contextmanager
+def pooled_connection() -> Iterator[Any]:
+    '''
+    Leases a connection for the with block. It goes back to the pool even when
+    the block raises; release rolls back a transaction left open.
+    '''
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        release_db_connection(conn)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
@@ -0,0 +1,107 @@
+'''
+Business: Group commit for concurrent writes within one warm instance
+Args: flush - callable taking the batched items and returning one result per item, in order;
+      window_ms - how long a batch stays open for more items; max_batch - items that close it early
+Returns: GroupCommitter (submit(item) blocks until the batch holding it is flushed) and group_commit_stats()
+
+The first caller into an empty batch leads it. While another batch is being
+flushed, the leader keeps its batch open until that flush ends, the batch is
+full or the window elapses, so under load the next batch fills while the
+current one commits. Like Postgres' commit_delay it never waits on an idle
+instance: a lone request is flushed at once. The leader flushes on its own
+thread and wakes the others with their results; a failed flush raises the
+same error in every caller of the batch.
+'''
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+_committers: Dict[str, 'GroupCommitter'] = {}
+
+
+class _Batch:
+    __slots__ = ('items', 'full', 'done', 'results', 'error')
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.full = False
+        self.done = threading.Event()
+        self.results: List[Any] = []
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitter:
+    def __init__(self, name: str, flush: Callable[[List[Any]], List[Any]], window_ms: float, max_batch: int):
+        self.name = name
+        self.flush = flush
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._open: Optional[_Batch] = None
+        self._flushing = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.counters = {'batches': 0, 'items': 0, 'largest_batch': 0, 'waited': 0, 'failed': 0}
+        _committers[name] = self
+
+    def submit(self, item: Any) -> Any:
+        with self._lock:
+            batch = self._open
+            if batch is None:
+                batch = self._open = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch:
+                self._open = None
+                batch.full = True
+                self._changed.notify_all()
+
+        if index == 0:
+            self._flush(batch, self._wait_turn(batch))
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _wait_turn(self, batch: _Batch) -> bool:
+        '''Closes the batch once it may be flushed; returns whether it had to wait.'''
+        deadline = time.monotonic() + self.window
+        with self._lock:
+            waited = self._flushing > 0
+            while self._flushing and not batch.full:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            if self._open is batch:
+                self._open = None
+            self._flushing += 1
+        return waited
+
+    def _flush(self, batch: _Batch, waited: bool) -> None:
+        try:
+            batch.results = self.flush(batch.items)
+        except BaseException as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self._flushing -= 1
+                self.counters['batches'] += 1
+                self.counters['items'] += len(batch.items)
+                self.counters['largest_batch'] = max(self.counters['largest_batch'], len(batch.items))
+                self.counters['waited'] += waited
+                self.counters['failed'] += batch.error is not None
+                self._changed.notify_all()
+            batch.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters, window_ms=self.window * 1000, max_batch=self.max_batch)
+        stats['mean_batch'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+def group_commit_stats() -> Dict[str, Any]:
+    return {name: committer.stats() for name, committer in _committers.items()}
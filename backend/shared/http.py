@@ -0,0 +1,163 @@
+'''
+Business: HTTP helpers shared by backend functions (headers, ETags, conditional GET,
+          negotiated gzip/brotli compression)
+Args: COMPRESSION_MIN_BYTES - bodies shorter than this are sent uncompressed
+Returns: header/ETag helpers and response builders
+'''
+
+import base64
+import gzip
+import os
+from typing import Dict, Any, Optional
+
+from shared.timing import phase
+
+CACHE_CONTROL = 'public, no-cache'
+ETAG_ENCODINGS = ('gzip', 'br')
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+
+# Cached bodies are compressed once per version, so they get the slow, dense
+# levels; per-request bodies use cheaper ones.
+STATIC_LEVELS = {'gzip': 9, 'br': 11}
+DYNAMIC_LEVELS = {'gzip': 6, 'br': 5}
+
+_brotli: Any = None
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def make_etag(name: str, version: Any) -> str:
+    return f'"{name}-v{version}"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"'
+
+def _strip_encoding(etag: str) -> str:
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+def etag_matches(event: Dict[str, Any], etag: str) -> bool:
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or _strip_encoding(candidate) == etag:
+            return True
+    return False
+
+def not_modified_response(etag: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 304,
+        'headers': {
+            'ETag': etag,
+            'Cache-Control': CACHE_CONTROL,
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag, X-Cache',
+            'Vary': 'Accept-Encoding'
+        },
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+def accepts_encoding(event: Dict[str, Any], encoding: str) -> bool:
+    accept_encoding = get_header(event, 'Accept-Encoding') or ''
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        if token.strip().lower() != encoding:
+            continue
+        return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+def brotli_module() -> Any:
+    '''The brotli module when installed, else None (checked once).'''
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+def negotiate_encoding(event: Dict[str, Any]) -> Optional[str]:
+    if brotli_module() is not None and accepts_encoding(event, 'br'):
+        return 'br'
+    if accepts_encoding(event, 'gzip'):
+        return 'gzip'
+    return None
+
+def compress_base64(body: str, encoding: str, levels: Dict[str, int] = DYNAMIC_LEVELS) -> str:
+    raw = body.encode()
+    if encoding == 'br':
+        compressed = brotli_module().compress(raw, quality=levels['br'])
+    else:
+        compressed = gzip.compress(raw, compresslevel=levels['gzip'], mtime=0)
+    return base64.b64encode(compressed).decode()
+
+def compress_response(event: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Returns a compressed copy of a per-request response when the client accepts
+    gzip or br and the body reaches COMPRESSION_MIN_BYTES; otherwise the response
+    itself, with Vary set.
+    '''
+    headers = dict(response['headers'], Vary='Accept-Encoding')
+    body = response['body']
+    encoding = None
+    if not response.get('isBase64Encoded') and len(body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(event)
+    if encoding is None:
+        return dict(response, headers=headers)
+    
+    with phase('compress'):
+        body = compress_base64(body, encoding)
+    headers['Content-Encoding'] = encoding
+    return dict(response, headers=headers, body=body, isBase64Encoded=True)
+
+def cacheable_json_response(body: str, etag: str, cache_status: str,
+                            content_encoding: Optional[str] = None) -> Dict[str, Any]:
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag, X-Cache',
+        'ETag': etag,
+        'Cache-Control': CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+        'X-Cache': cache_status
+    }
+    if content_encoding:
+        headers['Content-Encoding'] = content_encoding
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': content_encoding is not None
+    }
+
+def cached_json_response(event: Dict[str, Any], entry: Any, cache_status: str) -> Dict[str, Any]:
+    '''
+    Serves a response cache entry: 304 on a matching ETag, else its body in the
+    negotiated encoding. Compressed variants live on the entry, so they are
+    built once per version and dropped with it.
+    '''
+    if etag_matches(event, entry.etag):
+        return not_modified_response(entry.etag)
+    encoding = negotiate_encoding(event) if len(entry.body) >= COMPRESSION_MIN_BYTES else None
+    if encoding is None:
+        return cacheable_json_response(entry.body, entry.etag, cache_status)
+    
+    variant = entry.variants.get(encoding)
+    if variant is None:
+        with phase('compress'):
+            variant = entry.variants[encoding] = compress_base64(entry.body, encoding, STATIC_LEVELS)
+    return cacheable_json_response(variant, encoded_etag(entry.etag, encoding), cache_status, encoding)
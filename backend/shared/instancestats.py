@@ -0,0 +1,56 @@
+'''
+Business: One snapshot of this instance's in-process counters (DB pool, response cache,
+          phase histograms, cold starts, login throttle, prepared statements, group commit)
+Args: INSTANCE_STATS_LOG_INTERVAL - seconds between "instance_stats" log lines, 0 disables
+Returns: instance_stats() and log_instance_stats_if_due()
+
+Only modules the function already imported are reported, so a snapshot never
+adds imports to a cold start. Deployed instances emit the snapshot as one JSON
+log line per interval from the instrumented wrapper; admins also serve it for
+their own instance at ?view=instance_stats.
+'''
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any
+
+LOG_INTERVAL = float(os.environ.get('INSTANCE_STATS_LOG_INTERVAL', 60))
+
+_next_log_at = time.monotonic() + LOG_INTERVAL
+_log_lock = threading.Lock()
+
+
+def instance_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    modules = sys.modules
+    if 'shared.db' in modules:
+        stats['db_pool'] = modules['shared.db'].pool_stats()
+    if 'shared.cache' in modules:
+        stats['response_cache'] = modules['shared.cache'].cache_stats()
+    if 'shared.timing' in modules:
+        stats['phase_histograms'] = modules['shared.timing'].dump_histograms()
+        stats['cold_starts'] = modules['shared.timing'].cold_start_profiles()
+    if 'shared.throttle' in modules:
+        stats['auth_throttle'] = modules['shared.throttle'].throttle_stats()
+    if 'shared.prepared' in modules:
+        stats['prepared_statements'] = modules['shared.prepared'].prepared_stats()
+    if 'shared.groupcommit' in modules:
+        stats['group_commit'] = modules['shared.groupcommit'].group_commit_stats()
+    return stats
+
+
+def log_instance_stats_if_due(function_name: str) -> None:
+    '''Writes the snapshot as a JSON log line once LOG_INTERVAL has passed since the last one.'''
+    global _next_log_at
+    if LOG_INTERVAL <= 0 or time.monotonic() < _next_log_at:
+        return
+    with _log_lock:
+        now = time.monotonic()
+        if now < _next_log_at:
+            return
+        _next_log_at = now + LOG_INTERVAL
+    record = dict(instance_stats(), event='instance_stats', function_name=function_name)
+    sys.stdout.write(json.dumps(record) + '\n')
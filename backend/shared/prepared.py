@@ -0,0 +1,154 @@
+'''
+Business: Server-side prepared statements for the fixed SQL every function runs
+Args: PREPARED_STATEMENTS - "0" sends every statement as plain SQL again
+Returns: PreparedStatement (declare at import, run with .execute(cur, args)), prepared_stats(),
+         statement_source() for query stats and registered_statements() for maintenance.check_prepared
+
+A statement is PREPAREd on a connection the first time it runs there and
+EXECUTEd by name afterwards, so warm pooled connections skip parsing and, once
+Postgres settles on a generic plan, planning. psycopg2 still binds the
+parameters, as the literal arguments of EXECUTE. A replaced connection starts
+with nothing prepared. Postgres replans prepared statements itself after DDL;
+when the server has lost a statement (DISCARD ALL) or can no longer run it as
+prepared (a migration changed its result columns), it is prepared again and
+retried, provided it was the first statement of its transaction.
+
+PREPARE goes to the server on its own and the name is tracked as soon as it
+succeeds: a prepared statement outlives a rollback, so a failing first EXECUTE
+must not make the next call prepare it again. A name the server already has
+anyway (DuplicatePreparedStatement) is taken as prepared.
+'''
+
+import hashlib
+import os
+import re
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+ENABLED = os.environ.get('PREPARED_STATEMENTS', '1') not in ('0', 'false', 'no')
+
+_PARAMETER = re.compile(r'%%|%s')
+
+_prepared: 'weakref.WeakKeyDictionary[Any, Set[str]]' = weakref.WeakKeyDictionary()
+_registered: List['PreparedStatement'] = []
+# EXECUTE text -> the statement's own SQL, for query stats
+_sources: Dict[str, str] = {}
+_lock = threading.Lock()
+_counters = {'prepared': 0, 'executed': 0, 'reprepared': 0}
+
+
+def _bump(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def _numbered(sql: str) -> str:
+    '''
+    Rewrites psycopg2 %s placeholders as $1..$n for PREPARE. PREPARE is sent
+    without parameters, so a literal %% goes to the server as a single %.
+    '''
+    position = 0
+
+    def replace(match: 're.Match[str]') -> str:
+        nonlocal position
+        if match.group() == '%%':
+            return '%'
+        position += 1
+        return f'${position}'
+
+    return _PARAMETER.sub(replace, sql)
+
+
+class PreparedStatement:
+    '''
+    One statement written with psycopg2 %s placeholders. SQL with {name}
+    fields is a template: variant(**parts) fills them in and returns the
+    statement prepared under its own name for that shape.
+    '''
+
+    def __init__(self, name: str, sql: str, variant_of: Optional['PreparedStatement'] = None):
+        self.name = name
+        self.sql = sql
+        self._variants: Dict[str, 'PreparedStatement'] = {}
+        parameters = sum(1 for match in _PARAMETER.finditer(sql) if match.group() == '%s')
+        execute = f'EXECUTE {name}' + (' (' + ', '.join(['%s'] * parameters) + ')' if parameters else '')
+        self.execute_sql = execute
+        self.prepare_sql = f'PREPARE {name} AS {_numbered(sql)}'
+        _sources[self.execute_sql] = sql
+        if variant_of is None:
+            with _lock:
+                _registered.append(self)
+
+    def variant(self, **parts: str) -> 'PreparedStatement':
+        sql = self.sql.format(**parts)
+        statement = self._variants.get(sql)
+        if statement is None:
+            digest = hashlib.sha1(sql.encode()).hexdigest()[:12]
+            statement = self._variants[sql] = PreparedStatement(f'{self.name}_{digest}', sql, variant_of=self)
+        return statement
+
+    def execute(self, cur: Any, args: Sequence[Any] = ()) -> None:
+        if not ENABLED:
+            cur.execute(self.sql, args)
+            return
+
+        import psycopg2.errors
+        import psycopg2.extensions
+
+        conn = cur.connection
+        with _lock:
+            names = _prepared.setdefault(conn, set())
+        if self.name in names:
+            first_statement = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            try:
+                cur.execute(self.execute_sql, args)
+                _bump('executed')
+                return
+            except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.FeatureNotSupported) as e:
+                names.discard(self.name)
+                if not first_statement:
+                    raise
+                conn.rollback()
+                if isinstance(e, psycopg2.errors.FeatureNotSupported):
+                    cur.execute(f'DEALLOCATE {self.name}')
+                _bump('reprepared')
+
+        self._prepare(cur, names)
+        _bump('prepared')
+        cur.execute(self.execute_sql, args)
+
+    def _prepare(self, cur: Any, names: Set[str]) -> None:
+        import psycopg2.errors
+        import psycopg2.extensions
+
+        conn = cur.connection
+        # Inside a transaction a failed PREPARE would abort the caller's work with it
+        savepoint = not conn.autocommit and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            if savepoint:
+                cur.execute(f'SAVEPOINT prepare_statement; {self.prepare_sql}; RELEASE SAVEPOINT prepare_statement')
+            else:
+                cur.execute(self.prepare_sql)
+        except psycopg2.errors.DuplicatePreparedStatement:
+            if savepoint:
+                cur.execute('ROLLBACK TO SAVEPOINT prepare_statement; RELEASE SAVEPOINT prepare_statement')
+            elif not conn.autocommit:
+                conn.rollback()
+        names.add(self.name)
+
+
+def statement_source(query: str) -> Optional[str]:
+    '''The SQL behind an EXECUTE sent by a PreparedStatement, with its %s placeholders.'''
+    return _sources.get(query)
+
+
+def registered_statements() -> List[PreparedStatement]:
+    '''Statements declared so far (templates included, variants not), in declaration order.'''
+    with _lock:
+        return list(_registered)
+
+
+def prepared_stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_counters, connections=len(_prepared))
@@ -0,0 +1,318 @@
+'''
+Business: Per-statement query statistics with sampled, rate-limited EXPLAIN of slow queries
+Args: QUERY_STATS - "0" disables recording; SLOW_QUERY_MS - slow threshold;
+      SLOW_QUERY_EXPLAIN_SAMPLE - fraction of slow calls explained;
+      SLOW_QUERY_EXPLAIN_INTERVAL - min seconds between EXPLAINs of one fingerprint;
+      SLOW_QUERY_EXPLAIN_PER_MINUTE - instance-wide EXPLAIN budget;
+      QUERY_STATS_FLUSH_INTERVAL - seconds between flushes into the query_stats table
+Returns: cursor_factory() for pooled connections, query_stats() and flush helpers
+'''
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from shared.prepared import statement_source
+from shared.timing import ENABLED as TIMING_ENABLED, record_phase
+
+ENABLED = os.environ.get('QUERY_STATS', '1') not in ('0', 'false', 'no')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0.2))
+EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+EXPLAIN_PER_MINUTE = int(os.environ.get('SLOW_QUERY_EXPLAIN_PER_MINUTE', 5))
+FLUSH_INTERVAL = float(os.environ.get('QUERY_STATS_FLUSH_INTERVAL', 60))
+MAX_FINGERPRINTS = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.$])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_REPEATED_TUPLES = re.compile(r'\((\s*\?\s*(?:,\s*\?\s*)*)\)(?:\s*,\s*\(\s*\?\s*(?:,\s*\?\s*)*\))+')
+_REPEATED_ITEMS = re.compile(r'\?(?:\s*,\s*\?)+')
+_WHITESPACE = re.compile(r'\s+')
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+# Not 'with': a CTE may hold INSERT/UPDATE/DELETE, and ANALYZE would run it a second time
+ANALYZABLE = ('select',)
+
+_fingerprints: 'OrderedDict[str, str]' = OrderedDict()
+
+
+def fingerprint(query: str) -> str:
+    '''Normalizes a statement so calls differing only in literals share one entry.'''
+    cached = _fingerprints.get(query)
+    if cached is not None:
+        return cached
+    normalized = _COMMENT.sub(' ', query)
+    normalized = _STRING_LITERAL.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _REPEATED_TUPLES.sub(r'(\1)', normalized)
+    normalized = _REPEATED_ITEMS.sub('?', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    if len(query) < 4096:
+        _fingerprints[query] = normalized
+        if len(_fingerprints) > 1024:
+            _fingerprints.popitem(last=False)
+    return normalized
+
+
+class QueryStat:
+    __slots__ = ('calls', 'total_ms', 'max_ms', 'rows', 'slow_calls', 'explain', 'explained_at')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.explain: Optional[Any] = None
+        self.explained_at = float('-inf')
+
+
+_stats: Dict[str, QueryStat] = {}
+_pending: Dict[str, QueryStat] = {}
+_lock = threading.Lock()
+_explain_budget = [float(EXPLAIN_PER_MINUTE), time.monotonic()]
+_last_flush = [time.monotonic()]
+
+
+def _record(key: str, ms: float, rows: int, slow: bool) -> QueryStat:
+    with _lock:
+        for table in (_stats, _pending):
+            stat = table.get(key)
+            if stat is None:
+                if len(table) >= MAX_FINGERPRINTS:
+                    key = '<other>'
+                    stat = table.get(key)
+                if stat is None:
+                    stat = table[key] = QueryStat()
+            stat.calls += 1
+            stat.total_ms += ms
+            stat.max_ms = max(stat.max_ms, ms)
+            stat.rows += max(rows, 0)
+            stat.slow_calls += slow
+        return _stats[key]
+
+
+def _take_explain_slot(stat: QueryStat) -> bool:
+    now = time.monotonic()
+    with _lock:
+        if now - stat.explained_at < EXPLAIN_INTERVAL or random.random() >= EXPLAIN_SAMPLE:
+            return False
+        tokens, refilled_at = _explain_budget
+        tokens = min(float(EXPLAIN_PER_MINUTE), tokens + (now - refilled_at) * EXPLAIN_PER_MINUTE / 60.0)
+        if tokens < 1:
+            _explain_budget[:] = [tokens, now]
+            return False
+        _explain_budget[:] = [tokens - 1, now]
+        stat.explained_at = now
+        return True
+
+
+def _explain(connection: Any, query: Any, params: Any) -> Optional[Any]:
+    '''
+    EXPLAIN on a separate plain cursor so the caller's result set survives.
+    Plain SELECTs get ANALYZE and BUFFERS inside a savepoint; writes and WITH
+    statements (whose CTEs may write) are only planned, never re-executed.
+    '''
+    import psycopg2
+    import psycopg2.extensions
+
+    if connection.autocommit or connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+        return None
+    text = query if isinstance(query, str) else query.decode() if isinstance(query, bytes) else None
+    if text is None:
+        return None
+    verb = text.lstrip().split(None, 1)[0].lower() if text.strip() else ''
+    if verb not in EXPLAINABLE:
+        return None
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if verb in ANALYZABLE else 'FORMAT JSON'
+
+    cur = psycopg2.extensions.cursor(connection)
+    try:
+        cur.execute('SAVEPOINT query_stats_explain')
+        try:
+            cur.execute(f'EXPLAIN ({options}) {text}', params)
+            plan = cur.fetchone()[0]
+        finally:
+            cur.execute('ROLLBACK TO SAVEPOINT query_stats_explain')
+            cur.execute('RELEASE SAVEPOINT query_stats_explain')
+        return plan
+    except psycopg2.Error:
+        return None
+    finally:
+        cur.close()
+
+
+def _build_cursor_class() -> type:
+    '''Built on first connect so importing this module does not pull in psycopg2.'''
+    import psycopg2.extensions
+
+    class InstrumentedCursor(psycopg2.extensions.cursor):
+        '''
+        Books execute/fetch time under the request's "db" phase and records per
+        fingerprint call count, duration and row count. Statements slower than
+        SLOW_QUERY_MS may get their plan captured.
+        '''
+
+        def _observe(self, query: Any, params: Any, started: float) -> None:
+            elapsed = time.perf_counter() - started
+            record_phase('db', elapsed)
+            if not ENABLED:
+                return
+            ms = elapsed * 1000
+            text = query if isinstance(query, str) else query.decode() if isinstance(query, bytes) else str(query)
+            # A prepared call is booked and explained as the SQL it runs, with the same parameters
+            source = statement_source(text)
+            if source is not None:
+                query = text = source
+            key = fingerprint(text)
+            slow = ms >= SLOW_QUERY_MS
+            stat = _record(key, ms, self.rowcount, slow)
+            if slow and self.name is None and _take_explain_slot(stat):
+                plan = _explain(self.connection, query, params)
+                if plan is not None:
+                    stat.explain = plan
+                    with _lock:
+                        pending = _pending.get(key)
+                        if pending is not None:
+                            pending.explain = plan
+                sys.stdout.write(json.dumps({
+                    'slow_query': key,
+                    'duration_ms': round(ms, 3),
+                    'rows': self.rowcount,
+                    'explained': plan is not None,
+                }) + '\n')
+
+        def execute(self, query: Any, vars: Any = None) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                self._observe(query, vars, started)
+
+        def executemany(self, query: Any, vars_list: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                self._observe(query, None, started)
+
+        def fetchone(self) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().fetchone()
+            finally:
+                record_phase('db', time.perf_counter() - started)
+
+        def fetchmany(self, size: Any = None) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().fetchmany(size) if size is not None else super().fetchmany()
+            finally:
+                record_phase('db', time.perf_counter() - started)
+
+        def fetchall(self) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().fetchall()
+            finally:
+                record_phase('db', time.perf_counter() - started)
+
+    return InstrumentedCursor
+
+
+_cursor_class: Optional[type] = None
+
+
+def cursor_factory() -> Optional[type]:
+    global _cursor_class
+    if not (ENABLED or TIMING_ENABLED):
+        return None
+    if _cursor_class is None:
+        _cursor_class = _build_cursor_class()
+    return _cursor_class
+
+
+def query_stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return {
+            key: {
+                'calls': stat.calls,
+                'total_ms': stat.total_ms,
+                'mean_ms': stat.total_ms / stat.calls if stat.calls else 0.0,
+                'max_ms': stat.max_ms,
+                'rows': stat.rows,
+                'slow_calls': stat.slow_calls,
+                'explain': stat.explain,
+            }
+            for key, stat in _stats.items()
+        }
+
+
+def flush_due() -> bool:
+    return ENABLED and bool(_pending) and time.monotonic() - _last_flush[0] >= FLUSH_INTERVAL
+
+
+def flush(connection: Any) -> None:
+    '''
+    Adds this instance's deltas since the last flush into the shared query_stats
+    table with one multi-row upsert, so the request that triggers it pays a
+    single round trip.
+    '''
+    import psycopg2
+    import psycopg2.extensions
+    from psycopg2.extras import execute_values
+
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+    if not pending:
+        return
+
+    # Keys sharing their first 4000 characters land on one row; one upsert may not touch it twice
+    rows: Dict[str, List[Any]] = {}
+    for key, stat in pending.items():
+        explain = json.dumps(stat.explain) if stat.explain is not None else None
+        row = rows.get(key[:4000])
+        if row is None:
+            rows[key[:4000]] = [key[:4000], stat.calls, stat.total_ms, stat.max_ms, stat.rows, stat.slow_calls, explain]
+        else:
+            row[1:6] = [row[1] + stat.calls, row[2] + stat.total_ms, max(row[3], stat.max_ms),
+                        row[4] + stat.rows, row[5] + stat.slow_calls]
+            row[6] = explain or row[6]
+
+    cur = psycopg2.extensions.cursor(connection)
+    try:
+        execute_values(
+            cur,
+            """
+            INSERT INTO query_stats AS s (fingerprint, calls, total_ms, max_ms, rows, slow_calls, last_explain, last_explain_at)
+            VALUES %s
+            ON CONFLICT (fingerprint) DO UPDATE SET
+                calls = s.calls + EXCLUDED.calls,
+                total_ms = s.total_ms + EXCLUDED.total_ms,
+                max_ms = GREATEST(s.max_ms, EXCLUDED.max_ms),
+                rows = s.rows + EXCLUDED.rows,
+                slow_calls = s.slow_calls + EXCLUDED.slow_calls,
+                last_explain = COALESCE(EXCLUDED.last_explain, s.last_explain),
+                last_explain_at = COALESCE(EXCLUDED.last_explain_at, s.last_explain_at),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            [row + [row[6]] for row in rows.values()],
+            template='(%s, %s, %s, %s, %s, %s, %s::jsonb, CASE WHEN %s IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END)',
+            page_size=len(rows)
+        )
+        connection.commit()
+    except psycopg2.Error:
+        connection.rollback()
+    finally:
+        cur.close()
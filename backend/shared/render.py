@@ -0,0 +1,9 @@
+'''
+Business: Choose where list endpoints build their JSON bodies
+Args: JSON_RENDER env var - "db" (Postgres json_agg, default) or "python" (row loop + json.dumps)
+'''
+
+import os
+
+def db_json_rendering() -> bool:
+    return os.environ.get('JSON_RENDER', 'db') != 'python'
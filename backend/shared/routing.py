@@ -0,0 +1,86 @@
+'''
+Business: Declarative method routing with prebuilt preflight and error responses
+Args: Router(routes, allow_headers, expose_headers) - routes map HTTP method to a
+      route function taking (event, context) and returning a response dict
+Returns: Router, json_response(), error_response() and METHOD_NOT_ALLOWED
+
+Prebuilt responses are shared between requests: callers that need to change one
+must copy it (and its headers) first.
+'''
+
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+
+from shared.serialize import dumps
+
+Route = Callable[[Dict[str, Any], Any], Dict[str, Any]]
+
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Handlers pass constant messages; the cap keeps a stray dynamic one from growing the cache
+MAX_CACHED_ERRORS = 256
+_errors: Dict[Tuple[int, str], Dict[str, Any]] = {}
+
+
+def json_response(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return {
+        'statusCode': status,
+        'headers': dict(JSON_HEADERS, **headers) if headers else JSON_HEADERS,
+        'body': dumps(payload),
+        'isBase64Encoded': False
+    }
+
+
+def error_response(status: int, message: str) -> Dict[str, Any]:
+    '''
+    Returns the {"error": message} response, built once per status/message
+    pair. The message goes to the client as is, so it must be a fixed text,
+    never str() of an exception.
+    '''
+    key = (status, message)
+    response = _errors.get(key)
+    if response is None:
+        response = json_response(status, {'error': message})
+        if len(_errors) < MAX_CACHED_ERRORS:
+            _errors[key] = response
+    return response
+
+
+METHOD_NOT_ALLOWED = error_response(405, 'Method not allowed')
+
+
+class Router:
+    '''
+    Dispatches on httpMethod. OPTIONS is answered with a preflight response
+    derived from the route table and unknown methods get a 405, both built once
+    at import time.
+    '''
+
+    def __init__(self, routes: Dict[str, Route], allow_headers: Iterable[str] = ('Content-Type',),
+                 expose_headers: Iterable[str] = ()):
+        self.routes = dict(routes)
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': ', '.join(list(self.routes) + ['OPTIONS']),
+            'Access-Control-Allow-Headers': ', '.join(allow_headers),
+            'Access-Control-Max-Age': '86400'
+        }
+        if expose_headers:
+            headers['Access-Control-Expose-Headers'] = ', '.join(expose_headers)
+        self.preflight = {
+            'statusCode': 200,
+            'headers': headers,
+            'body': '',
+            'isBase64Encoded': False
+        }
+
+    def dispatch(self, event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        method = event.get('httpMethod', 'GET')
+        if method == 'OPTIONS':
+            return self.preflight
+        route = self.routes.get(method)
+        if route is None:
+            return METHOD_NOT_ALLOWED
+        return route(event, context)
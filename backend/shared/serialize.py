@@ -0,0 +1,29 @@
+'''
+Business: Single JSON serializer for response bodies
+Args: JSON_SERIALIZER - "json" (default, stdlib) or "orjson" (used when installed,
+      otherwise falls back to stdlib)
+Returns: dumps(obj) -> str
+'''
+
+import json
+import os
+from typing import Any, Callable
+
+SERIALIZER = os.environ.get('JSON_SERIALIZER', 'json').lower()
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj)
+
+
+def _select() -> Callable[[Any], str]:
+    if SERIALIZER == 'orjson':
+        try:
+            import orjson
+        except ImportError:
+            return _stdlib_dumps
+        return lambda obj: orjson.dumps(obj).decode()
+    return _stdlib_dumps
+
+
+dumps = _select()
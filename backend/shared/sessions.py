@@ -0,0 +1,171 @@
+'''
+Business: Stateless HMAC-signed admin sessions, verified in memory by every function
+Args: ADMIN_SESSION_SECRET - signing key; without it no sessions are issued and admin routes answer 503
+      ADMIN_SESSION_TTL - token lifetime in seconds; ADMIN_SESSION_REVOCATION_REFRESH - seconds
+      between cheap version checks of the revocation list
+Returns: issue/verify helpers, a ready-made 401 response and the admin_only route decorator
+'''
+
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Any, Optional, Set
+
+from shared.db import get_db_connection, release_db_connection
+from shared.http import get_header
+from shared.routing import Route, error_response
+from shared.versions import fetch_version
+
+SESSION_HEADER = 'X-Admin-Session'
+REVOCATIONS_VERSION_NAME = 'admin_session_revocations'
+SESSION_REQUIRED = error_response(401, 'Admin session required')
+SESSIONS_NOT_CONFIGURED = error_response(503, 'Admin sessions are not configured')
+
+
+def _secret() -> bytes:
+    return os.environ.get('ADMIN_SESSION_SECRET', '').encode()
+
+
+def sessions_enabled() -> bool:
+    return bool(_secret())
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_session_token(admin_id: int, username: str) -> Dict[str, Any]:
+    now = int(time.time())
+    claims = {
+        'sub': admin_id,
+        'usr': username,
+        'iat': now,
+        'exp': now + int(os.environ.get('ADMIN_SESSION_TTL', 12 * 3600)),
+        'jti': secrets.token_hex(8),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    return {'token': f'{payload}.{_sign(payload)}', 'expires_at': claims['exp']}
+
+
+def decode_session_token(token: str) -> Optional[Dict[str, Any]]:
+    '''Returns the claims of a well-signed, unexpired token, else None. No revocation check.'''
+    if not token or token.count('.') != 1:
+        return None
+    payload, signature = token.split('.')
+    # Bytes, because compare_digest rejects str with non-ASCII characters
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(claims, dict) or claims.get('exp', 0) <= time.time():
+        return None
+    return claims
+
+
+class RevocationList:
+    '''
+    In-memory copy of admin_session_revocations. The table's cache_versions stamp
+    is checked at most once per refresh_interval, and the rows are reloaded only
+    when it moved, so verifying a session normally costs no query at all.
+    '''
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self._version: Optional[int] = None
+        self._checked_at = float('-inf')
+        self._jtis: Set[str] = set()
+        self._revoked_before: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        import psycopg2
+
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            version = fetch_version(cur, REVOCATIONS_VERSION_NAME)
+            if version != self._version:
+                cur.execute(
+                    """
+                    SELECT jti, admin_id, EXTRACT(EPOCH FROM revoked_at)
+                    FROM admin_session_revocations
+                    WHERE expires_at > CURRENT_TIMESTAMP
+                    """
+                )
+                jtis: Set[str] = set()
+                revoked_before: Dict[int, float] = {}
+                for jti, admin_id, revoked_at in cur.fetchall():
+                    if jti:
+                        jtis.add(jti)
+                    elif admin_id is not None:
+                        revoked_before[admin_id] = max(revoked_before.get(admin_id, 0), float(revoked_at))
+                self._jtis, self._revoked_before, self._version = jtis, revoked_before, version
+            cur.close()
+        except psycopg2.Error:
+            pass
+        finally:
+            release_db_connection(conn)
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= self.refresh_interval:
+                self._checked_at = now
+                self._refresh()
+            if claims.get('jti') in self._jtis:
+                return True
+            return claims.get('iat', 0) <= self._revoked_before.get(claims.get('sub'), -1)
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            self._jtis.add(jti)
+
+
+revocations = RevocationList(float(os.environ.get('ADMIN_SESSION_REVOCATION_REFRESH', 30)))
+
+
+def verify_admin_session(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    claims = decode_session_token(get_header(event, SESSION_HEADER) or '')
+    if claims is None or revocations.is_revoked(claims):
+        return None
+    return claims
+
+
+def check_admin_session(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    '''
+    Returns a 401 response when the request lacks a valid admin session, or None
+    when it may proceed. Without ADMIN_SESSION_SECRET every request gets a 503:
+    a missing secret must not leave admin routes open.
+    '''
+    if not sessions_enabled():
+        return SESSIONS_NOT_CONFIGURED
+    if verify_admin_session(event) is None:
+        return SESSION_REQUIRED
+    return None
+
+
+def admin_only(route: Route) -> Route:
+    '''Route decorator answering with the prebuilt 401 (or 503) unless check_admin_session passes.'''
+    @functools.wraps(route)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        auth_error = check_admin_session(event)
+        if auth_error:
+            return auth_error
+        return route(event, context)
+    return wrapper
@@ -0,0 +1,192 @@
+'''
+Business: Publish the public catalog, site content and FAQs as static, content-hashed JSON files
+Args: SNAPSHOT_DIR - output directory standing in for the CDN bucket (publishing is off when unset);
+      SNAPSHOT_RETAIN_SECONDS - how long superseded files stay for clients holding an older manifest
+Returns: publish_snapshots(conn) for the CLI and publish_after_write() for the write routes
+
+Every dataset is written as <name>.<hash>.json plus .gz and .br siblings, so a
+file name never changes meaning and can be cached forever. manifest.json maps
+dataset names to the current files and is replaced with one atomic rename
+after every file it points to is in place; it is the only file that must not
+be cached. Publishes are serialized with an advisory lock and skipped when the
+cache_versions stamps match the manifest already published.
+'''
+
+import gzip
+import hashlib
+import json
+import os
+import secrets
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from shared.db import get_db_connection, release_db_connection
+from shared.http import STATIC_LEVELS, brotli_module
+from shared.versions import fetch_versions
+
+SOURCES = ('faqs', 'privileges', 'site_content')
+MANIFEST_NAME = 'manifest.json'
+RETAIN_SECONDS = int(os.environ.get('SNAPSHOT_RETAIN_SECONDS', 24 * 3600))
+PUBLISH_LOCK_KEY = 0x5e1f_5a9e
+
+SNAPSHOT_SQL = """
+    SELECT
+        COALESCE(
+            (SELECT json_agg(json_build_object(
+                'id', id,
+                'name', name,
+                'description', description,
+                'price', price::float8,
+                'features', features,
+                'is_active', is_active,
+                'image_url', image_url
+            ) ORDER BY price)
+            FROM privileges WHERE is_active = true),
+            '[]'::json
+        )::text,
+        COALESCE((SELECT json_object_agg(key, value) FROM site_content), '{}'::json)::text,
+        COALESCE(
+            (SELECT json_agg(json_build_object(
+                'id', id,
+                'question', question,
+                'answer', answer,
+                'order_index', order_index
+            ) ORDER BY order_index, id)
+            FROM faqs),
+            '[]'::json
+        )::text
+"""
+
+
+def snapshot_dir() -> Optional[str]:
+    return os.environ.get('SNAPSHOT_DIR') or None
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = os.path.join(os.path.dirname(path), f'.tmp-{secrets.token_hex(8)}')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_hashed(directory: str, name: str, body: str) -> str:
+    '''Writes <name>.<hash>.json and its compressed variants unless present; returns the file name.'''
+    raw = body.encode()
+    file_name = f'{name}.{hashlib.sha256(raw).hexdigest()[:16]}.json'
+    path = os.path.join(directory, file_name)
+    if not os.path.exists(path):
+        _write_atomic(path + '.gz', gzip.compress(raw, compresslevel=STATIC_LEVELS['gzip'], mtime=0))
+        brotli = brotli_module()
+        if brotli is not None:
+            _write_atomic(path + '.br', brotli.compress(raw, quality=STATIC_LEVELS['br']))
+        # The plain file goes last: its presence means the variants are complete
+        _write_atomic(path, raw)
+    return file_name
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'rb') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def remove_superseded(directory: str, manifest: Dict[str, Any], retain_seconds: int) -> int:
+    '''
+    Deletes hashed files the manifest no longer references, and temp files of
+    crashed publishes, once they are older than retain_seconds.
+    '''
+    current = set(manifest['files'].values())
+    cutoff = time.time() - retain_seconds
+    removed = 0
+    for entry in os.scandir(directory):
+        base = entry.name[:-3] if entry.name.endswith(('.gz', '.br')) else entry.name
+        if base == MANIFEST_NAME or base in current:
+            continue
+        if not base.endswith('.json') and not entry.name.startswith('.tmp-'):
+            continue
+        if entry.stat().st_mtime < cutoff:
+            os.unlink(entry.path)
+            removed += 1
+    return removed
+
+
+def publish_snapshots(conn: Any, directory: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    '''
+    Renders every dataset with one statement and swaps the manifest in.
+    Returns the published (or unchanged current) manifest with a 'changed' flag.
+    '''
+    directory = directory or snapshot_dir()
+    if not directory:
+        raise ValueError('SNAPSHOT_DIR is not set')
+    os.makedirs(directory, exist_ok=True)
+
+    cur = conn.cursor()
+    try:
+        # Concurrent publishers queue here, so the last one to render also renames last
+        cur.execute('SELECT pg_advisory_xact_lock(%s)', (PUBLISH_LOCK_KEY,))
+        versions = fetch_versions(cur, SOURCES)
+        current = read_manifest(directory)
+        if not force and current is not None and current.get('versions') == versions:
+            conn.rollback()
+            return dict(current, changed=False)
+
+        cur.execute(SNAPSHOT_SQL)
+        privileges, content, faqs = cur.fetchone()
+        bootstrap = f'{{"content": {content}, "privileges": {privileges}, "faqs": {faqs}}}'
+        files = {
+            'privileges': write_hashed(directory, 'privileges', privileges),
+            'content': write_hashed(directory, 'content', content),
+            'faqs': write_hashed(directory, 'faqs', faqs),
+            'bootstrap': write_hashed(directory, 'bootstrap', bootstrap),
+        }
+        manifest = {
+            'versions': versions,
+            'published_at': datetime.now(timezone.utc).isoformat(),
+            'files': files,
+            'encodings': ['gzip', 'br'] if brotli_module() is not None else ['gzip'],
+        }
+        _write_atomic(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    remove_superseded(directory, manifest, RETAIN_SECONDS)
+    return dict(manifest, changed=True)
+
+
+def publish_after_write() -> None:
+    '''
+    Republishes after a committed write when SNAPSHOT_DIR is set. A failed
+    publish is logged, never raised: the functions keep serving fresh data
+    and the next write or a CLI run catches the snapshot up.
+    '''
+    if not snapshot_dir():
+        return
+    import psycopg2
+
+    conn = get_db_connection()
+    try:
+        manifest = publish_snapshots(conn)
+        sys.stdout.write(json.dumps({
+            'snapshot_published': manifest['changed'],
+            'versions': manifest['versions'],
+        }) + '\n')
+    except (OSError, psycopg2.Error) as e:
+        sys.stdout.write(json.dumps({'snapshot_publish_failed': str(e)}) + '\n')
+    finally:
+        release_db_connection(conn)
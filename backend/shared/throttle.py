@@ -0,0 +1,192 @@
+'''
+Business: Brute-force throttling for admin login with token buckets per username and source IP
+Args: AUTH_THROTTLE - "0" disables throttling; AUTH_THROTTLE_IP_PER_MINUTE and
+      AUTH_THROTTLE_USERNAME_PER_MINUTE - sustained attempts per key (also the burst size);
+      AUTH_THROTTLE_WINDOW - seconds in the shared sliding window
+Returns: login_throttle, too_many_attempts() and throttle_stats()
+
+Buckets live in memory, so a warm instance rejects a burst before opening a DB
+connection. Admitted attempts are also counted in the auth_throttle table (one
+row per key, current and previous window) so the limit holds across instances.
+A key the table finds over its limit is blocked in memory until Retry-After.
+'''
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from shared.http import get_header
+from shared.prepared import PreparedStatement
+from shared.routing import json_response
+
+ENABLED = os.environ.get('AUTH_THROTTLE', '1') not in ('0', 'false', 'no')
+WINDOW = int(os.environ.get('AUTH_THROTTLE_WINDOW', 60))
+LIMITS = {
+    'ip': float(os.environ.get('AUTH_THROTTLE_IP_PER_MINUTE', 10)),
+    'user': float(os.environ.get('AUTH_THROTTLE_USERNAME_PER_MINUTE', 20)),
+}
+MAX_KEYS = 10000
+PRUNE_INTERVAL = 300
+
+# Sorted keys lock their rows in the same order in every transaction
+RECORD_SQL = """
+    INSERT INTO auth_throttle AS t (key, window_index, attempts, previous_attempts)
+    VALUES {values}
+    ON CONFLICT (key) DO UPDATE SET
+        previous_attempts = CASE
+            WHEN t.window_index = EXCLUDED.window_index THEN t.previous_attempts
+            WHEN t.window_index = EXCLUDED.window_index - 1 THEN t.attempts
+            ELSE 0
+        END,
+        attempts = CASE WHEN t.window_index = EXCLUDED.window_index THEN t.attempts + 1 ELSE 1 END,
+        window_index = EXCLUDED.window_index
+    RETURNING key, attempts, previous_attempts
+"""
+
+RECORD = PreparedStatement('record_auth_attempts', RECORD_SQL)
+
+PRUNE_SQL = "DELETE FROM auth_throttle WHERE window_index < %s"
+
+Key = Tuple[str, str]
+
+
+def source_ip(event: Dict[str, Any]) -> str:
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    if identity.get('sourceIp'):
+        return identity['sourceIp']
+    forwarded = get_header(event, 'X-Forwarded-For')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return 'unknown'
+
+
+def sliding_retry_after(attempts: int, previous: int, elapsed: float, limit: float, window: float) -> float:
+    '''
+    Seconds until the sliding estimate previous * (1 - elapsed / window) + attempts
+    drops back to the limit; 0 when it is already within it.
+    '''
+    if previous * (1 - elapsed / window) + attempts <= limit:
+        return 0.0
+    if attempts > limit:
+        # Wait for the next window, then for this window's attempts to slide out
+        return (window - elapsed) + window * (1 - limit / attempts)
+    return window * (1 - (limit - attempts) / previous) - elapsed
+
+
+class LoginThrottle:
+    def __init__(self, limits: Dict[str, float], window: int):
+        self.limits = limits
+        self.window = window
+        # key -> [tokens, refilled_at]; refilled_at in the future blocks the key until then
+        self._buckets: 'OrderedDict[Key, List[float]]' = OrderedDict()
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self.counters = {'admitted': 0, 'rejected_memory': 0, 'rejected_shared': 0}
+        self.rejected_by_scope = {scope: 0 for scope in limits}
+
+    def keys(self, username: str, ip: str) -> List[Key]:
+        return [('ip', ip), ('user', username.strip().lower())]
+
+    def _bucket(self, key: Key, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.limits[key[0]], now]
+            if len(self._buckets) > MAX_KEYS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        rate = self.limits[key[0]] / 60
+        if now > bucket[1]:
+            bucket[0] = min(self.limits[key[0]], bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def check(self, keys: List[Key]) -> float:
+        '''Takes a token from every key's bucket, or returns the seconds to wait without taking any.'''
+        with self._lock:
+            now = time.monotonic()
+            buckets = [(key, self._bucket(key, now)) for key in keys]
+            waits = []
+            for key, (tokens, refilled_at) in buckets:
+                if tokens < 1 or refilled_at > now:
+                    waits.append(max(refilled_at - now, 0) + max(1 - tokens, 0) * 60 / self.limits[key[0]])
+                    self.rejected_by_scope[key[0]] += 1
+            if waits:
+                self.counters['rejected_memory'] += 1
+                return max(waits)
+            for _, bucket in buckets:
+                bucket[0] -= 1
+            return 0.0
+
+    def block(self, key: Key, seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(key, now)
+            # One attempt is let through once the block ends, to re-check the shared count
+            bucket[0] = 1
+            bucket[1] = now + seconds
+
+    def _storage_key(self, key: Key) -> str:
+        # Fixed width, and attacker-chosen usernames never reach the table verbatim
+        return key[0] + ':' + hashlib.sha256(key[1].encode()).hexdigest()[:32]
+
+    def record(self, cur: Any, keys: List[Key]) -> float:
+        '''
+        Counts the attempt in auth_throttle on the caller's transaction and returns
+        the seconds to wait if any key is over its limit across all instances.
+        '''
+        now = time.time()
+        window_index, elapsed = divmod(now, self.window)
+        window_index = int(window_index)
+        stored = {self._storage_key(key): key for key in keys}
+        ordered = sorted(stored)
+        values = ', '.join(['(%s, %s, 1, 0)'] * len(ordered))
+        args: List[Any] = []
+        for storage_key in ordered:
+            args.extend([storage_key, window_index])
+        RECORD.variant(values=values).execute(cur, args)
+
+        waits: Dict[Key, float] = {}
+        for storage_key, attempts, previous in cur.fetchall():
+            key = stored[storage_key]
+            limit = self.limits[key[0]] * self.window / 60
+            wait = sliding_retry_after(attempts, previous, elapsed, limit, self.window)
+            if wait > 0:
+                waits[key] = wait
+
+        if now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            cur.execute(PRUNE_SQL, (window_index - 1,))
+
+        with self._lock:
+            if not waits:
+                self.counters['admitted'] += 1
+                return 0.0
+            self.counters['rejected_shared'] += 1
+            for key in waits:
+                self.rejected_by_scope[key[0]] += 1
+        for key, wait in waits.items():
+            self.block(key, wait)
+        return max(waits.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, rejected_by_scope=dict(self.rejected_by_scope), tracked_keys=len(self._buckets))
+
+
+login_throttle = LoginThrottle(LIMITS, WINDOW)
+
+
+def too_many_attempts(retry_after: float) -> Dict[str, Any]:
+    return json_response(429, {'error': 'Too many login attempts, try again later'}, {
+        'Retry-After': str(max(1, math.ceil(retry_after))),
+        'Access-Control-Expose-Headers': 'Retry-After'
+    })
+
+
+def throttle_stats() -> Optional[Dict[str, Any]]:
+    return login_throttle.stats() if ENABLED else None
@@ -0,0 +1,204 @@
+'''
+Business: Per-request phase timing for backend handlers (Server-Timing header, one JSON
+          log line per request, per-instance latency histograms)
+Args: REQUEST_TIMING - "0" disables everything (handlers are then returned unwrapped)
+      REQUEST_TIMING_LOG - "0" keeps headers and histograms but skips the log line
+Returns: instrumented decorator, phase() context manager, dump_histograms() and
+         cold_start_profiles() (import time and first-request latency per function)
+'''
+
+import bisect
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Callable, Iterator, Optional
+
+from shared import IMPORT_STARTED
+from shared.instancestats import log_instance_stats_if_due
+
+ENABLED = os.environ.get('REQUEST_TIMING', '1') not in ('0', 'false', 'no')
+LOG_ENABLED = os.environ.get('REQUEST_TIMING_LOG', '1') not in ('0', 'false', 'no')
+
+BUCKET_BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_local = threading.local()
+
+
+class RequestTimer:
+    __slots__ = ('started', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, fraction: float) -> float:
+        '''Upper bound of the bucket holding the requested quantile.'''
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': self.max_ms,
+            'buckets': dict(zip([f'<={b}' for b in BUCKET_BOUNDS_MS] + ['inf'], self.counts)),
+        }
+
+
+_histograms: Dict[str, Dict[str, Histogram]] = {}
+_histograms_lock = threading.Lock()
+_cold_starts: Dict[str, Dict[str, Any]] = {}
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return getattr(_local, 'timer', None)
+
+
+@contextlib.contextmanager
+def _phase(name: str) -> Iterator[None]:
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+def phase(name: str) -> Any:
+    '''Times the enclosed block as `name` for the request running on this thread.'''
+    return _phase(name) if ENABLED else _NULL_PHASE
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timer = current_timer()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def _observe(function_name: str, phases: Dict[str, float]) -> None:
+    with _histograms_lock:
+        per_function = _histograms.setdefault(function_name, {})
+        for name, ms in phases.items():
+            histogram = per_function.get(name)
+            if histogram is None:
+                histogram = per_function[name] = Histogram()
+            histogram.observe(ms)
+
+
+def dump_histograms() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    with _histograms_lock:
+        return {
+            function_name: {name: histogram.to_dict() for name, histogram in phases.items()}
+            for function_name, phases in _histograms.items()
+        }
+
+
+def cold_start_profiles() -> Dict[str, Dict[str, Any]]:
+    with _histograms_lock:
+        return {function_name: dict(profile) for function_name, profile in _cold_starts.items()}
+
+
+def _server_timing(phases_ms: Dict[str, float]) -> str:
+    return ', '.join(f'{name};dur={ms:.2f}' for name, ms in phases_ms.items())
+
+
+def instrumented(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    '''
+    Wraps a function handler: times the request and its phases, adds a
+    Server-Timing header, logs one JSON line and feeds the histograms. Every
+    INSTANCE_STATS_LOG_INTERVAL it also logs the instance's counters.
+    With REQUEST_TIMING=0 the handler is returned untouched.
+    '''
+    if not ENABLED:
+        return handler
+
+    default_name = os.path.basename(os.path.dirname(os.path.abspath(handler.__code__.co_filename)))
+    import_profile = {
+        'import_ms': (time.perf_counter() - IMPORT_STARTED) * 1000,
+        'modules_at_import': len(sys.modules),
+        'psycopg2_at_import': 'psycopg2' in sys.modules,
+    }
+    state = {'cold': True}
+
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        cold, state['cold'] = state['cold'], False
+        timer = RequestTimer()
+        _local.timer = timer
+        response: Optional[Dict[str, Any]] = None
+        try:
+            response = handler(event, context)
+        finally:
+            _local.timer = None
+            total = time.perf_counter() - timer.started
+            phases_ms = {name: seconds * 1000 for name, seconds in timer.phases.items()}
+            phases_ms['app'] = max(0.0, total * 1000 - sum(phases_ms.values()))
+            phases_ms['total'] = total * 1000
+            function_name = getattr(context, 'function_name', None) or default_name
+            _observe(function_name, phases_ms)
+            if cold:
+                profile = dict(import_profile, first_request_ms=phases_ms['total'])
+                with _histograms_lock:
+                    _cold_starts[function_name] = profile
+
+            if LOG_ENABLED:
+                record = {
+                    'request_id': getattr(context, 'request_id', None),
+                    'function_name': function_name,
+                    'method': event.get('httpMethod'),
+                    'status': response.get('statusCode') if response is not None else 500,
+                    'cold_start': cold,
+                    'duration_ms': round(phases_ms['total'], 3),
+                    'phases_ms': {name: round(ms, 3) for name, ms in phases_ms.items() if name != 'total'},
+                }
+                if cold:
+                    record['cold_start_profile'] = {
+                        name: round(value, 3) if isinstance(value, float) else value
+                        for name, value in profile.items()
+                    }
+                sys.stdout.write(json.dumps(record) + '\n')
+            log_instance_stats_if_due(function_name)
+
+        headers = dict(response.get('headers') or {})
+        headers['Server-Timing'] = _server_timing(phases_ms)
+        headers['Timing-Allow-Origin'] = '*'
+        return dict(response, headers=headers)
+
+    wrapper.__wrapped__ = handler
+    wrapper.__doc__ = handler.__doc__
+    return wrapper
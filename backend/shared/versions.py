@@ -0,0 +1,21 @@
+'''
+Business: Read the per-table version stamps kept in cache_versions by triggers
+'''
+
+from typing import Any, Dict, Tuple
+
+from shared.prepared import PreparedStatement
+
+VERSION = PreparedStatement('cache_version', "SELECT version FROM cache_versions WHERE name = %s")
+VERSIONS = PreparedStatement('cache_versions', "SELECT name, version FROM cache_versions WHERE name = ANY(%s)")
+
+def fetch_version(cur: Any, name: str) -> int:
+    VERSION.execute(cur, (name,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def fetch_versions(cur: Any, names: Tuple[str, ...]) -> Dict[str, int]:
+    VERSIONS.execute(cur, (list(names),))
+    versions = {name: 0 for name in names}
+    versions.update(dict(cur.fetchall()))
+    return versions
@@ -0,0 +1,10 @@
+-- Keyset pagination for the admin order listing: newest first, id as tie-breaker
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (created_at DESC, id DESC);
+
+-- Same ordering, narrowed by the status and privilege filters
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_orders_privilege_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (privilege_id, created_at DESC, id DESC);
@@ -0,0 +1,33 @@
+-- Version stamps for cacheable read endpoints (ETag source)
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.cache_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p98795140_minecraft_anarchy_si.cache_versions (name) VALUES
+('privileges'),
+('site_content')
+ON CONFLICT (name) DO NOTHING;
+
+-- Bump the stamp named after the modified table once per statement
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO t_p98795140_minecraft_anarchy_si.cache_versions (name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (name) DO UPDATE
+    SET version = cache_versions.version + 1, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS privileges_bump_cache_version ON t_p98795140_minecraft_anarchy_si.privileges;
+CREATE TRIGGER privileges_bump_cache_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p98795140_minecraft_anarchy_si.privileges
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version();
+
+DROP TRIGGER IF EXISTS site_content_bump_cache_version ON t_p98795140_minecraft_anarchy_si.site_content;
+CREATE TRIGGER site_content_bump_cache_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p98795140_minecraft_anarchy_si.site_content
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version();
@@ -0,0 +1,16 @@
+-- Broadcast every version bump so warm function instances can drop cached bodies
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version()
+RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO t_p98795140_minecraft_anarchy_si.cache_versions (name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (name) DO UPDATE
+    SET version = cache_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME || ':' || new_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,9 @@
+-- FAQs feed the landing page bootstrap payload, so version them like the catalog
+INSERT INTO t_p98795140_minecraft_anarchy_si.cache_versions (name) VALUES
+('faqs')
+ON CONFLICT (name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS faqs_bump_cache_version ON t_p98795140_minecraft_anarchy_si.faqs;
+CREATE TRIGGER faqs_bump_cache_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p98795140_minecraft_anarchy_si.faqs
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version();
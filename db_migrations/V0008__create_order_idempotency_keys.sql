@@ -0,0 +1,12 @@
+-- Idempotency keys for order creation: a retried POST replays the stored order_id
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.order_idempotency_keys (
+    idempotency_key VARCHAR(128) PRIMARY KEY,
+    order_id INTEGER,
+    request_hash CHAR(64) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Lets the purge job find expired keys without scanning the table
+CREATE INDEX IF NOT EXISTS idx_order_idempotency_keys_expires_at
+    ON t_p98795140_minecraft_anarchy_si.order_idempotency_keys (expires_at);
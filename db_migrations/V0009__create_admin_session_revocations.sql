@@ -0,0 +1,21 @@
+-- Revoked admin sessions: a single token (jti) or every token of an admin issued before revoked_at
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.admin_session_revocations (
+    id SERIAL PRIMARY KEY,
+    jti VARCHAR(32),
+    admin_id INTEGER,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_admin_session_revocations_expires_at
+    ON t_p98795140_minecraft_anarchy_si.admin_session_revocations (expires_at);
+
+-- Functions reload their in-memory copy only when this stamp moves
+INSERT INTO t_p98795140_minecraft_anarchy_si.cache_versions (name) VALUES
+('admin_session_revocations')
+ON CONFLICT (name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS admin_session_revocations_bump_cache_version ON t_p98795140_minecraft_anarchy_si.admin_session_revocations;
+CREATE TRIGGER admin_session_revocations_bump_cache_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p98795140_minecraft_anarchy_si.admin_session_revocations
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.bump_cache_version();
@@ -0,0 +1,12 @@
+-- Per-statement query statistics flushed periodically by every function instance
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.query_stats (
+    fingerprint TEXT PRIMARY KEY,
+    calls BIGINT NOT NULL DEFAULT 0,
+    total_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    rows BIGINT NOT NULL DEFAULT 0,
+    slow_calls BIGINT NOT NULL DEFAULT 0,
+    last_explain JSONB,
+    last_explain_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,89 @@
+-- Order counts and revenue per day, privilege and status, kept current by statement-level
+-- triggers on orders. Revenue is valued at the privilege price when the delta is applied;
+-- maintenance.rebuild_order_rollups recomputes any range from orders.
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.order_daily_rollups (
+    day DATE NOT NULL,
+    privilege_id INTEGER NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, privilege_id, status)
+);
+
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_daily_rollups AS r
+            (day, privilege_id, status, order_count, revenue)
+        SELECT n.created_at::date, COALESCE(n.privilege_id, 0), COALESCE(n.status, 'unknown'),
+               count(*), COALESCE(sum(p.price), 0)
+        FROM new_rows n
+        LEFT JOIN t_p98795140_minecraft_anarchy_si.privileges p ON p.id = n.privilege_id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, privilege_id, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Rows whose day, privilege and status did not change cancel out and are skipped
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_daily_rollups AS r
+            (day, privilege_id, status, order_count, revenue)
+        SELECT d.day, d.privilege_id, d.status, sum(d.delta), sum(d.amount)
+        FROM (
+            SELECT o.created_at::date AS day, COALESCE(o.privilege_id, 0) AS privilege_id,
+                   COALESCE(o.status, 'unknown') AS status, -1 AS delta, -COALESCE(p.price, 0) AS amount
+            FROM old_rows o
+            LEFT JOIN t_p98795140_minecraft_anarchy_si.privileges p ON p.id = o.privilege_id
+            UNION ALL
+            SELECT n.created_at::date, COALESCE(n.privilege_id, 0),
+                   COALESCE(n.status, 'unknown'), 1, COALESCE(p.price, 0)
+            FROM new_rows n
+            LEFT JOIN t_p98795140_minecraft_anarchy_si.privileges p ON p.id = n.privilege_id
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING sum(d.delta) <> 0 OR sum(d.amount) <> 0
+        ON CONFLICT (day, privilege_id, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue;
+    ELSE
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_daily_rollups AS r
+            (day, privilege_id, status, order_count, revenue)
+        SELECT o.created_at::date, COALESCE(o.privilege_id, 0), COALESCE(o.status, 'unknown'),
+               -count(*), -COALESCE(sum(p.price), 0)
+        FROM old_rows o
+        LEFT JOIN t_p98795140_minecraft_anarchy_si.privileges p ON p.id = o.privilege_id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, privilege_id, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_rollup_insert ON t_p98795140_minecraft_anarchy_si.orders;
+CREATE TRIGGER orders_rollup_insert
+    AFTER INSERT ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+DROP TRIGGER IF EXISTS orders_rollup_update ON t_p98795140_minecraft_anarchy_si.orders;
+CREATE TRIGGER orders_rollup_update
+    AFTER UPDATE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+DROP TRIGGER IF EXISTS orders_rollup_delete ON t_p98795140_minecraft_anarchy_si.orders;
+CREATE TRIGGER orders_rollup_delete
+    AFTER DELETE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+-- Backfill from the orders that already exist
+INSERT INTO t_p98795140_minecraft_anarchy_si.order_daily_rollups (day, privilege_id, status, order_count, revenue)
+SELECT o.created_at::date, COALESCE(o.privilege_id, 0), COALESCE(o.status, 'unknown'),
+       count(*), COALESCE(sum(p.price), 0)
+FROM t_p98795140_minecraft_anarchy_si.orders o
+LEFT JOIN t_p98795140_minecraft_anarchy_si.privileges p ON p.id = o.privilege_id
+GROUP BY 1, 2, 3
+ON CONFLICT (day, privilege_id, status) DO NOTHING;
@@ -0,0 +1,85 @@
+-- Range-partition orders by created_at, one partition per month. Ids, the id sequence,
+-- privilege_id and status are carried over unchanged; the primary key becomes
+-- (id, created_at) because a partitioned table's keys must include the partition key.
+-- maintenance.order_partitions keeps future partitions created and archives old ones.
+LOCK TABLE t_p98795140_minecraft_anarchy_si.orders IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE t_p98795140_minecraft_anarchy_si.orders RENAME TO orders_unpartitioned;
+ALTER TABLE t_p98795140_minecraft_anarchy_si.orders_unpartitioned
+    RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey;
+ALTER SEQUENCE t_p98795140_minecraft_anarchy_si.orders_id_seq OWNED BY NONE;
+
+CREATE TABLE t_p98795140_minecraft_anarchy_si.orders (
+    id INTEGER NOT NULL DEFAULT nextval('t_p98795140_minecraft_anarchy_si.orders_id_seq'),
+    privilege_id INTEGER REFERENCES t_p98795140_minecraft_anarchy_si.privileges(id),
+    player_name VARCHAR(255) NOT NULL,
+    player_email VARCHAR(255),
+    status VARCHAR(50) DEFAULT 'pending',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    player_phone VARCHAR(50),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE t_p98795140_minecraft_anarchy_si.orders_id_seq
+    OWNED BY t_p98795140_minecraft_anarchy_si.orders.id;
+
+-- Catches rows outside every monthly partition (e.g. clock skew); should stay empty
+CREATE TABLE t_p98795140_minecraft_anarchy_si.orders_default
+    PARTITION OF t_p98795140_minecraft_anarchy_si.orders DEFAULT;
+
+-- Monthly partitions from the oldest order through three months ahead
+DO $$
+DECLARE
+    month_start DATE;
+    last_month DATE := date_trunc('month', CURRENT_DATE + INTERVAL '3 months')::date;
+BEGIN
+    SELECT COALESCE(date_trunc('month', min(created_at))::date, date_trunc('month', CURRENT_DATE)::date)
+    INTO month_start
+    FROM t_p98795140_minecraft_anarchy_si.orders_unpartitioned;
+
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.%I '
+            'PARTITION OF t_p98795140_minecraft_anarchy_si.orders FOR VALUES FROM (%L) TO (%L)',
+            'orders_p' || to_char(month_start, 'YYYY_MM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+END;
+$$;
+
+INSERT INTO t_p98795140_minecraft_anarchy_si.orders
+    (id, privilege_id, player_name, player_email, status, created_at, player_phone)
+SELECT id, privilege_id, player_name, player_email, status,
+       COALESCE(created_at, CURRENT_TIMESTAMP), player_phone
+FROM t_p98795140_minecraft_anarchy_si.orders_unpartitioned;
+
+DROP TABLE t_p98795140_minecraft_anarchy_si.orders_unpartitioned;
+
+-- Keyset indexes from V0004, now created on every partition
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_orders_privilege_created_at_id
+    ON t_p98795140_minecraft_anarchy_si.orders (privilege_id, created_at DESC, id DESC);
+
+-- Rollup triggers from V0011 (the copy above is already counted in the rollup)
+CREATE TRIGGER orders_rollup_insert
+    AFTER INSERT ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+CREATE TRIGGER orders_rollup_update
+    AFTER UPDATE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+CREATE TRIGGER orders_rollup_delete
+    AFTER DELETE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
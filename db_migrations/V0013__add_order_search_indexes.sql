@@ -0,0 +1,31 @@
+-- Admin order search (orders ?q=): prefix, substring and phone lookups by index instead of
+-- scanning every partition. Indexes on the partitioned table cascade to all partitions,
+-- including the monthly ones maintenance.order_partitions creates later.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Digits only, with the Russian trunk prefix 8 folded into the country code 7, so
+-- "+7 (900) 123-45-67" and "89001234567" normalize to the same value
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.normalize_phone(phone TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT regexp_replace(regexp_replace(phone, '[^0-9]', '', 'g'), '^8([0-9]{10})$', '7\1')
+$$;
+
+-- Substring matches (three characters or more) on name, Telegram/email and phone digits
+CREATE INDEX IF NOT EXISTS idx_orders_player_name_trgm
+    ON t_p98795140_minecraft_anarchy_si.orders USING gin (lower(player_name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_orders_player_email_trgm
+    ON t_p98795140_minecraft_anarchy_si.orders USING gin (lower(player_email) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_orders_player_phone_trgm
+    ON t_p98795140_minecraft_anarchy_si.orders
+    USING gin (t_p98795140_minecraft_anarchy_si.normalize_phone(player_phone) gin_trgm_ops);
+
+-- Exact and prefix matches, including one- and two-character prefixes trigrams cannot serve
+CREATE INDEX IF NOT EXISTS idx_orders_player_name_prefix
+    ON t_p98795140_minecraft_anarchy_si.orders (lower(player_name) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_orders_player_phone_prefix
+    ON t_p98795140_minecraft_anarchy_si.orders
+    (t_p98795140_minecraft_anarchy_si.normalize_phone(player_phone) text_pattern_ops);
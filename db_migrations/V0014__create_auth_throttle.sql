@@ -0,0 +1,12 @@
+-- Login attempts per throttling key (hashed username or source IP) in fixed windows of
+-- AUTH_THROTTLE_WINDOW seconds; the current and previous window give a sliding estimate.
+-- Rows older than the previous window are pruned by the auth function.
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.auth_throttle (
+    key VARCHAR(40) PRIMARY KEY,
+    window_index BIGINT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    previous_attempts INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_auth_throttle_window_index
+    ON t_p98795140_minecraft_anarchy_si.auth_throttle (window_index);
@@ -0,0 +1,128 @@
+-- Rollup triggers from V0011 upserted one (day, privilege, status) row per order write, a
+-- hot row every concurrent intake transaction queued on, and valued revenue at the price
+-- the privilege had when the delta was applied, so rollups drifted from a rebuild after a
+-- price change. Orders now keep the price they were placed at, triggers only append
+-- deltas to an insert-only table, and fold_order_rollup_deltas() moves them into
+-- order_daily_rollups in batches (maintenance.fold_order_rollups, run every minute).
+-- Readers use order_daily_totals, which adds the deltas not folded yet.
+DROP TRIGGER IF EXISTS orders_rollup_insert ON t_p98795140_minecraft_anarchy_si.orders;
+DROP TRIGGER IF EXISTS orders_rollup_update ON t_p98795140_minecraft_anarchy_si.orders;
+DROP TRIGGER IF EXISTS orders_rollup_delete ON t_p98795140_minecraft_anarchy_si.orders;
+
+ALTER TABLE t_p98795140_minecraft_anarchy_si.orders ADD COLUMN IF NOT EXISTS price NUMERIC(10, 2);
+
+-- Existing orders get today's price, the value their rollups were counted at
+UPDATE t_p98795140_minecraft_anarchy_si.orders o
+SET price = p.price
+FROM t_p98795140_minecraft_anarchy_si.privileges p
+WHERE p.id = o.privilege_id AND o.price IS NULL;
+
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.set_order_price()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.price IS NULL OR (TG_OP = 'UPDATE' AND NEW.privilege_id IS DISTINCT FROM OLD.privilege_id) THEN
+        SELECT p.price INTO NEW.price
+        FROM t_p98795140_minecraft_anarchy_si.privileges p
+        WHERE p.id = NEW.privilege_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_set_price
+    BEFORE INSERT OR UPDATE OF privilege_id ON t_p98795140_minecraft_anarchy_si.orders
+    FOR EACH ROW EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.set_order_price();
+
+-- No key and no index: concurrent writers append without ever touching the same row
+CREATE TABLE IF NOT EXISTS t_p98795140_minecraft_anarchy_si.order_rollup_deltas (
+    day DATE NOT NULL,
+    privilege_id INTEGER NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    order_count BIGINT NOT NULL,
+    revenue NUMERIC(14, 2) NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_rollup_deltas
+            (day, privilege_id, status, order_count, revenue)
+        SELECT n.created_at::date, COALESCE(n.privilege_id, 0), COALESCE(n.status, 'unknown'),
+               count(*), COALESCE(sum(n.price), 0)
+        FROM new_rows n
+        GROUP BY 1, 2, 3;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Rows whose day, privilege, status and price did not change cancel out and are skipped
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_rollup_deltas
+            (day, privilege_id, status, order_count, revenue)
+        SELECT d.day, d.privilege_id, d.status, sum(d.delta), sum(d.amount)
+        FROM (
+            SELECT o.created_at::date AS day, COALESCE(o.privilege_id, 0) AS privilege_id,
+                   COALESCE(o.status, 'unknown') AS status, -1 AS delta, -COALESCE(o.price, 0) AS amount
+            FROM old_rows o
+            UNION ALL
+            SELECT n.created_at::date, COALESCE(n.privilege_id, 0),
+                   COALESCE(n.status, 'unknown'), 1, COALESCE(n.price, 0)
+            FROM new_rows n
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING sum(d.delta) <> 0 OR sum(d.amount) <> 0;
+    ELSE
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_rollup_deltas
+            (day, privilege_id, status, order_count, revenue)
+        SELECT o.created_at::date, COALESCE(o.privilege_id, 0), COALESCE(o.status, 'unknown'),
+               -count(*), -COALESCE(sum(o.price), 0)
+        FROM old_rows o
+        GROUP BY 1, 2, 3;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_rollup_insert
+    AFTER INSERT ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+CREATE TRIGGER orders_rollup_update
+    AFTER UPDATE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+CREATE TRIGGER orders_rollup_delete
+    AFTER DELETE ON t_p98795140_minecraft_anarchy_si.orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p98795140_minecraft_anarchy_si.apply_order_rollup_deltas();
+
+-- Moves every committed delta into order_daily_rollups; returns the rollup rows touched.
+-- Concurrent folds each take distinct deltas (the later one skips rows the earlier deleted).
+CREATE OR REPLACE FUNCTION t_p98795140_minecraft_anarchy_si.fold_order_rollup_deltas()
+RETURNS BIGINT AS $$
+    WITH taken AS (
+        DELETE FROM t_p98795140_minecraft_anarchy_si.order_rollup_deltas
+        RETURNING day, privilege_id, status, order_count, revenue
+    ), folded AS (
+        INSERT INTO t_p98795140_minecraft_anarchy_si.order_daily_rollups AS r
+            (day, privilege_id, status, order_count, revenue)
+        SELECT day, privilege_id, status, sum(order_count), sum(revenue)
+        FROM taken
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, privilege_id, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            revenue = r.revenue + EXCLUDED.revenue
+        RETURNING 1
+    )
+    SELECT count(*) FROM folded;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE VIEW t_p98795140_minecraft_anarchy_si.order_daily_totals AS
+SELECT day, privilege_id, status, sum(order_count) AS order_count, sum(revenue) AS revenue
+FROM (
+    SELECT day, privilege_id, status, order_count, revenue
+    FROM t_p98795140_minecraft_anarchy_si.order_daily_rollups
+    UNION ALL
+    SELECT day, privilege_id, status, order_count, revenue
+    FROM t_p98795140_minecraft_anarchy_si.order_rollup_deltas
+) t
+GROUP BY day, privilege_id, status;
@@ -0,0 +1,5 @@
+-- The fulfillment worker used to keep its claim transaction, and the row locks on the
+-- claimed orders, open while it talked to RCON. It now commits the claim right away,
+-- moving the orders to 'processing' with a lease; another worker may take them back
+-- once the lease has run out (the worker died or hung before recording outcomes).
+ALTER TABLE t_p98795140_minecraft_anarchy_si.orders ADD COLUMN IF NOT EXISTS fulfillment_lease_until TIMESTAMP;
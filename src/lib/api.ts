@@ -1,6 +1,8 @@
 import funcUrls from '../../backend/func2url.json';
 
 const API_URLS = {
+  bootstrap: (funcUrls as Record<string, string>).bootstrap,
+  snapshots: (funcUrls as Record<string, string>).snapshots,
   auth: funcUrls.auth,
   admins: funcUrls.admins,
   orders: funcUrls.orders,
@@ -14,9 +16,17 @@ export interface LoginResponse {
     id: number;
     username: string;
   };
+  session?: string;
+  expires_at?: number;
+  retryAfter?: number;
   error?: string;
 }
 
+let adminSession: string | null = sessionStorage.getItem('adminSession');
+
+const adminHeaders = (headers: Record<string, string> = {}): Record<string, string> =>
+  adminSession ? { ...headers, 'X-Admin-Session': adminSession } : headers;
+
 export interface Admin {
   id: number;
   username: string;
@@ -45,11 +55,81 @@ export interface Order {
   created_at: string;
 }
 
+export interface OrderListParams {
+  cursor?: string;
+  limit?: number;
+  status?: string;
+  privilege_id?: number;
+  from?: string;
+  to?: string;
+}
+
+export interface OrderPage {
+  orders: Order[];
+  nextCursor: string | null;
+}
+
+export interface SalesBucket {
+  orders: number;
+  revenue: number;
+}
+
+export interface SalesAnalytics {
+  period: 'day' | 'week';
+  totals: SalesBucket;
+  by_status: (SalesBucket & { status: string })[];
+  by_privilege: (SalesBucket & { privilege_id: number; privilege_name: string | null })[];
+  by_period: (SalesBucket & { period_start: string })[];
+}
+
 export interface ContentData {
   [key: string]: string;
 }
 
+export interface Faq {
+  id: number;
+  question: string;
+  answer: string;
+  order_index: number;
+}
+
+export interface SiteBootstrap {
+  content: ContentData;
+  privileges: Privilege[];
+  faqs: Faq[];
+}
+
+interface SnapshotManifest {
+  files: Record<'privileges' | 'content' | 'faqs' | 'bootstrap', string>;
+}
+
+const loadSnapshot = async (): Promise<SiteBootstrap | null> => {
+  if (!API_URLS.snapshots) return null;
+  try {
+    const manifestResponse = await fetch(`${API_URLS.snapshots}/manifest.json`, { cache: 'no-cache' });
+    if (!manifestResponse.ok) return null;
+    const manifest: SnapshotManifest = await manifestResponse.json();
+    const response = await fetch(`${API_URLS.snapshots}/${manifest.files.bootstrap}`);
+    return response.ok ? response.json() : null;
+  } catch (error) {
+    return null;
+  }
+};
+
 export const api = {
+  bootstrap: {
+    get: async (): Promise<SiteBootstrap> => {
+      const snapshot = await loadSnapshot();
+      if (snapshot) return snapshot;
+      if (API_URLS.bootstrap) {
+        const response = await fetch(API_URLS.bootstrap);
+        if (response.ok) return response.json();
+      }
+      const [content, privileges] = await Promise.all([api.content.get(), api.privileges.list()]);
+      return { content, privileges, faqs: [] };
+    },
+  },
+
   auth: {
     login: async (username: string, password: string): Promise<LoginResponse> => {
       const response = await fetch(API_URLS.auth, {
@@ -59,22 +139,38 @@ export const api = {
         },
         body: JSON.stringify({ username, password }),
       });
-      return response.json();
+      const result: LoginResponse = await response.json();
+      if (response.status === 429) {
+        return { ...result, success: false, retryAfter: Number(response.headers.get('Retry-After')) || 60 };
+      }
+      if (result.session) {
+        adminSession = result.session;
+        sessionStorage.setItem('adminSession', result.session);
+      }
+      return result;
+    },
+
+    logout: async (): Promise<void> => {
+      if (adminSession) {
+        await fetch(API_URLS.auth, { method: 'DELETE', headers: adminHeaders() });
+      }
+      adminSession = null;
+      sessionStorage.removeItem('adminSession');
     },
   },
 
   admins: {
     list: async (): Promise<Admin[]> => {
-      const response = await fetch(API_URLS.admins);
+      const response = await fetch(API_URLS.admins, { headers: adminHeaders() });
       return response.json();
     },
     
     create: async (username: string, password: string, created_by: string): Promise<{ success: boolean; id?: number; error?: string }> => {
       const response = await fetch(API_URLS.admins, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({ username, password, created_by }),
       });
       return response.json();
@@ -90,9 +186,9 @@ export const api = {
     create: async (data: { name: string; description: string; price: number; features: string[]; image_url?: string }): Promise<{ success: boolean; id?: number; error?: string }> => {
       const response = await fetch(API_URLS.privileges, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify(data),
       });
       return response.json();
@@ -101,35 +197,91 @@ export const api = {
     delete: async (id: number): Promise<{ success: boolean }> => {
       const response = await fetch(`${API_URLS.privileges}?id=${id}`, {
         method: 'DELETE',
+        headers: adminHeaders(),
       });
       return response.json();
     },
   },
 
   orders: {
-    list: async (): Promise<Order[]> => {
-      const response = await fetch(API_URLS.orders);
-      return response.json();
+    list: async (params: OrderListParams = {}): Promise<OrderPage> => {
+      const query = new URLSearchParams();
+      Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== '') query.set(key, String(value));
+      });
+      const qs = query.toString();
+      const response = await fetch(qs ? `${API_URLS.orders}?${qs}` : API_URLS.orders, { headers: adminHeaders() });
+      return {
+        orders: await response.json(),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+      };
     },
     
-    create: async (privilege_id: number, player_name: string, player_phone: string, player_email?: string): Promise<{ success: boolean; order_id?: number }> => {
+    export: async (format: 'csv' | 'ndjson', params: Omit<OrderListParams, 'cursor' | 'limit'> = {}): Promise<Blob> => {
+      const parts: string[] = [];
+      let cursor: string | null = null;
+      do {
+        const query = new URLSearchParams({ format });
+        Object.entries(params).forEach(([key, value]) => {
+          if (value !== undefined && value !== '') query.set(key, String(value));
+        });
+        if (cursor) query.set('cursor', cursor);
+        const response = await fetch(`${API_URLS.orders}?${query.toString()}`, { headers: adminHeaders() });
+        if (!response.ok) throw new Error('Export failed');
+        parts.push(await response.text());
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
+      return new Blob(parts, { type: format === 'csv' ? 'text/csv' : 'application/x-ndjson' });
+    },
+
+    search: async (q: string, limit?: number): Promise<Order[]> => {
+      const query = new URLSearchParams({ q });
+      if (limit) query.set('limit', String(limit));
+      const response = await fetch(`${API_URLS.orders}?${query.toString()}`, { headers: adminHeaders() });
+      if (!response.ok) throw new Error('Search failed');
+      return response.json();
+    },
+
+    analytics: async (params: { period?: 'day' | 'week'; from?: string; to?: string } = {}): Promise<SalesAnalytics> => {
+      const query = new URLSearchParams({ view: 'analytics' });
+      Object.entries(params).forEach(([key, value]) => {
+        if (value) query.set(key, value);
+      });
+      const response = await fetch(`${API_URLS.orders}?${query.toString()}`, { headers: adminHeaders() });
+      if (!response.ok) throw new Error('Failed to load analytics');
+      return response.json();
+    },
+
+    create: async (privilege_id: number, player_name: string, player_phone: string, player_email?: string, idempotencyKey?: string): Promise<{ success: boolean; order_id?: number }> => {
       const response = await fetch(API_URLS.orders, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
         },
         body: JSON.stringify({ privilege_id, player_name, player_phone, player_email }),
       });
       return response.json();
     },
     
-    updateStatus: async (order_id: number, status: string): Promise<{ success: boolean }> => {
+    updateStatus: async (order_id: number, status: string, created_at?: string): Promise<{ success: boolean }> => {
       const response = await fetch(API_URLS.orders, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ order_id, status }),
+        }),
+        body: JSON.stringify({ order_id, status, created_at }),
+      });
+      return response.json();
+    },
+
+    bulkUpdateStatus: async (order_ids: number[], status: string, created_from?: string): Promise<{ success: boolean; results: { order_id: number; success: boolean; error?: string }[] }> => {
+      const response = await fetch(API_URLS.orders, {
+        method: 'PUT',
+        headers: adminHeaders({
+          'Content-Type': 'application/json',
+        }),
+        body: JSON.stringify({ order_ids, status, created_from }),
       });
       return response.json();
     },
@@ -144,9 +296,9 @@ export const api = {
     update: async (key: string, value: string): Promise<{ success: boolean }> => {
       const response = await fetch(API_URLS.content, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({ key, value }),
       });
       return response.json();
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Button } from '@/components/ui/button';
 import { Card } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
@@ -9,7 +9,7 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Badge } from '@/components/ui/badge';
 import Icon from '@/components/ui/icon';
 import { useToast } from '@/hooks/use-toast';
-import { api, type Admin as AdminType, type Privilege, type Order, type ContentData } from '@/lib/api';
+import { api, type Admin as AdminType, type Privilege, type Order, type ContentData, type SalesAnalytics } from '@/lib/api';
 
 export default function Admin() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -21,6 +21,15 @@ export default function Admin() {
   const [admins, setAdmins] = useState<AdminType[]>([]);
   const [privileges, setPrivileges] = useState<Privilege[]>([]);
   const [orders, setOrders] = useState<Order[]>([]);
+  const [olderOrders, setOlderOrders] = useState<Order[]>([]);
+  const [ordersCursor, setOrdersCursor] = useState<string | null>(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
+  const [exportingOrders, setExportingOrders] = useState(false);
+  const [orderQuery, setOrderQuery] = useState('');
+  const [searchResults, setSearchResults] = useState<Order[] | null>(null);
+  const [searchingOrders, setSearchingOrders] = useState(false);
+  const olderOrdersRef = useRef<Order[]>([]);
+  const [analytics, setAnalytics] = useState<SalesAnalytics | null>(null);
   const [content, setContent] = useState<ContentData>({});
   const [loading, setLoading] = useState(false);
 
@@ -32,17 +41,22 @@ export default function Admin() {
     
     setLoading(true);
     try {
-      const [adminsData, privilegesData, ordersData, contentData] = await Promise.all([
+      const [adminsData, privilegesData, ordersData, contentData, analyticsData] = await Promise.all([
         api.admins.list(),
         api.privileges.list(),
         api.orders.list(),
         api.content.get(),
+        api.orders.analytics({ period: 'week' }).catch(() => null),
       ]);
       
       setAdmins(adminsData);
       setPrivileges(privilegesData);
-      setOrders(ordersData);
+      setOrders(ordersData.orders);
+      if (olderOrdersRef.current.length === 0) {
+        setOrdersCursor(ordersData.nextCursor);
+      }
       setContent(contentData);
+      setAnalytics(analyticsData);
     } catch (error) {
       toast({
         title: 'Ошибка загрузки',
@@ -80,6 +94,12 @@ export default function Admin() {
           title: 'Вход выполнен',
           description: 'Добро пожаловать в админ-панель!',
         });
+      } else if (result.retryAfter) {
+        toast({
+          title: 'Слишком много попыток',
+          description: `Повторите вход через ${result.retryAfter} с`,
+          variant: 'destructive',
+        });
       } else {
         toast({
           title: 'Ошибка входа',
@@ -197,9 +217,106 @@ export default function Admin() {
     }
   };
 
-  const handleOrderStatusChange = async (orderId: number, status: string) => {
+  const handleLoadMoreOrders = async () => {
+    if (!ordersCursor) return;
+
+    setLoadingMoreOrders(true);
+    try {
+      const page = await api.orders.list({ cursor: ordersCursor });
+      olderOrdersRef.current = [...olderOrdersRef.current, ...page.orders];
+      setOlderOrders(olderOrdersRef.current);
+      setOrdersCursor(page.nextCursor);
+    } catch (error) {
+      toast({
+        title: 'Ошибка загрузки',
+        description: 'Не удалось загрузить заказы',
+        variant: 'destructive',
+      });
+    }
+    setLoadingMoreOrders(false);
+  };
+
+  const handleSearchOrders = async (e: React.FormEvent) => {
+    e.preventDefault();
+    const q = orderQuery.trim();
+    if (!q) {
+      setSearchResults(null);
+      return;
+    }
+
+    setSearchingOrders(true);
+    try {
+      setSearchResults(await api.orders.search(q));
+    } catch (error) {
+      toast({
+        title: 'Ошибка поиска',
+        description: 'Не удалось найти заказы',
+        variant: 'destructive',
+      });
+    }
+    setSearchingOrders(false);
+  };
+
+  const handleExportOrders = async (format: 'csv' | 'ndjson') => {
+    setExportingOrders(true);
+    try {
+      const blob = await api.orders.export(format);
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `orders.${format}`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось выгрузить заказы',
+        variant: 'destructive',
+      });
+    }
+    setExportingOrders(false);
+  };
+
+  const handleCompletePendingOrders = async () => {
+    const pendingOrders = allOrders.filter((order) => order.status === 'pending');
+    const pendingIds = pendingOrders.map((order) => order.id);
+    if (pendingIds.length === 0) return;
+    const oldestCreatedAt = pendingOrders.reduce(
+      (oldest, order) => (order.created_at < oldest ? order.created_at : oldest),
+      pendingOrders[0].created_at
+    );
+
+    try {
+      const result = await api.orders.bulkUpdateStatus(pendingIds, 'completed', oldestCreatedAt);
+      const updated = result.results.filter((item) => item.success).length;
+      toast({
+        title: 'Обновлено',
+        description: `Выполнено заказов: ${updated}`,
+      });
+      olderOrdersRef.current = olderOrdersRef.current.map((order) =>
+        pendingIds.includes(order.id) ? { ...order, status: 'completed' } : order
+      );
+      setOlderOrders(olderOrdersRef.current);
+      loadData();
+    } catch (error) {
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось обновить статусы',
+        variant: 'destructive',
+      });
+    }
+  };
+
+  const recentOrderIds = new Set(orders.map((order) => order.id));
+  const allOrders = [...orders, ...olderOrders.filter((order) => !recentOrderIds.has(order.id))];
+  const shownOrders = searchResults ?? allOrders;
+
+  const handleOrderStatusChange = async (orderId: number, status: string, createdAt?: string) => {
     try {
-      await api.orders.updateStatus(orderId, status);
+      await api.orders.updateStatus(orderId, status, createdAt);
+      setSearchResults((results) =>
+        results && results.map((order) => (order.id === orderId ? { ...order, status } : order))
+      );
       toast({
         title: 'Обновлено',
         description: 'Статус заказа изменен',
@@ -290,6 +407,7 @@ export default function Admin() {
               variant="outline" 
               size="sm"
               onClick={() => {
+                api.auth.logout();
                 setIsAuthenticated(false);
                 setCurrentAdmin(null);
                 setUsername('');
@@ -317,7 +435,7 @@ export default function Admin() {
 
             <TabsTrigger value="orders">
               <Icon name="ShoppingCart" size={16} className="mr-2" />
-              Заказы ({orders.length})
+              Заказы ({allOrders.length})
             </TabsTrigger>
             <TabsTrigger value="admins">
               <Icon name="Users" size={16} className="mr-2" />
@@ -441,17 +559,103 @@ export default function Admin() {
           </TabsContent>
 
           <TabsContent value="orders" className="space-y-6">
+            {analytics && (
+              <Card className="p-6">
+                <h2 className="text-2xl font-bold mb-4">Продажи</h2>
+                <div className="grid grid-cols-2 md:grid-cols-4 gap-4 mb-6">
+                  <div>
+                    <p className="text-sm text-muted-foreground">Заказов</p>
+                    <p className="text-2xl font-bold">{analytics.totals.orders}</p>
+                  </div>
+                  <div>
+                    <p className="text-sm text-muted-foreground">Выручка</p>
+                    <p className="text-2xl font-bold text-primary">{analytics.totals.revenue} ₽</p>
+                  </div>
+                  {analytics.by_status.slice(0, 2).map((bucket) => (
+                    <div key={bucket.status}>
+                      <p className="text-sm text-muted-foreground">{bucket.status}</p>
+                      <p className="text-2xl font-bold">{bucket.orders}</p>
+                    </div>
+                  ))}
+                </div>
+                <div className="space-y-2">
+                  {analytics.by_privilege.map((bucket) => (
+                    <div key={bucket.privilege_id} className="flex items-center justify-between text-sm">
+                      <span>{bucket.privilege_name ?? `#${bucket.privilege_id}`}</span>
+                      <span className="text-muted-foreground">
+                        {bucket.orders} шт. · {bucket.revenue} ₽
+                      </span>
+                    </div>
+                  ))}
+                </div>
+              </Card>
+            )}
+
             <Card className="p-6">
-              <h2 className="text-2xl font-bold mb-6">Заказы</h2>
+              <div className="flex items-center justify-between mb-6">
+                <h2 className="text-2xl font-bold">Заказы</h2>
+                <div className="flex gap-2">
+                  <Button
+                    className="gap-2"
+                    onClick={handleCompletePendingOrders}
+                    disabled={!allOrders.some((order) => order.status === 'pending')}
+                  >
+                    <Icon name="CheckCheck" size={16} />
+                    Выполнить все
+                  </Button>
+                  <Button
+                    variant="outline"
+                    className="gap-2"
+                    onClick={() => handleExportOrders('csv')}
+                    disabled={exportingOrders}
+                  >
+                    <Icon name="Download" size={16} />
+                    CSV
+                  </Button>
+                  <Button
+                    variant="outline"
+                    className="gap-2"
+                    onClick={() => handleExportOrders('ndjson')}
+                    disabled={exportingOrders}
+                  >
+                    <Icon name="Download" size={16} />
+                    NDJSON
+                  </Button>
+                </div>
+              </div>
 
-              {orders.length === 0 ? (
+              <form onSubmit={handleSearchOrders} className="flex gap-2 mb-6">
+                <Input
+                  value={orderQuery}
+                  onChange={(e) => setOrderQuery(e.target.value)}
+                  placeholder="Ник, телефон или Telegram"
+                />
+                <Button type="submit" variant="outline" className="gap-2" disabled={searchingOrders}>
+                  <Icon name="Search" size={16} />
+                  Найти
+                </Button>
+                {searchResults && (
+                  <Button
+                    type="button"
+                    variant="ghost"
+                    onClick={() => {
+                      setOrderQuery('');
+                      setSearchResults(null);
+                    }}
+                  >
+                    Сбросить
+                  </Button>
+                )}
+              </form>
+
+              {shownOrders.length === 0 ? (
                 <div className="text-center py-12 text-muted-foreground">
                   <Icon name="ShoppingCart" size={48} className="mx-auto mb-4 opacity-50" />
-                  <p>Заказов пока нет</p>
+                  <p>{searchResults ? 'Ничего не найдено' : 'Заказов пока нет'}</p>
                 </div>
               ) : (
                 <div className="space-y-4">
-                  {orders.map((order) => (
+                  {shownOrders.map((order) => (
                     <Card key={order.id} className="p-4">
                       <div className="flex items-start justify-between">
                         <div className="flex-1">
@@ -473,7 +677,7 @@ export default function Admin() {
                           {order.status === 'pending' && (
                             <Button 
                               size="sm"
-                              onClick={() => handleOrderStatusChange(order.id, 'completed')}
+                              onClick={() => handleOrderStatusChange(order.id, 'completed', order.created_at)}
                             >
                               Выполнить
                             </Button>
@@ -482,6 +686,17 @@ export default function Admin() {
                       </div>
                     </Card>
                   ))}
+                  {ordersCursor && !searchResults && (
+                    <div className="flex justify-center">
+                      <Button
+                        variant="outline"
+                        onClick={handleLoadMoreOrders}
+                        disabled={loadingMoreOrders}
+                      >
+                        {loadingMoreOrders ? 'Загрузка...' : 'Показать ещё'}
+                      </Button>
+                    </div>
+                  )}
                 </div>
               )}
             </Card>
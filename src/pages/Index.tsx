@@ -8,14 +8,35 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { useToast } from '@/hooks/use-toast';
-import { api, type Privilege } from '@/lib/api';
+import { api, type Faq, type Privilege } from '@/lib/api';
+
+const DEFAULT_FAQS: Pick<Faq, 'question' | 'answer'>[] = [
+  {
+    question: 'Как зайти на сервер?',
+    answer: 'Используйте IP адрес: play.anarchist-empire.ru в вашем клиенте Minecraft',
+  },
+  {
+    question: 'Какая версия Minecraft поддерживается?',
+    answer: 'Сервер поддерживает последнюю версию Minecraft Java Edition',
+  },
+  {
+    question: 'Есть ли правила на сервере?',
+    answer: 'Нет! Это сервер анархии - никаких правил и ограничений',
+  },
+  {
+    question: 'Как купить привилегию?',
+    answer: 'Привилегии появятся на сайте. Следите за обновлениями!',
+  },
+];
 
 export default function Index() {
   const [activeSection, setActiveSection] = useState('home');
   const [privileges, setPrivileges] = useState<Privilege[]>([]);
   const [buyDialogOpen, setBuyDialogOpen] = useState(false);
   const [selectedPrivilege, setSelectedPrivilege] = useState<Privilege | null>(null);
+  const [orderIdempotencyKey, setOrderIdempotencyKey] = useState(() => crypto.randomUUID());
   const [content, setContent] = useState<{ [key: string]: string }>({});
+  const [faqs, setFaqs] = useState<Pick<Faq, 'question' | 'answer'>[]>(DEFAULT_FAQS);
   const [playNowDialog, setPlayNowDialog] = useState(false);
   const { toast } = useToast();
 
@@ -30,25 +51,13 @@ export default function Index() {
   }, []);
 
   const loadData = async () => {
-    loadPrivileges();
-    loadContent();
-  };
-
-  const loadContent = async () => {
     try {
-      const data = await api.content.get();
-      setContent(data);
+      const data = await api.bootstrap.get();
+      setContent(data.content);
+      setPrivileges(data.privileges);
+      if (data.faqs.length > 0) setFaqs(data.faqs);
     } catch (error) {
-      console.error('Failed to load content');
-    }
-  };
-
-  const loadPrivileges = async () => {
-    try {
-      const data = await api.privileges.list();
-      setPrivileges(data);
-    } catch (error) {
-      console.error('Failed to load privileges');
+      console.error('Failed to load site data');
     }
   };
 
@@ -62,12 +71,13 @@ export default function Index() {
     const playerEmail = formData.get('player_email') as string;
 
     try {
-      await api.orders.create(selectedPrivilege.id, playerName, playerPhone, playerEmail);
+      await api.orders.create(selectedPrivilege.id, playerName, playerPhone, playerEmail, orderIdempotencyKey);
       toast({
         title: 'Заказ создан!',
         description: 'Мы свяжемся с вами в ближайшее время',
       });
       setBuyDialogOpen(false);
+      setOrderIdempotencyKey(crypto.randomUUID());
     } catch (error) {
       toast({
         title: 'Ошибка',
@@ -258,7 +268,10 @@ export default function Index() {
                       <DialogTrigger asChild>
                         <Button 
                           className="w-full gap-2" 
-                          onClick={() => setSelectedPrivilege(privilege)}
+                          onClick={() => {
+                            setSelectedPrivilege(privilege);
+                            setOrderIdempotencyKey(crypto.randomUUID());
+                          }}
                         >
                           <Icon name="ShoppingCart" size={16} />
                           Купить
@@ -311,41 +324,16 @@ export default function Index() {
           </div>
 
           <Accordion type="single" collapsible className="space-y-4">
-            <AccordionItem value="item-1" className="border border-border rounded-lg px-6 bg-card/50">
-              <AccordionTrigger className="text-left hover:no-underline">
-                Как зайти на сервер?
-              </AccordionTrigger>
-              <AccordionContent className="text-muted-foreground">
-                Используйте IP адрес: play.anarchist-empire.ru в вашем клиенте Minecraft
-              </AccordionContent>
-            </AccordionItem>
-
-            <AccordionItem value="item-2" className="border border-border rounded-lg px-6 bg-card/50">
-              <AccordionTrigger className="text-left hover:no-underline">
-                Какая версия Minecraft поддерживается?
-              </AccordionTrigger>
-              <AccordionContent className="text-muted-foreground">
-                Сервер поддерживает последнюю версию Minecraft Java Edition
-              </AccordionContent>
-            </AccordionItem>
-
-            <AccordionItem value="item-3" className="border border-border rounded-lg px-6 bg-card/50">
-              <AccordionTrigger className="text-left hover:no-underline">
-                Есть ли правила на сервере?
-              </AccordionTrigger>
-              <AccordionContent className="text-muted-foreground">
-                Нет! Это сервер анархии - никаких правил и ограничений
-              </AccordionContent>
-            </AccordionItem>
-
-            <AccordionItem value="item-4" className="border border-border rounded-lg px-6 bg-card/50">
-              <AccordionTrigger className="text-left hover:no-underline">
-                Как купить привилегию?
-              </AccordionTrigger>
-              <AccordionContent className="text-muted-foreground">
-                Привилегии появятся на сайте. Следите за обновлениями!
-              </AccordionContent>
-            </AccordionItem>
+            {faqs.map((faq, index) => (
+              <AccordionItem key={index} value={`item-${index + 1}`} className="border border-border rounded-lg px-6 bg-card/50">
+                <AccordionTrigger className="text-left hover:no-underline">
+                  {faq.question}
+                </AccordionTrigger>
+                <AccordionContent className="text-muted-foreground">
+                  {faq.answer}
+                </AccordionContent>
+              </AccordionItem>
+            ))}
           </Accordion>
         </div>
       </section>